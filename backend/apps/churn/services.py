@@ -32,6 +32,25 @@ class RFMCalculator:
     FREQUENCY_WEIGHT = Decimal("0.3")
     MONETARY_WEIGHT = Decimal("0.3")
 
+    # Rows per bulk INSERT/UPDATE statement
+    BULK_BATCH_SIZE = 500
+
+    SCORE_FIELDS = [
+        "recency_score",
+        "frequency_score",
+        "monetary_score",
+        "rfm_score",
+        "rfm_segment",
+        "churn_risk_score",
+        "churn_risk_level",
+        "risk_reason",
+        "purchase_count",
+        "total_spent",
+        "avg_purchase_value",
+        "days_since_purchase",
+        "last_purchase",
+    ]
+
     def __init__(self, business: Business):
         self.business = business
 
@@ -44,10 +63,9 @@ class RFMCalculator:
         metrics_map = self._collect_metrics(customers)
         if not metrics_map:
             # Ensure churn scores exist (all zeroed) even if no transactions yet
-            return [
-                self._persist_score(metrics)
-                for metrics in self._initial_metrics(customers).values()
-            ]
+            return self._persist_scores(
+                self._build_score(metrics) for metrics in self._initial_metrics(customers).values()
+            )
 
         recency_scores = self._rank_scores(metrics_map.values(), key=lambda m: m.days_since, higher_is_better=False)
         frequency_scores = self._rank_scores(metrics_map.values(), key=lambda m: m.purchase_count, higher_is_better=True)
@@ -60,7 +78,7 @@ class RFMCalculator:
             monetary_score = monetary_scores.get(customer_id, 1)
 
             churn_objects.append(
-                self._persist_score(
+                self._build_score(
                     metrics,
                     recency_score=recency_score,
                     frequency_score=frequency_score,
@@ -68,7 +86,7 @@ class RFMCalculator:
                 )
             )
 
-        return churn_objects
+        return self._persist_scores(churn_objects)
 
     def _collect_metrics(self, customers: Iterable[Customer]) -> Dict[str, CustomerMetrics]:
         customer_map = {str(customer.customer_id): customer for customer in customers}
@@ -163,7 +181,7 @@ class RFMCalculator:
 
         return score_map
 
-    def _persist_score(
+    def _build_score(
         self,
         metrics: CustomerMetrics,
         *,
@@ -194,7 +212,7 @@ class RFMCalculator:
         )
         risk_reason = self._build_risk_reason(metrics, recency_score, frequency_score, monetary_score)
 
-        defaults = {
+        values = {
             "business": self.business,
             "recency_score": recency_score,
             "frequency_score": frequency_score,
@@ -211,17 +229,58 @@ class RFMCalculator:
             "last_purchase": metrics.last_purchase,
         }
 
-        churn_score, _ = CustomerChurnScore.objects.update_or_create(
-            customer=metrics.customer,
-            defaults=defaults,
-        )
+        return CustomerChurnScore(customer=metrics.customer, **values)
+
+    @transaction.atomic
+    def _persist_scores(self, scores: Iterable[CustomerChurnScore]) -> List[CustomerChurnScore]:
+        """Insert or update scores and their customers' aggregates in bulk, not one query per customer
+
+        Only scores and customers whose values changed are rewritten; the
+        refresh time of every score is bumped with a single UPDATE. All of it
+        is one atomic block, a failed write leaves the previous scores in place.
+        """
+        scores = list(scores)
+        existing = {
+            score.customer_id: score
+            for score in CustomerChurnScore.objects.filter(business=self.business)
+        }
+
+        now = timezone.now()
+        created: List[CustomerChurnScore] = []
+        changed: List[CustomerChurnScore] = []
+        persisted: List[CustomerChurnScore] = []
+        for score in scores:
+            current = existing.get(score.customer_id)
+            if current is None:
+                created.append(score)
+                persisted.append(score)
+                continue
+            if any(getattr(current, field) != getattr(score, field) for field in self.SCORE_FIELDS):
+                for field in self.SCORE_FIELDS:
+                    setattr(current, field, getattr(score, field))
+                changed.append(current)
+            current.customer = score.customer
+            current.updated_at = now
+            persisted.append(current)
+
+        CustomerChurnScore.objects.filter(business=self.business).update(updated_at=now)
+        CustomerChurnScore.objects.bulk_create(created, batch_size=self.BULK_BATCH_SIZE)
+        CustomerChurnScore.objects.bulk_update(changed, self.SCORE_FIELDS, batch_size=self.BULK_BATCH_SIZE)
 
         # Keep high-level aggregate fields in sync on the customer record
-        metrics.customer.total_purchases = metrics.total_spent
-        metrics.customer.last_purchase = metrics.last_purchase
-        metrics.customer.save(update_fields=["total_purchases", "last_purchase", "updated_at"])
+        customers = []
+        for score in scores:
+            customer = score.customer
+            if (customer.total_purchases, customer.last_purchase) != (score.total_spent, score.last_purchase):
+                customer.total_purchases = score.total_spent
+                customer.last_purchase = score.last_purchase
+                customer.updated_at = now  # bulk_update skips auto_now
+                customers.append(customer)
+        Customer.objects.bulk_update(
+            customers, ["total_purchases", "last_purchase", "updated_at"], batch_size=self.BULK_BATCH_SIZE
+        )
 
-        return churn_score
+        return persisted
 
     def _segment_customer(
         self,
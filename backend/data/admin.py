@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
-    Product, Customer, Transaction, FileUploadRecord, FailedJob, ReceiptUploadRecord,
-    InventoryUploadRecord, StockMovement, StockAlert
+    Product, Customer, Transaction, FileUploadRecord, ChunkedUploadSession, FailedJob,
+    ReceiptBatch, ReceiptUploadRecord, InventoryUploadRecord, StockMovement, StockAlert
 )
 
 
@@ -35,11 +35,12 @@ class FileUploadRecordAdmin(admin.ModelAdmin):
     list_display = ['original_filename', 'business', 'status', 'row_count', 'created_transactions', 'uploaded_at']
     list_filter = ['business', 'status', 'uploaded_at']
     search_fields = ['original_filename', 'business__name']
-    readonly_fields = ['file_id', 'uploaded_at', 'processing_started_at', 'processing_completed_at']
+    readonly_fields = ['file_id', 'uploaded_at', 'processing_started_at', 'processing_completed_at', 'checkpoint_at']
+    actions = ['resume_import']
 
     fieldsets = (
         ('File Info', {
-            'fields': ('file_id', 'original_filename', 'file_path', 'file_size', 'business', 'user')
+            'fields': ('file_id', 'original_filename', 'file_path', 'file_size', 'content_sha256', 'duplicate_of', 'business', 'user')
         }),
         ('Status', {
             'fields': ('status', 'error_message')
@@ -47,14 +48,35 @@ class FileUploadRecordAdmin(admin.ModelAdmin):
         ('Processing Stats', {
             'fields': ('row_count', 'rows_processed', 'rows_failed', 'created_transactions')
         }),
+        ('Checkpoint', {
+            'fields': ('checkpoint_chunk', 'checkpoint_offset', 'checkpoint_at')
+        }),
         ('Timestamps', {
             'fields': ('uploaded_at', 'processing_started_at', 'processing_completed_at')
         }),
         ('Errors', {
-            'fields': ('processing_errors',)
+            'fields': ('processing_errors', 'error_counts')
         }),
     )
 
+    @admin.action(description='Resume import from last checkpoint')
+    def resume_import(self, request, queryset):
+        from .views import _executor, _process_csv_file
+
+        resumable = queryset.exclude(status='completed')
+        for file_upload in resumable:
+            _executor.submit(_process_csv_file, file_upload.file_id)
+        self.message_user(request, f"Resuming {resumable.count()} import(s)")
+
+
+@admin.register(ChunkedUploadSession)
+class ChunkedUploadSessionAdmin(admin.ModelAdmin):
+    list_display = ['original_filename', 'business', 'status', 'total_size', 'created_at']
+    list_filter = ['status', 'business', 'created_at']
+    search_fields = ['original_filename']
+    readonly_fields = ['upload_id', 'received_ranges', 'file_upload', 'created_at', 'updated_at']
+    date_hierarchy = 'created_at'
+
 
 @admin.register(FailedJob)
 class FailedJobAdmin(admin.ModelAdmin):
@@ -74,7 +96,10 @@ class ReceiptUploadRecordAdmin(admin.ModelAdmin):
 
     fieldsets = (
         ('File Info', {
-            'fields': ('image_id', 'original_filename', 'file_path', 'file_size', 'business', 'user')
+            'fields': (
+                'image_id', 'original_filename', 'file_path', 'file_size', 'content_sha256', 'image_hash',
+                'duplicate_of', 'duplicate_distance', 'business', 'user'
+            )
         }),
         ('Status', {
             'fields': ('status', 'error_message')
@@ -91,6 +116,14 @@ class ReceiptUploadRecordAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(ReceiptBatch)
+class ReceiptBatchAdmin(admin.ModelAdmin):
+    list_display = ['batch_id', 'business', 'status', 'receipt_count', 'receipts_finished', 'created_at']
+    list_filter = ['business', 'status', 'created_at']
+    search_fields = ['business__name']
+    readonly_fields = ['batch_id', 'created_at', 'completed_at']
+
+
 @admin.register(InventoryUploadRecord)
 class InventoryUploadRecordAdmin(admin.ModelAdmin):
     list_display = ['original_filename', 'business', 'status', 'products_updated', 'uploaded_at']
@@ -106,7 +139,10 @@ class InventoryUploadRecordAdmin(admin.ModelAdmin):
             'fields': ('status', 'error_message')
         }),
         ('Processing Stats', {
-            'fields': ('row_count', 'rows_processed', 'rows_failed', 'products_updated')
+            'fields': (
+                'row_count', 'rows_processed', 'rows_failed', 'products_updated',
+                'products_created', 'products_changed', 'products_unchanged'
+            )
         }),
         ('Timestamps', {
             'fields': ('uploaded_at', 'processing_started_at', 'processing_completed_at')
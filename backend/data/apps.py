@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class DataConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'data'
+
+    def ready(self):
+        # Keeps the product name index in step with product saves
+        from . import product_index  # noqa: F401
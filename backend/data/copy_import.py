@@ -0,0 +1,126 @@
+import csv
+import io
+import uuid
+from typing import Any, Dict, List, Tuple
+
+from django.db import connection
+from django.utils import timezone
+from .models import Customer, Product, Transaction
+
+# Session temporary table, emptied when each chunk's transaction commits
+STAGING_TABLE = 'import_transaction_staging'
+
+STAGING_COLUMNS = (
+    'seq', 'transaction_id', 'product_name', 'customer_name', 'date', 'time',
+    'quantity', 'unit_price', 'amount', 'payment_method', 'notes', 'row_hash',
+)
+
+
+class CopyTransactionWriter:
+    """PostgreSQL fast path for writing imported transactions
+
+    Parsed rows are streamed with COPY into a temporary staging table, then
+    inserted with a single INSERT ... SELECT that resolves product and
+    customer IDs by joining on name. Rows whose (business, csv_import_hash)
+    already exists are skipped by ON CONFLICT DO NOTHING, so duplicate
+    detection needs no lookup queries. Products and customers must exist
+    before `write` is called.
+    """
+
+    def __init__(self, business, file_upload) -> None:
+        self.business = business
+        self.file_upload = file_upload
+
+    @staticmethod
+    def is_supported() -> bool:
+        """COPY and ON CONFLICT are only used on PostgreSQL"""
+        return connection.vendor == 'postgresql'
+
+    def write(self, parsed_rows: List[Dict[str, Any]]) -> List[Tuple[Any, Any, int, Any, Any]]:
+        """Insert parsed rows, must be called inside an atomic block
+
+        Returns:
+            (product_id, customer_id, quantity, amount, date) of every created
+            transaction; rows missing from the result were duplicates
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} ("
+                "seq integer NOT NULL, "
+                "transaction_id uuid NOT NULL, "
+                "product_name varchar(255) NOT NULL, "
+                "customer_name varchar(100), "
+                "date date NOT NULL, "
+                "time time, "
+                "quantity integer NOT NULL, "
+                "unit_price numeric(10, 2) NOT NULL, "
+                "amount numeric(12, 2) NOT NULL, "
+                "payment_method varchar(20) NOT NULL, "
+                "notes text, "
+                "row_hash varchar(32) NOT NULL"
+                ") ON COMMIT DELETE ROWS"
+            )
+            # Rows of an earlier chunk may still be there inside an outer transaction
+            cursor.execute(f"TRUNCATE {STAGING_TABLE}")
+
+            self._copy(cursor, self.staging_csv(parsed_rows))
+
+            cursor.execute(
+                f"INSERT INTO {Transaction._meta.db_table} ("
+                "transaction_id, business_id, product_id, customer_id, date, time, quantity, "
+                "unit_price, amount, payment_method, notes, csv_import_hash, file_upload_id, created_at"
+                ") "
+                "SELECT s.transaction_id, %s, p.product_id, c.customer_id, s.date, s.time, s.quantity, "
+                "s.unit_price, s.amount, s.payment_method, s.notes, s.row_hash, %s, %s "
+                f"FROM {STAGING_TABLE} s "
+                f"JOIN {Product._meta.db_table} p ON p.business_id = %s AND p.name = s.product_name "
+                f"LEFT JOIN {Customer._meta.db_table} c ON c.business_id = %s AND c.name = s.customer_name "
+                "ORDER BY s.seq "
+                "ON CONFLICT (business_id, csv_import_hash) DO NOTHING "
+                "RETURNING product_id, customer_id, quantity, amount, date",
+                [
+                    self.business.pk, self.file_upload.pk, timezone.now(),
+                    self.business.pk, self.business.pk,
+                ]
+            )
+            return cursor.fetchall()
+
+    @staticmethod
+    def staging_csv(parsed_rows: List[Dict[str, Any]]) -> str:
+        """Serialise parsed rows in COPY's CSV format, empty unquoted fields are NULL"""
+        unit_price_field = Transaction._meta.get_field('unit_price')
+        amount_field = Transaction._meta.get_field('amount')
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        for seq, parsed in enumerate(parsed_rows):
+            customer_name = parsed['customer_name']
+            if not customer_name or customer_name.lower() == 'walk-in':
+                customer_name = None
+            writer.writerow([
+                seq,
+                uuid.uuid4(),
+                parsed['product_name'],
+                customer_name,
+                parsed['date'].isoformat(),
+                parsed['time'].isoformat() if parsed['time'] else None,
+                parsed['quantity'],
+                # Same value the ORM would send when saving the field
+                unit_price_field.get_db_prep_save(parsed['unit_price'], connection),
+                amount_field.get_db_prep_save(parsed['amount'], connection),
+                parsed['payment_method'],
+                parsed['notes'] or None,
+                parsed['row_hash'],
+            ])
+        return buffer.getvalue()
+
+    @staticmethod
+    def _copy(cursor, data: str) -> None:
+        """Stream CSV data into the staging table with psycopg2 or psycopg 3"""
+        sql = f"COPY {STAGING_TABLE} ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+        raw_cursor = cursor.cursor
+        if hasattr(raw_cursor, 'copy_expert'):
+            raw_cursor.copy_expert(sql, io.StringIO(data))
+        else:
+            with raw_cursor.copy(sql) as copy:
+                copy.write(data)
@@ -0,0 +1,276 @@
+import codecs
+import gzip
+import io
+import os
+import zipfile
+from itertools import islice
+from typing import IO, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
+
+from django.conf import settings
+
+T = TypeVar('T')
+
+# Block size used when scanning files byte by byte
+SCAN_BLOCK_SIZE = 1024 * 1024  # 1MB
+
+
+def format_size(num_bytes: int) -> str:
+    """Format a byte count as a whole number of MB (or KB for small limits)"""
+    if num_bytes >= 1024 * 1024:
+        return f"{num_bytes // (1024 * 1024)}MB"
+    return f"{max(num_bytes // 1024, 1)}KB"
+
+
+class DecompressedSizeExceeded(ValueError):
+    """A compressed upload expands beyond CSV_UPLOAD_MAX_DECOMPRESSED_SIZE"""
+
+    @classmethod
+    def for_limit(cls, limit: int) -> 'DecompressedSizeExceeded':
+        return cls(f"Decompressed file exceeds maximum size of {format_size(limit)}")
+
+
+def compression_for(filename: str) -> Optional[str]:
+    """Compression of an upload from its file name: 'gzip', 'zip' or None"""
+    name = filename.lower()
+    if name.endswith('.gz'):
+        return 'gzip'
+    if name.endswith('.zip'):
+        return 'zip'
+    return None
+
+
+def is_parquet(filename: str) -> bool:
+    """Parquet exports are imported in record batches instead of as CSV text"""
+    return filename.lower().endswith('.parquet')
+
+
+class SizeLimitedStream(io.BufferedIOBase):
+    """Read-only binary stream raising DecompressedSizeExceeded past `limit` bytes
+
+    The position of the wrapped decompressor is the number of decompressed
+    bytes, so the check costs nothing per read.
+    """
+
+    def __init__(self, raw: IO[bytes], limit: int) -> None:
+        super().__init__()
+        self.raw = raw
+        self.limit = limit
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return self.raw.seekable()
+
+    def _check(self, data: bytes) -> bytes:
+        if self.raw.tell() > self.limit:
+            raise DecompressedSizeExceeded.for_limit(self.limit)
+        return data
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            # Never expand a whole archive in memory before checking it
+            return b''.join(iter(lambda: self.read(SCAN_BLOCK_SIZE), b''))
+        return self._check(self.raw.read(size))
+
+    def read1(self, size: int = -1) -> bytes:
+        return self.read(size if size is not None and size >= 0 else SCAN_BLOCK_SIZE)
+
+    def readline(self, size: int = -1) -> bytes:
+        return self._check(self.raw.readline(size))
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        return self.raw.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self.raw.tell()
+
+    def close(self) -> None:
+        if not self.closed:
+            self.raw.close()
+        super().close()
+
+
+def _open_zip_member(source: Union[str, IO[bytes]], limit: int) -> IO[bytes]:
+    """Open the single CSV file inside a ZIP archive"""
+    with zipfile.ZipFile(source) as archive:
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir() and info.filename.lower().endswith('.csv')
+            and not info.filename.startswith('__MACOSX/')
+        ]
+        if len(members) != 1:
+            raise ValueError("ZIP archive must contain exactly one CSV file")
+        if members[0].file_size > limit:
+            # Declared size, the stream is still checked while reading
+            raise DecompressedSizeExceeded.for_limit(limit)
+        # The member stays readable after the archive is closed
+        return archive.open(members[0])
+
+
+def open_csv_stream(source: Union[str, IO[bytes]], compression: Optional[str] = None,
+                    max_size: Optional[int] = None) -> IO[bytes]:
+    """Open a CSV for binary reading, decompressing .gz and .zip uploads on the fly
+
+    Nothing is expanded to disk: gzip and ZIP members are decompressed as
+    they are read, and seeking re-reads the stream up to the offset, so byte
+    offsets (checkpoints) refer to the decompressed CSV.
+
+    Args:
+        source: File path, or a seekable binary file object (left open)
+        compression: 'gzip', 'zip' or None, detected from the path when omitted
+        max_size: Decompressed size guard (defaults to CSV_UPLOAD_MAX_DECOMPRESSED_SIZE)
+
+    Returns:
+        Binary stream with readline/read/seek/tell
+    """
+    if compression is None and isinstance(source, str):
+        compression = compression_for(source)
+    if compression is None:
+        return open(source, 'rb') if isinstance(source, str) else source
+
+    limit = max_size or getattr(settings, 'CSV_UPLOAD_MAX_DECOMPRESSED_SIZE', 100 * 1024 * 1024)
+    if compression == 'gzip':
+        raw = gzip.open(source, 'rb') if isinstance(source, str) else gzip.GzipFile(fileobj=source, mode='rb')
+    elif compression == 'zip':
+        raw = _open_zip_member(source, limit)
+    else:
+        raise ValueError(f"Unsupported compression: {compression}")
+    return SizeLimitedStream(raw, limit)
+
+
+def count_data_rows(file_path: str) -> int:
+    """Estimate the number of data rows in a CSV file without parsing it
+
+    Counts newlines in fixed-size binary blocks, so memory use does not depend
+    on the file size. Quoted fields containing newlines are over-counted, which
+    is acceptable for progress reporting.
+
+    Args:
+        file_path: Path to the CSV file or .gz/.zip upload (header expected on the first line)
+
+    Returns:
+        Number of lines after the header
+    """
+    lines = 0
+    last_byte = b''
+    with open_csv_stream(file_path) as f:
+        while True:
+            block = f.read(SCAN_BLOCK_SIZE)
+            if not block:
+                break
+            lines += block.count(b'\n')
+            last_byte = block[-1:]
+
+    # Last line without trailing newline still holds a row
+    if last_byte and last_byte != b'\n':
+        lines += 1
+
+    return max(lines - 1, 0)
+
+
+def iter_text_lines(byte_chunks: Iterable[bytes], encoding: str = 'utf-8',
+                    errors: str = 'replace') -> Iterator[str]:
+    """Decode a stream of byte chunks into lines suitable for csv.reader
+
+    Multi-byte characters split across chunk boundaries are decoded correctly
+    and only the current partial line is kept in memory.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors=errors)
+    pending = ''
+    for chunk in byte_chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+
+def iter_chunks(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Yield lists of at most `size` items from an iterable"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class OffsetLineReader:
+    """Decoded lines of a binary file, tracking the byte offset consumed so far
+
+    csv.reader pulls lines without reading ahead, so after each record
+    `offset` is the position right after it. Seeking to a recorded offset
+    resumes reading at the next record. With `end` set, reading stops at that
+    offset (expected to be a line boundary).
+    """
+
+    def __init__(self, binary_file, encoding: str = 'utf-8', end: Optional[int] = None) -> None:
+        self.file = binary_file
+        self.encoding = encoding
+        self.end = end
+        self.offset = binary_file.tell()
+
+    def __iter__(self) -> Iterator[str]:
+        while self.end is None or self.offset < self.end:
+            line = self.file.readline()
+            if not line:
+                return
+            self.offset += len(line)
+            yield line.decode(self.encoding)
+
+    def seek(self, offset: int) -> None:
+        """Continue reading from a byte offset previously read from `offset`"""
+        self.file.seek(offset)
+        self.offset = offset
+
+
+def split_line_ranges(file_path: str, start: int, parts: int) -> List[Tuple[int, int, int]]:
+    """Split a file from `start` into about `parts` byte ranges aligned to line starts
+
+    Args:
+        file_path: Path to the file
+        start: Offset of the first line to include (e.g. right after a header)
+        parts: Number of ranges wanted, fewer are returned for small files
+
+    Returns:
+        (start, end, lines_before) per range, where lines_before is the number
+        of lines between `start` and the beginning of the range
+    """
+    size = os.path.getsize(file_path)
+    boundaries = [start]
+    with open(file_path, 'rb') as f:
+        for part in range(1, parts):
+            target = start + (size - start) * part // parts
+            if target <= boundaries[-1]:
+                continue
+            # The next line starts after the first newline at or after target - 1
+            f.seek(target - 1)
+            f.readline()
+            boundary = f.tell()
+            if boundary >= size:
+                break
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+        boundaries.append(size)
+
+        ranges = []
+        lines_before = 0
+        for range_start, range_end in zip(boundaries, boundaries[1:]):
+            if range_end <= range_start:
+                continue
+            ranges.append((range_start, range_end, lines_before))
+            f.seek(range_start)
+            remaining = range_end - range_start
+            while remaining > 0:
+                block = f.read(min(SCAN_BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                lines_before += block.count(b'\n')
+                remaining -= len(block)
+
+    return ranges
@@ -0,0 +1,172 @@
+import hashlib
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Tuple
+
+import pandas as pd
+from django.utils import timezone
+
+# Strict ASCII formats accepted by the vectorised checks. Anything else is
+# handed to the scalar parser, which decides whether the value is valid.
+INTEGER_PATTERN = r'^[+-]?[0-9]+$'
+DECIMAL_PATTERN = r'^[+-]?(?:[0-9]+(?:\.[0-9]*)?|\.[0-9]+)$'
+
+CSV_FIELDS = ('Date', 'Time', 'Product', 'Quantity', 'UnitPrice', 'Amount', 'Customer', 'PaymentMethod', 'Notes')
+
+Row = Dict[str, str]
+ParsedRow = Tuple[int, Row, Dict[str, Any]]
+FailedRow = Tuple[int, Row, str]
+
+
+def date_values_list(values: pd.Series) -> List[Any]:
+    """Convert a datetime64 column to a list of datetime.date"""
+    return values.to_numpy(dtype='datetime64[D]').tolist()
+
+
+def time_values_list(values: pd.Series, present: pd.Series) -> List[Any]:
+    """Convert a datetime64 column to a list of datetime.time, None where absent"""
+    return [
+        value.time() if is_present else None
+        for value, is_present in zip(values.to_numpy(dtype='datetime64[us]').tolist(), present.tolist())
+    ]
+
+
+class ColumnarChunkValidator:
+    """Validate a chunk of transaction CSV rows column by column with pandas
+
+    Dates, times, quantities and amounts are parsed vectorially and the
+    MAX_QUANTITY/MAX_AMOUNT and future-date rules are applied as column masks.
+    Rows rejected by a mask are re-validated with the scalar `fallback`
+    (CSVParserService._parse_row), so accepted values and error messages are
+    identical to row-by-row parsing.
+    """
+
+    def __init__(self, max_quantity: int, max_amount: int, payment_methods: List[str],
+                 fallback: Callable[[Row], Dict[str, Any]]) -> None:
+        self.max_quantity = max_quantity
+        self.max_amount = max_amount
+        self.payment_methods = payment_methods
+        self.fallback = fallback
+
+    def validate(self, chunk: List[Tuple[int, Row]]) -> Tuple[List[ParsedRow], List[FailedRow]]:
+        """Validate a chunk, returning parsed rows and (row_num, row, error) failures in file order"""
+        if not chunk:
+            return [], []
+
+        frame = pd.DataFrame.from_records([row for _, row in chunk])
+        columns = self._resolve_columns(frame.columns)
+        size = len(chunk)
+
+        def column(field: str) -> pd.Series:
+            key = columns.get(field)
+            if key is None:
+                return pd.Series([''] * size, dtype=object)
+            return frame[key].fillna('').astype(str).str.strip().astype(object)
+
+        date_col = column('Date')
+        product_col = column('Product')
+        quantity_col = column('Quantity')
+        amount_col = column('Amount')
+        time_col = column('Time')
+        unit_price_col = column('UnitPrice')
+        customer_col = column('Customer')
+        payment_col = column('PaymentMethod')
+        notes_col = column('Notes')
+
+        # Required fields
+        fast = (date_col != '') & (product_col != '') & (quantity_col != '') & (amount_col != '')
+
+        # Rows with more values than headers are keyed on None, leave them to the scalar path
+        if None in frame.columns:
+            fast &= frame[None].isna()
+
+        # Date: YYYY-MM-DD, not in the future
+        dates = pd.to_datetime(date_col.where(fast), format='%Y-%m-%d', errors='coerce')
+        fast &= dates.notna() & (dates <= pd.Timestamp(timezone.now().date()))
+
+        # Quantity: 0 < quantity <= MAX_QUANTITY
+        quantity_format = quantity_col.str.match(INTEGER_PATTERN).astype(bool)
+        quantities = pd.to_numeric(quantity_col.where(fast & quantity_format), errors='coerce')
+        fast &= quantities.notna() & (quantities > 0) & (quantities <= self.max_quantity)
+
+        # Amount: 0 < amount < MAX_AMOUNT (the boundary itself goes to the exact Decimal check)
+        amount_format = amount_col.str.match(DECIMAL_PATTERN).astype(bool)
+        amounts = pd.to_numeric(amount_col.where(fast & amount_format), errors='coerce')
+        fast &= amounts.notna() & (amounts > 0) & (amounts < self.max_amount)
+
+        # Time (optional): HH:MM
+        has_time = time_col != ''
+        times = pd.to_datetime(time_col.where(fast & has_time), format='%H:%M', errors='coerce')
+        fast &= ~has_time | times.notna()
+
+        # Unit price (optional): plain decimal
+        has_unit_price = unit_price_col != ''
+        fast &= ~has_unit_price | unit_price_col.str.match(DECIMAL_PATTERN).astype(bool)
+
+        # Normalised optional fields
+        customers = customer_col.where(customer_col != '', 'Walk-in')
+        payments = payment_col.where(payment_col != '', 'cash').str.lower()
+        payments = payments.where(payments.isin(self.payment_methods), 'other')
+
+        # Hash inputs built per column, same layout as CSVParserService._compute_row_hash
+        fast_index = fast[fast].index
+        quantity_values = quantities[fast_index].astype('int64')
+        amount_values = [Decimal(value) for value in amount_col[fast_index].tolist()]
+        hash_inputs = (
+            dates[fast_index].dt.strftime('%Y-%m-%d') + '|' + product_col[fast_index] + '|'
+            + quantity_values.astype(str) + '|' + pd.Series(amount_values, index=fast_index).astype(str)
+            + '|' + customers[fast_index]
+        )
+        fast_values = zip(
+            fast_index.tolist(),
+            date_values_list(dates[fast_index]),
+            time_values_list(times[fast_index], has_time[fast_index]),
+            product_col[fast_index].tolist(),
+            quantity_values.tolist(),
+            amount_values,
+            unit_price_col[fast_index].tolist(),
+            customers[fast_index].tolist(),
+            payments[fast_index].tolist(),
+            notes_col[fast_index].tolist(),
+            [hashlib.md5(value.encode()).hexdigest() for value in hash_inputs.tolist()],
+        )
+        has_notes = columns.get('Notes') is not None
+
+        parsed_by_position: Dict[int, Dict[str, Any]] = {}
+        for (position, date_value, time_value, product_name, quantity, amount,
+             unit_price_str, customer_name, payment_method, notes, row_hash) in fast_values:
+            parsed_by_position[position] = {
+                'date': date_value,
+                'time': time_value,
+                'product_name': product_name,
+                'quantity': quantity,
+                'amount': amount,
+                'unit_price': Decimal(unit_price_str) if unit_price_str else (amount / quantity),
+                'customer_name': customer_name,
+                'payment_method': payment_method,
+                'notes': notes if has_notes else None,
+                'row_hash': row_hash,
+            }
+
+        parsed_rows: List[ParsedRow] = []
+        failed_rows: List[FailedRow] = []
+        for position, (row_num, row) in enumerate(chunk):
+            parsed = parsed_by_position.get(position)
+            if parsed is not None:
+                parsed_rows.append((row_num, row, parsed))
+                continue
+            try:
+                parsed_rows.append((row_num, row, self.fallback(row)))
+            except Exception as e:
+                failed_rows.append((row_num, row, str(e)))
+
+        return parsed_rows, failed_rows
+
+    def _resolve_columns(self, keys) -> Dict[str, Any]:
+        """Map each canonical field to the first header matching it case-insensitively"""
+        columns: Dict[str, Any] = {}
+        for field in CSV_FIELDS:
+            for key in keys:
+                if isinstance(key, str) and key.strip().lower() == field.lower():
+                    columns[field] = key
+                    break
+        return columns
@@ -112,10 +112,10 @@ class DemandForecastService:
 
         actual = merged['y']
         prediction = merged['yhat']
-        with pd.option_context('mode.use_inf_as_na', True):
-            denominator = actual.replace(0, pd.NA)
-            errors = (actual - prediction).abs() / denominator
-            errors = errors.dropna()
+        denominator = actual.replace(0, pd.NA)
+        errors = (actual - prediction).abs() / denominator
+        # mode.use_inf_as_na is gone in pandas 3, drop infinities explicitly
+        errors = errors.replace([float('inf'), float('-inf')], pd.NA).dropna()
         mape = float(errors.mean()) * 100 if not errors.empty else None
         return {
             'mape': mape,
@@ -0,0 +1,244 @@
+import csv
+import os
+import random
+import subprocess
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.utils import timezone
+
+from accounts.models import Business
+from .inventory_service import InventoryUploadService
+from .models import FileUploadRecord, InventoryUploadRecord
+from .services import CSVParserService
+
+DEFAULT_TRANSACTION_SAMPLE = settings.BASE_DIR.parent / 'sample_transaction_data.csv'
+DEFAULT_INVENTORY_SAMPLE = settings.BASE_DIR.parent / 'sample_inventory_data.csv'
+
+
+class BenchmarkDataGenerator:
+    """Generate transaction and inventory CSVs shaped like the sample files
+
+    Product names, unit prices, customers, payment methods and SKU patterns
+    come from the samples. When more products or customers are asked for
+    than the samples hold, numbered variants of the sample names are used.
+    A fraction of rows can be made invalid to exercise the error path.
+    """
+
+    def __init__(self, transaction_sample: str, inventory_sample: str, products: int = 200,
+                 customers: int = 500, days: int = 90, error_rate: float = 0.0, seed: int = 42) -> None:
+        """
+        Args:
+            transaction_sample: Sample transaction CSV the rows are modelled on
+            inventory_sample: Sample inventory CSV the stock rows are modelled on
+            products: Distinct products referenced by the generated rows
+            customers: Distinct named customers, walk-in sales come on top
+            days: Days the transaction dates are spread over
+            error_rate: Fraction of transaction rows with an invalid quantity or date
+            seed: Random seed, the same arguments always generate the same files
+        """
+        self.random = random.Random(seed)
+        self.days = max(1, days)
+        self.error_rate = error_rate
+
+        with open(transaction_sample, newline='', encoding='utf-8') as f:
+            sample_rows = list(csv.DictReader(f))
+        with open(inventory_sample, newline='', encoding='utf-8') as f:
+            inventory_rows = list(csv.DictReader(f))
+        if not sample_rows or not inventory_rows:
+            raise ValueError("Sample files must contain at least one data row")
+
+        self.start_date = min(datetime.strptime(row['Date'], '%Y-%m-%d').date() for row in sample_rows)
+        self.payment_methods = sorted({row['PaymentMethod'] for row in sample_rows if row.get('PaymentMethod')})
+        self.walk_in_share = sum(1 for row in sample_rows if not row.get('Customer')) / len(sample_rows)
+
+        prices = {row['Product']: Decimal(row['Unit Price']) for row in inventory_rows}
+        for row in sample_rows:
+            prices.setdefault(row['Product'], (Decimal(row['Amount']) / int(row['Quantity'])).quantize(Decimal('0.01')))
+        self.catalogue = self._expand(prices, products)
+
+        sample_customers = sorted({row['Customer'] for row in sample_rows if row.get('Customer')})
+        self.customers = list(self._expand({name: None for name in sample_customers}, customers))
+
+    @staticmethod
+    def _expand(items: Dict[str, Any], count: int) -> Dict[str, Any]:
+        """First `count` names of the sample, cycled with a number suffix when more are needed"""
+        names = list(items)
+        expanded = {}
+        for index in range(max(0, count)):
+            base = names[index % len(names)]
+            round_number = index // len(names)
+            expanded[base if round_number == 0 else f'{base} {round_number + 1}'] = items[base]
+        return expanded
+
+    def write_transactions(self, path: str, rows: int) -> int:
+        """Write a transaction CSV of `rows` data rows, returns the file size"""
+        products = list(self.catalogue.items())
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Date', 'Product', 'Quantity', 'Amount', 'Customer', 'PaymentMethod'])
+            for _ in range(rows):
+                product, unit_price = self.random.choice(products)
+                quantity = self.random.randint(1, 10)
+                sale_date = (self.start_date + timedelta(days=self.random.randrange(self.days))).isoformat()
+                customer = ''
+                if self.customers and self.random.random() >= self.walk_in_share:
+                    customer = self.random.choice(self.customers)
+                if self.random.random() < self.error_rate:
+                    if self.random.random() < 0.5:
+                        quantity = 'abc'
+                    else:
+                        sale_date = '2024-13-45'
+                amount = unit_price * quantity if isinstance(quantity, int) else unit_price
+                writer.writerow([
+                    sale_date, product, quantity, amount, customer, self.random.choice(self.payment_methods)
+                ])
+        return os.path.getsize(path)
+
+    def write_inventory(self, path: str, rows: int) -> int:
+        """Write a stock list of `rows` products from the catalogue, returns the file size"""
+        products = list(self.catalogue.items())[:rows]
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Product', 'Quantity', 'Unit Price', 'SKU'])
+            for index, (product, unit_price) in enumerate(products, start=1):
+                sku = f"SKU-{product.upper().replace(' ', '-')}-{index:03d}"
+                writer.writerow([product, self.random.randint(0, 300), unit_price, sku])
+        return os.path.getsize(path)
+
+
+class ImportBenchmark:
+    """Run generated files through CSVParserService and InventoryUploadService
+
+    Every stage reports wall time and, unless disabled, peak traced memory;
+    import stages also report rows/sec and SQL queries per row. Queries are
+    counted with an execute wrapper, so nothing is kept per query. The
+    report is plain JSON-serialisable data meant to be compared across
+    commits. Runs against whatever database is active, the management
+    command sets up a fresh test database around it.
+    """
+
+    def __init__(self, work_dir: str, generator: BenchmarkDataGenerator, rows: int = 10000,
+                 inventory_rows: Optional[int] = None, batch_size: Optional[int] = None,
+                 trace_memory: bool = True) -> None:
+        """
+        Args:
+            work_dir: Directory the generated CSVs are written to
+            generator: Source of the generated files
+            rows: Transaction rows to import
+            inventory_rows: Stock list rows (defaults to one per product)
+            batch_size: Rows per bulk chunk for both services (defaults to their settings)
+            trace_memory: Track peak memory with tracemalloc, which slows the run down
+        """
+        self.work_dir = work_dir
+        self.generator = generator
+        self.rows = rows
+        self.inventory_rows = len(generator.catalogue) if inventory_rows is None else inventory_rows
+        self.batch_size = batch_size
+        self.trace_memory = trace_memory
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    def run(self) -> Dict[str, Any]:
+        """Run every stage and return the report"""
+        user = User.objects.create_user(username=f'benchmark-{timezone.now():%Y%m%d%H%M%S%f}')
+        business = Business.objects.create(owner=user, name='Benchmark Store', type='benchmark')
+
+        transactions_path = os.path.join(self.work_dir, 'transactions.csv')
+        inventory_path = os.path.join(self.work_dir, 'inventory.csv')
+
+        if self.trace_memory:
+            tracemalloc.start()
+        try:
+            with self._stage('generate'):
+                transactions_size = self.generator.write_transactions(transactions_path, self.rows)
+                inventory_size = self.generator.write_inventory(inventory_path, self.inventory_rows)
+            self.stages['generate'].update(transactions_bytes=transactions_size, inventory_bytes=inventory_size)
+
+            file_upload = FileUploadRecord.objects.create(
+                business=business, user=user, file_path=transactions_path,
+                original_filename='transactions.csv', file_size=transactions_size
+            )
+            with self._stage('transaction_import', rows=self.rows):
+                result = CSVParserService(file_upload, batch_size=self.batch_size).parse_csv()
+            self.stages['transaction_import']['result'] = {
+                key: result[key] for key in ('created_count', 'skipped_count', 'failed_count')
+            }
+
+            # The second upload of the same stock list only sees unchanged rows
+            for stage in ('inventory_import', 'inventory_reimport'):
+                inventory_upload = InventoryUploadRecord.objects.create(
+                    business=business, user=user, file_path=inventory_path,
+                    original_filename='inventory.csv', file_size=inventory_size
+                )
+                with self._stage(stage, rows=self.inventory_rows):
+                    result = InventoryUploadService(inventory_upload, batch_size=self.batch_size).process_csv()
+                self.stages[stage]['result'] = {
+                    key: result.get(key) for key in (
+                        'products_created', 'products_changed', 'products_unchanged', 'rows_failed'
+                    )
+                }
+        finally:
+            if self.trace_memory:
+                tracemalloc.stop()
+
+        return {
+            'generated_at': timezone.now().isoformat(),
+            'git_commit': self._git_commit(),
+            'database': connection.vendor,
+            'config': {
+                'rows': self.rows,
+                'inventory_rows': self.inventory_rows,
+                'products': len(self.generator.catalogue),
+                'customers': len(self.generator.customers),
+                'days': self.generator.days,
+                'error_rate': self.generator.error_rate,
+                'batch_size': self.batch_size,
+                'csv_import_batch_size': getattr(settings, 'CSV_IMPORT_BATCH_SIZE', 500),
+                'inventory_import_batch_size': getattr(settings, 'INVENTORY_IMPORT_BATCH_SIZE', 500),
+                'trace_memory': self.trace_memory,
+            },
+            'stages': self.stages,
+        }
+
+    @contextmanager
+    def _stage(self, name: str, rows: Optional[int] = None) -> Iterator[None]:
+        """Measure the wrapped block as stage `name`"""
+        queries = [0]
+
+        def count_queries(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        with connection.execute_wrapper(count_queries):
+            yield
+        wall_time = time.perf_counter() - started
+
+        stage: Dict[str, Any] = {'wall_time_s': round(wall_time, 4), 'queries': queries[0]}
+        if self.trace_memory:
+            stage['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+        if rows is not None:
+            stage['rows'] = rows
+            stage['rows_per_sec'] = round(rows / wall_time, 1) if wall_time else None
+            stage['queries_per_row'] = round(queries[0] / rows, 4) if rows else None
+        self.stages[name] = stage
+
+    @staticmethod
+    def _git_commit() -> Optional[str]:
+        """Commit the benchmarked code is at, None outside a git checkout"""
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True, timeout=10
+            ).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            return None
@@ -0,0 +1,106 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+from django.db import connection
+from django.db.models import Count, Exists, OuterRef, Q
+from .models import FileUploadRecord, Product, Customer
+
+logger = logging.getLogger(__name__)
+
+# Negative-stock products listed in the report, the total is always counted
+NEGATIVE_STOCK_REPORT_LIMIT = 20
+
+# Background verification, one at a time so it never competes with imports for connections
+_verification_executor = ThreadPoolExecutor(max_workers=1)
+
+
+class ImportVerificationService:
+    """Post-import consistency checks for a CSV upload
+
+    Runs a fixed number of aggregate queries whatever the size of the file:
+    one over the upload's transactions (cross-tenant rows, orphaned product
+    and customer references) and one for negative stock among the products
+    the upload sold. Issues are logged as warnings and returned.
+    """
+
+    def __init__(self, file_upload_record: FileUploadRecord) -> None:
+        self.file_upload = file_upload_record
+        self.business_id = file_upload_record.business_id
+
+    def verify(self) -> Dict[str, Any]:
+        """Run the checks
+
+        Returns:
+            Dictionary with issue counts and the first negative-stock products
+        """
+        logger.info("Verifying data consistency...")
+
+        transactions = self.file_upload.imported_transactions()
+        counts = transactions.aggregate(
+            cross_tenant_transactions=Count('pk', filter=(
+                ~Q(business_id=self.business_id)
+                | ~Q(product__business_id=self.business_id)
+                | (Q(customer__isnull=False) & ~Q(customer__business_id=self.business_id))
+            )),
+            orphaned_product_refs=Count('pk', filter=~Exists(
+                Product.objects.filter(pk=OuterRef('product_id'))
+            )),
+            orphaned_customer_refs=Count('pk', filter=Q(customer__isnull=False) & ~Exists(
+                Customer.objects.filter(pk=OuterRef('customer_id'))
+            )),
+        )
+
+        negative_stock = list(
+            Product.objects.filter(business_id=self.business_id, current_stock__lt=0)
+            .filter(Exists(transactions.filter(product_id=OuterRef('pk'))))
+            .order_by('current_stock')
+            .values('product_id', 'name', 'current_stock')[:NEGATIVE_STOCK_REPORT_LIMIT + 1]
+        )
+
+        if counts['cross_tenant_transactions']:
+            logger.warning(
+                f"Data consistency issue: {counts['cross_tenant_transactions']} transactions "
+                f"reference another business than upload"
+            )
+        if counts['orphaned_product_refs']:
+            logger.warning(
+                f"Data consistency issue: {counts['orphaned_product_refs']} transactions "
+                f"reference products that were not found"
+            )
+        if counts['orphaned_customer_refs']:
+            logger.warning(
+                f"Data consistency issue: {counts['orphaned_customer_refs']} transactions "
+                f"reference customers that were not found"
+            )
+        for product in negative_stock[:NEGATIVE_STOCK_REPORT_LIMIT]:
+            logger.warning(
+                f"Data consistency issue: Product {product['name']} "
+                f"(ID: {product['product_id']}) has negative stock: {product['current_stock']}"
+            )
+        if len(negative_stock) > NEGATIVE_STOCK_REPORT_LIMIT:
+            logger.warning(
+                f"Data consistency issue: more than {NEGATIVE_STOCK_REPORT_LIMIT} products have negative stock"
+            )
+
+        logger.info("Data consistency verification completed")
+        return {
+            **counts,
+            'negative_stock_products': negative_stock[:NEGATIVE_STOCK_REPORT_LIMIT],
+        }
+
+    @classmethod
+    def verify_in_background(cls, file_upload_id) -> None:
+        """Queue verification of a completed upload on the verification thread"""
+        _verification_executor.submit(cls._verify_upload, file_upload_id)
+
+    @classmethod
+    def _verify_upload(cls, file_upload_id) -> None:
+        """Background task, runs on its own database connection"""
+        try:
+            file_upload = FileUploadRecord.objects.get(file_id=file_upload_id)
+            cls(file_upload).verify()
+        except Exception as e:
+            logger.error(f"Error during data consistency verification: {e}")
+        finally:
+            connection.close()
@@ -2,8 +2,13 @@ import csv
 import io
 import logging
 from decimal import Decimal
+from django.conf import settings
 from django.db import transaction as db_transaction
+from django.db.models import F, Q
 from django.utils import timezone
+from .csv_stream import count_data_rows, iter_chunks, open_csv_stream
+from .product_index import invalidate_product_index
+from .progress import ProgressReporter
 from .models import (
     Product, InventoryUploadRecord, StockMovement, StockAlert,
     Transaction, Customer
@@ -15,10 +20,30 @@ logger = logging.getLogger(__name__)
 class InventoryUploadService:
     """Service to handle inventory CSV uploads"""
 
-    def __init__(self, inventory_upload):
+    # Products and alerts looked up per IN query
+    QUERY_BATCH_SIZE = 500
+
+    def __init__(self, inventory_upload, batch_size=None):
+        """
+        Args:
+            inventory_upload: InventoryUploadRecord to process
+            batch_size: Rows written per bulk chunk (defaults to INVENTORY_IMPORT_BATCH_SIZE,
+                a value of 1 falls back to row-by-row processing)
+        """
         self.inventory_upload = inventory_upload
         self.business = inventory_upload.business
+        if batch_size is None:
+            batch_size = getattr(settings, 'INVENTORY_IMPORT_BATCH_SIZE', 500)
+        self.batch_size = max(1, int(batch_size))
         self.errors = []
+        self.progress = ProgressReporter(
+            inventory_upload,
+            fields=[
+                'rows_processed', 'rows_failed', 'products_updated',
+                'products_created', 'products_changed', 'products_unchanged'
+            ]
+        )
+        self._alert_product_ids = set()  # Products written in bulk, alerts checked at the end
 
     def process_csv(self):
         """Main entry point to process inventory CSV"""
@@ -26,10 +51,13 @@ class InventoryUploadService:
             # Update status
             self.inventory_upload.status = 'processing'
             self.inventory_upload.processing_started_at = timezone.now()
+            # Cheap newline scan, the rows themselves are streamed below
+            self.inventory_upload.row_count = count_data_rows(self.inventory_upload.file_path)
             self.inventory_upload.save()
 
-            # Read and parse CSV
-            with open(self.inventory_upload.file_path, 'r', encoding='utf-8') as f:
+            # Read and parse CSV, .gz/.zip uploads are decompressed while reading
+            with io.TextIOWrapper(open_csv_stream(self.inventory_upload.file_path),
+                                  encoding='utf-8', newline='') as f:
                 reader = csv.DictReader(f)
 
                 if not reader.fieldnames:
@@ -38,28 +66,18 @@ class InventoryUploadService:
                 # Validate headers
                 self._validate_headers(reader.fieldnames)
 
-                # Process each row
-                for row_number, row in enumerate(reader, start=1):
-                    self.inventory_upload.row_count = row_number
-                    self.inventory_upload.save()
-
-                    try:
-                        self._process_row(row, row_number)
-                        self.inventory_upload.rows_processed = row_number
-                    except Exception as e:
-                        self.inventory_upload.rows_failed += 1
-                        error_msg = f"Row {row_number}: {str(e)}"
-                        self.errors.append({
-                            'row_number': row_number,
-                            'error': str(e),
-                            'data': row
-                        })
-                        logger.error(error_msg)
-
-                    self.inventory_upload.save()
+                # Process rows a chunk at a time
+                row_number = 0
+                for chunk in iter_chunks(enumerate(reader, start=1), self.batch_size):
+                    self._import_chunk(chunk)
+                    row_number = chunk[-1][0]
+
+            # Alerts of bulk written products, once for the whole upload
+            self._check_stock_alerts(self._alert_product_ids)
 
             # Mark as completed
             self.inventory_upload.status = 'completed'
+            self.inventory_upload.row_count = row_number  # Replace the estimate
             self.inventory_upload.processing_completed_at = timezone.now()
             self.inventory_upload.processing_errors = self.errors
             self.inventory_upload.save()
@@ -67,6 +85,9 @@ class InventoryUploadService:
             return {
                 'status': 'completed',
                 'products_updated': self.inventory_upload.products_updated,
+                'products_created': self.inventory_upload.products_created,
+                'products_changed': self.inventory_upload.products_changed,
+                'products_unchanged': self.inventory_upload.products_unchanged,
                 'rows_processed': self.inventory_upload.rows_processed,
                 'rows_failed': self.inventory_upload.rows_failed,
                 'errors': self.errors
@@ -89,8 +110,132 @@ class InventoryUploadService:
             if required.lower() not in headers_lower:
                 raise ValueError(f"Missing required column: {required}")
 
-    def _process_row(self, row, row_number):
-        """Process a single inventory row"""
+    def _import_chunk(self, chunk):
+        """Import a chunk of numbered rows, batched or row by row"""
+        if self.batch_size > 1:
+            self._process_chunk(chunk)
+        else:
+            for row_number, row in chunk:
+                self._import_row(row, row_number)
+
+        # One step per row keeps the flush cadence independent of the batch size.
+        # Errors stay in memory until completion
+        for _ in chunk:
+            self.progress.advance()
+
+    def _import_row(self, row, row_number):
+        """Process a single row, recording it as failed on error"""
+        try:
+            self._process_row(row, row_number)
+            self.inventory_upload.rows_processed = row_number
+        except Exception as e:
+            self._record_failed_row(row, row_number, e)
+
+    def _record_failed_row(self, row, row_number, error):
+        self.inventory_upload.rows_failed += 1
+        self.errors.append({
+            'row_number': row_number,
+            'error': str(error),
+            'data': row
+        })
+        logger.error(f"Row {row_number}: {str(error)}")
+
+    def _process_chunk(self, chunk):
+        """Validate a chunk of rows and write the valid ones in a single atomic block
+
+        If the bulk write fails the chunk is replayed row by row so errors are
+        still attributed to the offending rows.
+        """
+        parsed_rows = []
+        for row_number, row in chunk:
+            try:
+                parsed_rows.append((row_number, row, self._parse_row(row)))
+            except Exception as e:
+                self._record_failed_row(row, row_number, e)
+
+        if not parsed_rows:
+            return
+
+        try:
+            with db_transaction.atomic():
+                outcomes = self._write_chunk([parsed for _, _, parsed in parsed_rows])
+        except Exception as e:
+            logger.warning(f"Batch write failed, retrying {len(parsed_rows)} rows individually: {e}")
+            for row_number, row, _ in parsed_rows:
+                self._import_row(row, row_number)
+            return
+
+        self.inventory_upload.rows_processed = parsed_rows[-1][0]
+        for outcome in outcomes:
+            self._count_outcome(outcome)
+
+    def _write_chunk(self, parsed_rows):
+        """Create, update and record movements for a chunk of parsed rows, must run inside an atomic block
+
+        Rows matching the product's current stock, price and SKU write nothing.
+
+        Returns:
+            Outcome of each row: 'created', 'changed' or 'unchanged'
+        """
+        # Locked until the chunk commits, so stock_before and the unchanged check see current values
+        product_names = {parsed['product_name'] for parsed in parsed_rows}
+        products = {
+            product.name: product
+            for product in Product.objects.select_for_update().filter(business=self.business, name__in=product_names)
+        }
+
+        created = {}
+        changed = {}
+        stock_changed = set()
+        movements = []
+        outcomes = []
+        now = timezone.now()
+        for parsed in parsed_rows:
+            product_name = parsed['product_name']
+            quantity = parsed['quantity']
+            product = products.get(product_name)
+
+            if product is None:
+                product = Product(
+                    business=self.business,
+                    name=product_name,
+                    current_stock=quantity,
+                    unit_price=parsed['unit_price'],
+                    sku=parsed['sku'] or self._generate_sku(product_name)
+                )
+                products[product_name] = product
+                created[product_name] = product
+                movements.append(self._stock_movement(product, 'initial_load', 0, quantity))
+                outcomes.append('created')
+                continue
+
+            old_stock = product.current_stock
+            if not self._apply_row(product, parsed):
+                outcomes.append('unchanged')
+                continue
+            outcomes.append('changed')
+            product.updated_at = now  # bulk_update skips auto_now
+            if product_name not in created:
+                changed[product_name] = product
+            if quantity != old_stock:
+                stock_changed.add(product.product_id)
+                movements.append(self._stock_movement(product, 'adjustment', old_stock, quantity))
+
+        Product.objects.bulk_create(created.values(), batch_size=self.batch_size)
+        if created:
+            invalidate_product_index(self.business.id)
+        Product.objects.bulk_update(
+            changed.values(), ['current_stock', 'unit_price', 'sku', 'updated_at'], batch_size=self.batch_size
+        )
+        StockMovement.objects.bulk_create(movements, batch_size=self.batch_size)
+
+        # A price or SKU change leaves the alert state as it is
+        self._alert_product_ids.update(product.product_id for product in created.values())
+        self._alert_product_ids.update(stock_changed)
+        return outcomes
+
+    def _parse_row(self, row):
+        """Validate an inventory row into product name, quantity, unit price and SKU"""
         # Extract fields
         product_name = row.get('Product', '').strip()
         quantity_str = row.get('Quantity', '').strip()
@@ -115,63 +260,135 @@ class InventoryUploadService:
         except Exception:
             raise ValueError(f"Invalid unit price: {unit_price_str}")
 
+        return {
+            'product_name': product_name,
+            'quantity': quantity,
+            'unit_price': unit_price,
+            'sku': sku,
+        }
+
+    @staticmethod
+    def _apply_row(product, parsed):
+        """Set an existing product's stock, price and SKU from a parsed row
+
+        Returns:
+            Whether any of them differed from the product's current values
+        """
+        unit_price = parsed['unit_price'] if parsed['unit_price'] > 0 else product.unit_price
+        sku = parsed['sku'] or product.sku
+        if (product.current_stock, product.unit_price, product.sku) == (parsed['quantity'], unit_price, sku):
+            return False
+
+        product.current_stock = parsed['quantity']
+        product.unit_price = unit_price
+        product.sku = sku
+        return True
+
+    def _count_outcome(self, outcome):
+        """Add a row to the created, changed or unchanged product counters
+
+        products_updated counts the rows that wrote their product, unchanged
+        rows are only reported in products_unchanged.
+        """
+        field = f'products_{outcome}'
+        setattr(self.inventory_upload, field, getattr(self.inventory_upload, field) + 1)
+        if outcome != 'unchanged':
+            self.inventory_upload.products_updated += 1
+
+    def _stock_movement(self, product, movement_type, stock_before, stock_after):
+        """Unsaved StockMovement of this upload"""
+        return StockMovement(
+            business=self.business,
+            product=product,
+            movement_type=movement_type,
+            quantity_changed=stock_after - stock_before,
+            stock_before=stock_before,
+            stock_after=stock_after,
+            reference_type='inventory_upload',
+            reference_id=str(self.inventory_upload.record_id),
+            created_by=self.inventory_upload.user
+        )
+
+    def _process_row(self, row, row_number):
+        """Process a single inventory row"""
+        parsed = self._parse_row(row)
+        quantity = parsed['quantity']
+
         # Get or create product
         product, created = Product.objects.get_or_create(
             business=self.business,
-            name=product_name,
+            name=parsed['product_name'],
             defaults={
                 'current_stock': quantity,
-                'unit_price': unit_price,
-                'sku': sku if sku else self._generate_sku(product_name)
+                'unit_price': parsed['unit_price'],
+                'sku': parsed['sku'] if parsed['sku'] else self._generate_sku(parsed['product_name'])
             }
         )
 
         if not created:
             # Update existing product - record the movement
             old_stock = product.current_stock
-            product.current_stock = quantity
-            product.unit_price = unit_price if unit_price > 0 else product.unit_price
-            if sku:
-                product.sku = sku
+            if not self._apply_row(product, parsed):
+                # Same as the current state, nothing to write
+                self._count_outcome('unchanged')
+                return
             product.save()
 
             # Record stock movement
-            quantity_changed = quantity - old_stock
-            StockMovement.objects.create(
-                business=self.business,
-                product=product,
-                movement_type='adjustment',
-                quantity_changed=quantity_changed,
-                stock_before=old_stock,
-                stock_after=quantity,
-                reference_type='inventory_upload',
-                reference_id=str(self.inventory_upload.record_id),
-                created_by=self.inventory_upload.user
-            )
+            if quantity != old_stock:
+                self._stock_movement(product, 'adjustment', old_stock, quantity).save()
+                self._check_stock_alert(product)
+            self._count_outcome('changed')
         else:
             # Record initial load
-            StockMovement.objects.create(
-                business=self.business,
-                product=product,
-                movement_type='initial_load',
-                quantity_changed=quantity,
-                stock_before=0,
-                stock_after=quantity,
-                reference_type='inventory_upload',
-                reference_id=str(self.inventory_upload.record_id),
-                created_by=self.inventory_upload.user
-            )
-
-        # Check for alerts
-        self._check_stock_alert(product)
-
-        self.inventory_upload.products_updated += 1
+            self._stock_movement(product, 'initial_load', 0, quantity).save()
+            self._check_stock_alert(product)
+            self._count_outcome('created')
 
     def _generate_sku(self, product_name):
         """Generate SKU from product name"""
         import uuid
         return f"SKU-{uuid.uuid4().hex[:8].upper()}"
 
+    def _check_stock_alerts(self, product_ids):
+        """Create or refresh alerts for many products, a few queries per QUERY_BATCH_SIZE products"""
+        for batch in iter_chunks(product_ids, self.QUERY_BATCH_SIZE):
+            products = {
+                product.product_id: product
+                for product in Product.objects.filter(business=self.business, product_id__in=batch).filter(
+                    Q(current_stock=0) | Q(current_stock__lte=F('reorder_point'))
+                )
+            }
+            if not products:
+                continue
+
+            alert_types = {
+                product_id: 'out_of_stock' if product.current_stock == 0 else 'low_stock'
+                for product_id, product in products.items()
+            }
+            alerts = []
+            alerted = set()
+            for alert in StockAlert.objects.filter(business=self.business, product_id__in=products):
+                if alert_types[alert.product_id] == alert.alert_type:
+                    alert.current_stock = products[alert.product_id].current_stock
+                    alert.is_acknowledged = False
+                    alerts.append(alert)
+                    alerted.add(alert.product_id)
+            StockAlert.objects.bulk_update(alerts, ['current_stock', 'is_acknowledged'])
+
+            StockAlert.objects.bulk_create([
+                StockAlert(
+                    business=self.business,
+                    product=product,
+                    alert_type=alert_types[product_id],
+                    threshold=0 if alert_types[product_id] == 'out_of_stock' else product.reorder_point,
+                    current_stock=product.current_stock,
+                    is_acknowledged=False
+                )
+                for product_id, product in products.items()
+                if product_id not in alerted
+            ])
+
     def _check_stock_alert(self, product):
         """Check and create stock alerts if needed"""
         if product.current_stock == 0:
@@ -431,10 +648,11 @@ class InventoryReportService:
         """Generate comprehensive inventory report"""
         from django.db.models import Sum, Count, Q
 
-        products = Product.objects.filter(business=self.business)
+        # One query, the totals are computed from the same rows
+        products = list(Product.objects.filter(business=self.business).order_by('-current_stock'))
 
         # Calculate totals
-        total_products = products.count()
+        total_products = len(products)
         total_stock_value = sum(
             p.current_stock * p.unit_price for p in products
         )
@@ -449,7 +667,7 @@ class InventoryReportService:
 
         # Products by stock level
         products_by_stock = []
-        for product in products.order_by('-current_stock'):
+        for product in products:
             products_by_stock.append({
                 'product_id': str(product.product_id),
                 'name': product.name,
@@ -0,0 +1,95 @@
+import json
+import shutil
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, teardown_databases
+
+from data.import_benchmark import (
+    DEFAULT_INVENTORY_SAMPLE, DEFAULT_TRANSACTION_SAMPLE, BenchmarkDataGenerator, ImportBenchmark
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the transaction and inventory CSV imports on generated files in a fresh test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Transaction rows (default: 10000)')
+        parser.add_argument(
+            '--inventory-rows', type=int,
+            help='Stock list rows (default: one per product)'
+        )
+        parser.add_argument('--products', type=int, default=200, help='Distinct products (default: 200)')
+        parser.add_argument('--customers', type=int, default=500, help='Distinct named customers (default: 500)')
+        parser.add_argument('--days', type=int, default=90, help='Days the sales are spread over (default: 90)')
+        parser.add_argument(
+            '--error-rate', type=float, default=0.0,
+            help='Fraction of transaction rows made invalid (default: 0)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int,
+            help='Rows per bulk chunk for both imports (default: CSV_IMPORT_BATCH_SIZE / INVENTORY_IMPORT_BATCH_SIZE)'
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+        parser.add_argument(
+            '--transaction-sample', default=str(DEFAULT_TRANSACTION_SAMPLE),
+            help='Transaction CSV the generated rows are modelled on'
+        )
+        parser.add_argument(
+            '--inventory-sample', default=str(DEFAULT_INVENTORY_SAMPLE),
+            help='Inventory CSV the generated stock list is modelled on'
+        )
+        parser.add_argument(
+            '--no-memory', action='store_true',
+            help='Skip tracemalloc peak memory tracking, which slows the imports down'
+        )
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+        parser.add_argument('--keep-files', action='store_true', help='Keep the generated CSV files')
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['products'] < 1:
+            raise CommandError('--rows and --products must be at least 1')
+
+        try:
+            generator = BenchmarkDataGenerator(
+                options['transaction_sample'],
+                options['inventory_sample'],
+                products=options['products'],
+                customers=options['customers'],
+                days=options['days'],
+                error_rate=options['error_rate'],
+                seed=options['seed'],
+            )
+        except (OSError, KeyError, ValueError) as e:
+            raise CommandError(f'Cannot read sample files: {e}')
+
+        work_dir = tempfile.mkdtemp(prefix='import-benchmark-')
+        self.stderr.write(f'Generating files in {work_dir}')
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+        try:
+            report = ImportBenchmark(
+                work_dir,
+                generator,
+                rows=options['rows'],
+                inventory_rows=options['inventory_rows'],
+                batch_size=options['batch_size'],
+                trace_memory=not options['no_memory'],
+            ).run()
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            if not options['keep_files']:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+        for name, stage in report['stages'].items():
+            summary = f"  {name}: {stage['wall_time_s']}s, {stage['queries']} queries"
+            if 'rows_per_sec' in stage:
+                summary += f", {stage['rows_per_sec']} rows/s, {stage['queries_per_row']} queries/row"
+            self.stderr.write(summary)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+        else:
+            self.stdout.write(output)
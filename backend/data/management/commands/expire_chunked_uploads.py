@@ -0,0 +1,46 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from data.models import ChunkedUploadSession
+
+
+class Command(BaseCommand):
+    help = 'Fail chunked uploads that stopped receiving chunks and delete their partial files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours', type=int, default=None,
+            help='Expire uploads idle for this many hours (default: CSV_UPLOAD_SESSION_EXPIRY_HOURS)'
+        )
+
+    def handle(self, *args, **options):
+        hours = options['hours']
+        if hours is None:
+            hours = getattr(settings, 'CSV_UPLOAD_SESSION_EXPIRY_HOURS', 24)
+        cutoff = timezone.now() - timedelta(hours=hours)
+
+        # A finalize that died mid-hash leaves the session in finalizing
+        stale = Q(status__in=['uploading', 'finalizing'], updated_at__lt=cutoff)
+        sessions = list(ChunkedUploadSession.objects.filter(stale))
+        self.stdout.write(f"Uploads to expire: {len(sessions)}")
+
+        expired = 0
+        for session in sessions:
+            # Conditional so a chunk that just arrived keeps the upload alive
+            if not ChunkedUploadSession.objects.filter(stale, pk=session.pk).update(
+                status='failed', updated_at=timezone.now()
+            ):
+                continue
+            try:
+                os.remove(session.file_path)
+            except FileNotFoundError:
+                pass
+            expired += 1
+            self.stdout.write(f"  {session.original_filename} ({session.upload_id})")
+
+        self.stdout.write(self.style.SUCCESS(f"Expired {expired} uploads"))
@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from data.models import FileUploadRecord
+from data.services import CSVParserService
+
+
+class Command(BaseCommand):
+    help = 'Resume CSV imports left in processing by a recycled worker, from their last checkpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-minutes', type=int, default=10,
+            help='Only resume imports without a checkpoint for this many minutes (default: 10)'
+        )
+        parser.add_argument(
+            '--include-failed', action='store_true',
+            help='Also resume failed imports that committed at least one chunk'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options['stale_minutes'])
+
+        # Checkpoint time when a chunk was committed, otherwise the start time
+        stalled = Q(status='processing') & (
+            Q(checkpoint_at__lt=cutoff) | Q(checkpoint_at__isnull=True, processing_started_at__lt=cutoff)
+        )
+        if options['include_failed']:
+            stalled |= Q(status='failed', checkpoint_chunk__gt=0)
+
+        uploads = list(FileUploadRecord.objects.filter(stalled).select_related('business'))
+        self.stdout.write(f"Imports to resume: {len(uploads)}")
+
+        for file_upload in uploads:
+            if not self._claim(file_upload, stalled):
+                self.stdout.write(
+                    f"  {file_upload.original_filename} ({file_upload.file_id}) picked up elsewhere, skipped"
+                )
+                continue
+            self.stdout.write(
+                f"  {file_upload.original_filename} ({file_upload.file_id}) "
+                f"from chunk {file_upload.checkpoint_chunk}"
+            )
+            result = CSVParserService(file_upload).parse_csv()
+            file_upload.refresh_from_db(fields=['status'])
+            if file_upload.status == 'completed':
+                self.stdout.write(self.style.SUCCESS(
+                    f"    completed: {result['created_count']} created, {result['failed_count']} failed"
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(f"    failed: {result['errors'][0]['error']}"))
+
+    def _claim(self, file_upload, stalled):
+        """Take over an upload that is still stalled, False when a worker or another run got to it first
+
+        The conditional UPDATE only matches while the upload is stalled, and
+        moves its checkpoint time to now so it no longer is for anyone else.
+        """
+        now = timezone.now()
+        claimed = FileUploadRecord.objects.filter(stalled, pk=file_upload.pk).update(
+            status='processing', checkpoint_at=now
+        )
+        if claimed:
+            file_upload.status = 'processing'
+            file_upload.checkpoint_at = now
+        return bool(claimed)
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0005_inventoryuploadrecord_stockalert_stockmovement'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileuploadrecord',
+            name='checkpoint_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='fileuploadrecord',
+            name='checkpoint_chunk',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='fileuploadrecord',
+            name='checkpoint_offset',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
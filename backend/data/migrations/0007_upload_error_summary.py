@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('data', '0006_fileuploadrecord_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileuploadrecord',
+            name='error_counts',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddIndex(
+            model_name='failedjob',
+            index=models.Index(fields=['file_upload', 'row_number'], name='data_failed_file_up_ce6abf_idx'),
+        ),
+    ]
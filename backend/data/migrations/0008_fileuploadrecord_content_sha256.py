@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('data', '0007_upload_error_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileuploadrecord',
+            name='content_sha256',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='fileuploadrecord',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reuploads', to='data.fileuploadrecord'),
+        ),
+        migrations.AddIndex(
+            model_name='fileuploadrecord',
+            index=models.Index(fields=['business', 'content_sha256'], name='data_fileup_busines_e5d356_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0009_chunkeduploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventoryuploadrecord',
+            name='products_changed',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='inventoryuploadrecord',
+            name='products_created',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='inventoryuploadrecord',
+            name='products_unchanged',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('data', '0010_inventoryuploadrecord_product_counts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='receiptuploadrecord',
+            name='duplicate_distance',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='receiptuploadrecord',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reuploads', to='data.receiptuploadrecord'),
+        ),
+        migrations.AddField(
+            model_name='receiptuploadrecord',
+            name='image_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='receiptuploadrecord',
+            index=models.Index(fields=['business', 'image_hash'], name='data_receip_busines_6876ff_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:21
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('data', '0011_receiptuploadrecord_image_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReceiptBatch',
+            fields=[
+                ('batch_id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('processing', 'Processing'), ('completed', 'Completed')], default='processing', max_length=20)),
+                ('receipt_count', models.IntegerField(default=0)),
+                ('receipts_finished', models.IntegerField(default=0)),
+                ('created_transactions', models.IntegerField(default=0)),
+                ('rejected_files', models.JSONField(blank=True, default=list)),
+                ('affected_products', models.JSONField(blank=True, default=list)),
+                ('affected_customers', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('business', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receipt_batches', to='accounts.business')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='receipt_batches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='receiptuploadrecord',
+            name='batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='receipts', to='data.receiptbatch'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('data', '0012_receiptbatch'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='receiptuploadrecord',
+            name='content_sha256',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='receiptuploadrecord',
+            index=models.Index(fields=['business', 'content_sha256'], name='data_receip_busines_9662de_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0013_receiptuploadrecord_content_sha256'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='receipt_upload',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='data.receiptuploadrecord'),
+        ),
+    ]
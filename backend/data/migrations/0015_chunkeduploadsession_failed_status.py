@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0014_transaction_receipt_upload'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='chunkeduploadsession',
+            name='status',
+            field=models.CharField(choices=[('uploading', 'Uploading'), ('finalizing', 'Finalizing'), ('completed', 'Completed'), ('failed', 'Failed')], default='uploading', max_length=20),
+        ),
+    ]
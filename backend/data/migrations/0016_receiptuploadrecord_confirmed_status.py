@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0015_chunkeduploadsession_failed_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='receiptuploadrecord',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('confirmed', 'Confirmed'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+    ]
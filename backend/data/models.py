@@ -1,3 +1,4 @@
+import os
 import uuid
 from django.db import models
 from django.contrib.auth.models import User
@@ -16,12 +17,21 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Name as last read or saved, product_index uses it to notice renames
+    loaded_name = None
+
     class Meta:
         unique_together = ('business', 'name')
 
     def __str__(self):
         return f"{self.name} ({self.business.name})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.loaded_name = instance.__dict__.get('name')
+        return instance
+
 
 class Customer(models.Model):
     """Customer records for a business"""
@@ -74,6 +84,8 @@ class Transaction(models.Model):
 
     # Track which file upload this came from
     file_upload = models.ForeignKey('FileUploadRecord', on_delete=models.SET_NULL, null=True, blank=True, related_name='transactions')
+    # Receipt whose line this is, confirming the receipt replaces its lines
+    receipt_upload = models.ForeignKey('ReceiptUploadRecord', on_delete=models.SET_NULL, null=True, blank=True, related_name='transactions')
 
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -105,6 +117,11 @@ class FileUploadRecord(models.Model):
     file_path = models.CharField(max_length=500)
     original_filename = models.CharField(max_length=255)
     file_size = models.BigIntegerField()
+    content_sha256 = models.CharField(max_length=64, blank=True, null=True)  # Whole-file fingerprint
+    # Earlier upload of the same bytes whose results this upload reuses
+    duplicate_of = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name='reuploads'
+    )
 
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
 
@@ -113,8 +130,14 @@ class FileUploadRecord(models.Model):
     rows_failed = models.IntegerField(default=0)
     created_transactions = models.IntegerField(default=0)
 
+    # Last committed chunk, an interrupted import resumes after it
+    checkpoint_chunk = models.IntegerField(default=0)
+    checkpoint_offset = models.BigIntegerField(default=0)  # Byte offset right after the chunk
+    checkpoint_at = models.DateTimeField(blank=True, null=True)
+
     error_message = models.TextField(blank=True, null=True)
-    processing_errors = models.JSONField(default=list, blank=True)  # Store per-row errors
+    processing_errors = models.JSONField(default=list, blank=True)  # First CSV_ERROR_SUMMARY_LIMIT row errors
+    error_counts = models.JSONField(default=dict, blank=True)  # Failed rows per error type, details in FailedJob
 
     uploaded_at = models.DateTimeField(auto_now_add=True)
     processing_started_at = models.DateTimeField(blank=True, null=True)
@@ -122,10 +145,17 @@ class FileUploadRecord(models.Model):
 
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            models.Index(fields=['business', 'content_sha256']),
+        ]
 
     def __str__(self):
         return f"{self.original_filename} ({self.status})"
 
+    def imported_transactions(self):
+        """Transactions this upload stands for, a re-upload's are the original upload's"""
+        return Transaction.objects.filter(file_upload_id=self.duplicate_of_id or self.file_id)
+
 
 class FailedJob(models.Model):
     """Track failed CSV rows for debugging and retry"""
@@ -140,17 +170,134 @@ class FailedJob(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = "Failed Jobs"
+        indexes = [
+            models.Index(fields=['file_upload', 'row_number']),
+        ]
 
     def __str__(self):
         return f"Failed row {self.row_number} from {self.file_upload.original_filename}"
 
 
+class ChunkedUploadSession(models.Model):
+    """Resumable upload of a large CSV or Parquet file sent in fixed-size chunks"""
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('finalizing', 'Finalizing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    upload_id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    business = models.ForeignKey(Business, on_delete=models.CASCADE, related_name='chunked_uploads')
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='chunked_uploads')
+
+    original_filename = models.CharField(max_length=255)
+    file_path = models.CharField(max_length=500)  # Partial file, chunks are written at their offset
+    total_size = models.BigIntegerField()
+    chunk_size = models.IntegerField()
+    received_ranges = models.JSONField(default=list, blank=True)  # Merged [start, end) byte ranges
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    file_upload = models.OneToOneField(
+        FileUploadRecord, on_delete=models.SET_NULL, null=True, blank=True, related_name='chunked_upload'
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.original_filename} ({self.status})"
+
+    @property
+    def total_chunks(self):
+        """Number of chunks, the last one may be shorter"""
+        return max((self.total_size + self.chunk_size - 1) // self.chunk_size, 1)
+
+    @property
+    def bytes_received(self):
+        """Bytes written so far, chunks can arrive in any order"""
+        return sum(end - start for start, end in self.received_ranges)
+
+    def chunk_range(self, index):
+        """Byte range [start, end) of chunk `index`"""
+        start = index * self.chunk_size
+        return start, min(start + self.chunk_size, self.total_size)
+
+    def add_range(self, start, end):
+        """Merge a received byte range into received_ranges"""
+        ranges = sorted(self.received_ranges + [[start, end]])
+        merged = [ranges[0]]
+        for range_start, range_end in ranges[1:]:
+            if range_start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], range_end)
+            else:
+                merged.append([range_start, range_end])
+        self.received_ranges = merged
+
+    def missing_chunks(self):
+        """Indexes of chunks not fully received yet"""
+        missing = []
+        for index in range(self.total_chunks):
+            chunk_start, chunk_end = self.chunk_range(index)
+            if not any(start <= chunk_start and chunk_end <= end for start, end in self.received_ranges):
+                missing.append(index)
+        return missing
+
+    def is_complete(self):
+        """Every byte of the file has been received"""
+        return self.received_ranges == [[0, self.total_size]]
+
+    def discard(self):
+        """Mark the upload failed and delete its partial file"""
+        try:
+            os.remove(self.file_path)
+        except FileNotFoundError:
+            pass
+        self.status = 'failed'
+        self.save(update_fields=['status', 'updated_at'])
+
+
+class ReceiptBatch(models.Model):
+    """Receipt images uploaded in one request, downstream processing runs once for the whole batch"""
+    STATUS_CHOICES = [
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+    ]
+
+    batch_id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    business = models.ForeignKey(Business, on_delete=models.CASCADE, related_name='receipt_batches')
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='receipt_batches')
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='processing')
+    receipt_count = models.IntegerField(default=0)  # Accepted images
+    receipts_finished = models.IntegerField(default=0)  # Completed or failed
+    created_transactions = models.IntegerField(default=0)
+    rejected_files = models.JSONField(default=list, blank=True)  # [{file_name, error}], never processed
+
+    # Collected from every receipt for the single transaction.parsed event
+    affected_products = models.JSONField(default=list, blank=True)
+    affected_customers = models.JSONField(default=list, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Receipt batch {self.batch_id} ({self.status})"
+
+
 class ReceiptUploadRecord(models.Model):
     """Track receipt image uploads and their OCR processing status"""
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('processing', 'Processing'),
         ('completed', 'Completed'),
+        ('confirmed', 'Confirmed'),
         ('failed', 'Failed'),
     ]
 
@@ -161,6 +308,16 @@ class ReceiptUploadRecord(models.Model):
     file_path = models.CharField(max_length=500)
     original_filename = models.CharField(max_length=255)
     file_size = models.BigIntegerField()
+    content_sha256 = models.CharField(max_length=64, blank=True, null=True)  # Whole-file fingerprint
+    image_hash = models.CharField(max_length=64, blank=True, null=True)  # Perceptual hash, hex
+    # Earlier receipt with the same bytes whose OCR result was reused, or that looks alike and is flagged
+    duplicate_of = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name='reuploads'
+    )
+    duplicate_distance = models.IntegerField(blank=True, null=True)  # Differing hash bits
+    batch = models.ForeignKey(
+        ReceiptBatch, on_delete=models.SET_NULL, null=True, blank=True, related_name='receipts'
+    )
 
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
 
@@ -175,6 +332,10 @@ class ReceiptUploadRecord(models.Model):
 
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            models.Index(fields=['business', 'image_hash']),
+            models.Index(fields=['business', 'content_sha256']),
+        ]
 
     def __str__(self):
         return f"{self.original_filename} ({self.status})"
@@ -203,6 +364,9 @@ class InventoryUploadRecord(models.Model):
     rows_processed = models.IntegerField(default=0)
     rows_failed = models.IntegerField(default=0)
     products_updated = models.IntegerField(default=0)
+    products_created = models.IntegerField(default=0)
+    products_changed = models.IntegerField(default=0)  # Stock, price or SKU differed
+    products_unchanged = models.IntegerField(default=0)  # Matched current state, nothing written
 
     error_message = models.TextField(blank=True, null=True)
     processing_errors = models.JSONField(default=list, blank=True)
@@ -0,0 +1,213 @@
+import csv
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .csv_stream import compression_for, count_data_rows, is_parquet, split_line_ranges
+from .progress import ProgressReporter
+
+# Models are imported inside functions: worker processes unpickle references to
+# this module before django.setup() has run in them.
+
+logger = logging.getLogger(__name__)
+
+# Ranges per worker, smaller ranges even out rows that are slower to import
+RANGES_PER_WORKER = 4
+
+
+def use_parallel_import(file_upload) -> bool:
+    """Check whether an upload is large enough for the multi-process import"""
+    workers = getattr(settings, 'CSV_IMPORT_WORKERS', 1)
+    if workers <= 1 or file_upload.checkpoint_chunk > 0:
+        # Interrupted serial imports resume serially from their checkpoint
+        return False
+    if not os.path.exists(file_upload.file_path):
+        return False
+    if compression_for(file_upload.file_path) or is_parquet(file_upload.file_path):
+        # Compressed streams and Parquet cannot be split into line-aligned byte ranges
+        return False
+    return count_data_rows(file_upload.file_path) >= getattr(settings, 'CSV_PARALLEL_MIN_ROWS', 100000)
+
+
+def _init_worker() -> None:
+    """Set up Django in a freshly spawned worker process"""
+    import django
+
+    django.setup()
+
+
+def _make_parser(file_upload_id, batch_size: Optional[int], engine: Optional[str]):
+    from .models import FileUploadRecord
+    from .services import CSVParserService
+
+    file_upload = FileUploadRecord.objects.select_related('business', 'user').get(file_id=file_upload_id)
+    return CSVParserService(file_upload, batch_size=batch_size, engine=engine)
+
+
+def scan_range(file_upload_id, fieldnames: List[str], start: int, end: int,
+               batch_size: Optional[int], engine: Optional[str]) -> Dict[str, Any]:
+    """Worker task: validate a byte range, see CSVParserService.scan_range"""
+    return _make_parser(file_upload_id, batch_size, engine).scan_range(fieldnames, start, end)
+
+
+def import_range(file_upload_id, fieldnames: List[str], start: int, end: int, first_row_num: int,
+                 claimed_hashes: List[str], batch_size: Optional[int], engine: Optional[str]) -> Dict[str, Any]:
+    """Worker task: import a byte range and return its counters"""
+    parser = _make_parser(file_upload_id, batch_size, engine)
+    parser.import_range(fieldnames, start, end, first_row_num, claimed_hashes)
+    return {
+        'processed_rows': parser.processed_rows,
+        'failed_rows': parser.failed_rows,
+        'created_transactions': parser.created_transactions,
+        'skipped_duplicates': parser.skipped_duplicates,
+        'errors': parser.errors,
+        'error_counts': parser.error_counts,
+        'affected_products': parser.affected_products,
+        'affected_customers': parser.affected_customers,
+    }
+
+
+class ParallelCSVImporter:
+    """Import a large transaction CSV with a pool of worker processes
+
+    The file is split into byte ranges aligned to line boundaries. Workers
+    first validate their ranges without writing; the parent then creates every
+    referenced Product and Customer in one pass, so workers never race on
+    creating them, and hands each range the row hashes already claimed by an
+    earlier range so cross-range duplicates are skipped like in a serial
+    import. Workers then import their ranges in batched chunks, and the
+    consistency check and transaction.parsed event run once at the end.
+
+    Files with quoted fields spanning several lines cannot be split on line
+    boundaries and are imported serially.
+    """
+
+    def __init__(self, file_upload_record, workers: Optional[int] = None, batch_size: Optional[int] = None,
+                 engine: Optional[str] = None) -> None:
+        """
+        Args:
+            file_upload_record: Upload to import
+            workers: Worker processes (defaults to CSV_IMPORT_WORKERS, 1 runs every range in-process)
+            batch_size: Rows written per bulk chunk, see CSVParserService
+            engine: Chunk validation engine, see CSVParserService
+        """
+        from .services import CSVParserService
+
+        self.file_upload = file_upload_record
+        self.workers = max(1, workers or getattr(settings, 'CSV_IMPORT_WORKERS', 1))
+        if connection.vendor == 'sqlite':
+            # SQLite allows a single writer, concurrent workers would only hit "database is locked"
+            self.workers = 1
+        self.batch_size = batch_size
+        self.engine = engine
+        # Parent side: header validation, up-front creation, totals and the final event
+        self.parser = CSVParserService(file_upload_record, batch_size=batch_size, engine=engine)
+        self.progress = ProgressReporter(
+            file_upload_record, fields=['rows_processed', 'rows_failed', 'created_transactions']
+        )
+
+    def run(self) -> Dict[str, Any]:
+        """Import the file, returning the same result dictionary as CSVParserService.parse_csv"""
+        parser = self.parser
+        try:
+            file_path = self.file_upload.file_path
+            if not os.path.exists(file_path):
+                raise FileNotFoundError(f"File not found: {file_path}")
+
+            logger.info(f"Parallel CSV upload started: file_id={self.file_upload.file_id}, "
+                        f"workers={self.workers}, filename={self.file_upload.original_filename}")
+
+            self.file_upload.status = 'processing'
+            self.file_upload.processing_started_at = timezone.now()
+            self.file_upload.row_count = count_data_rows(file_path)
+            self.file_upload.error_message = None
+            self.file_upload.save()
+
+            fieldnames, body_start = self._read_header(file_path)
+            parser._validate_headers(fieldnames)
+            ranges = split_line_ranges(file_path, body_start, self.workers * RANGES_PER_WORKER)
+
+            if self.workers > 1:
+                # Spawned workers start clean and open their own database connections
+                with ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context('spawn'),
+                                         initializer=_init_worker) as pool:
+                    split = self._import_ranges(pool.map, fieldnames, ranges)
+            else:
+                split = self._import_ranges(map, fieldnames, ranges)
+
+            if not split:
+                logger.warning(f"CSV upload {self.file_upload.file_id} has multi-line fields, importing serially")
+                return parser.parse_csv()
+
+            return parser._complete()
+
+        except Exception as e:
+            return parser._fail(e)
+
+    def _read_header(self, file_path: str) -> Tuple[Optional[List[str]], int]:
+        """Read the header line, returning the field names and the offset of the first row"""
+        with open(file_path, 'rb') as f:
+            header_line = f.readline()
+        fieldnames = next(csv.reader([header_line.decode('utf-8')]), None)
+        return fieldnames, len(header_line)
+
+    def _import_ranges(self, map_fn: Callable, fieldnames: List[str],
+                       ranges: List[Tuple[int, int, int]]) -> bool:
+        """Validate, prepare and import every range, returning False if the file cannot be split"""
+        parser = self.parser
+        count = len(ranges)
+        file_ids = [self.file_upload.file_id] * count
+        starts = [start for start, _, _ in ranges]
+        ends = [end for _, end, _ in ranges]
+
+        scans = list(map_fn(
+            scan_range, file_ids, [fieldnames] * count, starts, ends,
+            [self.batch_size] * count, [self.engine] * count
+        ))
+        if any(scan['multiline'] for scan in scans):
+            return False
+
+        # Ranges are in file order, so the first occurrence wins like in a serial import
+        unit_prices = {}
+        customer_names = set()
+        seen_hashes = set()
+        claimed_hashes = []
+        for scan in scans:
+            for name, unit_price in scan['products'].items():
+                unit_prices.setdefault(name, unit_price)
+            customer_names.update(scan['customers'])
+            claimed_hashes.append([row_hash for row_hash in scan['row_hashes'] if row_hash in seen_hashes])
+            seen_hashes.update(scan['row_hashes'])
+        del scans, seen_hashes
+
+        parser._ensure_products(unit_prices)
+        parser._ensure_customers(customer_names)
+
+        # Start at 2 (header is row 1)
+        first_rows = [2 + lines_before for _, _, lines_before in ranges]
+        results = map_fn(
+            import_range, file_ids, [fieldnames] * count, starts, ends, first_rows, claimed_hashes,
+            [self.batch_size] * count, [self.engine] * count
+        )
+        for result in results:
+            parser.processed_rows += result['processed_rows']
+            parser.failed_rows += result['failed_rows']
+            parser.created_transactions += result['created_transactions']
+            parser.skipped_duplicates += result['skipped_duplicates']
+            parser.add_error_summary(result['errors'], result['error_counts'])
+            parser.affected_products.update(result['affected_products'])
+            parser.affected_customers.update(result['affected_customers'])
+            self.progress.advance(
+                result['processed_rows'] + result['failed_rows'],
+                rows_processed=parser.processed_rows,
+                rows_failed=parser.failed_rows,
+                created_transactions=parser.created_transactions
+            )
+
+        return True
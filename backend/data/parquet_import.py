@@ -0,0 +1,66 @@
+from typing import Any, Dict, Iterable, Iterator, List, Union
+
+import pyarrow.parquet as pq
+
+
+class ParquetTransactionReader:
+    """Read a transaction export in Parquet record batches
+
+    Columns are matched case-insensitively to the canonical CSV field names
+    and yielded as row dictionaries keyed by those names. Values keep their
+    Parquet types (date, int, Decimal, ...), CSVParserService._parse_row
+    accepts them without converting through strings. Only the matched
+    columns are read from the file.
+    """
+
+    def __init__(self, source: Union[str, Any], fields: Iterable[str]) -> None:
+        """
+        Args:
+            source: Path or binary file object of the Parquet file
+            fields: Canonical column names (REQUIRED_COLUMNS | OPTIONAL_COLUMNS)
+        """
+        self.file = pq.ParquetFile(source)
+        self.fieldnames: List[str] = list(self.file.schema_arrow.names)
+        self.columns: Dict[str, str] = {}
+        for field in sorted(fields):
+            for name in self.fieldnames:
+                if name.strip().lower() == field.lower():
+                    self.columns[field] = name
+                    break
+
+    @property
+    def num_rows(self) -> int:
+        """Row count from the file footer, nothing is decoded"""
+        return self.file.metadata.num_rows
+
+    def iter_rows(self, batch_size: int, start: int = 0) -> Iterator[Dict[str, Any]]:
+        """Yield rows from record batches of `batch_size`, skipping the first `start` rows
+
+        Whole row groups before `start` are not read at all, so resuming from
+        a checkpoint only decodes the row group it falls in.
+        """
+        row_groups = []
+        skip = start
+        for index in range(self.file.num_row_groups):
+            group_rows = self.file.metadata.row_group(index).num_rows
+            if not row_groups and skip >= group_rows:
+                skip -= group_rows
+                continue
+            row_groups.append(index)
+        if not row_groups:
+            return
+
+        fields = list(self.columns)
+        batches = self.file.iter_batches(
+            batch_size=batch_size, row_groups=row_groups, columns=[self.columns[field] for field in fields]
+        )
+        for batch in batches:
+            if skip:
+                if skip >= batch.num_rows:
+                    skip -= batch.num_rows
+                    continue
+                batch = batch.slice(skip)
+                skip = 0
+            data = batch.to_pydict()
+            for row_values in zip(*(data[self.columns[field]] for field in fields)):
+                yield dict(zip(fields, row_values))
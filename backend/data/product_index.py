@@ -0,0 +1,164 @@
+import re
+import threading
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction as db_transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Product
+
+# Apostrophes are dropped so "Lay's" and "Lays" read the same
+APOSTROPHES = re.compile(r"['’`]")
+NON_WORD = re.compile(r'[\W_]+')
+
+
+class ProductMatch(NamedTuple):
+    """Closest product to an item name, score is the trigram similarity (0-1)"""
+    product_id: Any
+    name: str
+    score: float
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase a product name and reduce punctuation to single spaces"""
+    return ' '.join(NON_WORD.sub(' ', APOSTROPHES.sub('', name.casefold())).split())
+
+
+def trigrams(normalized: str) -> Set[str]:
+    """Character trigrams of a normalized name, padded so word starts count"""
+    padded = f'  {normalized} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ProductNameIndex:
+    """Character-trigram index over one business's product names
+
+    Names that normalize the same match with score 1.0 by dictionary lookup.
+    Other names are scored against the products sharing at least one
+    trigram, found through an inverted index, so a lookup only touches
+    plausible candidates instead of the whole catalogue.
+    """
+
+    def __init__(self, products: Iterable[Tuple[Any, str]]) -> None:
+        """
+        Args:
+            products: (product_id, name) pairs
+        """
+        self.names: Dict[Any, str] = {}
+        self._exact: Dict[str, Any] = {}
+        self._gram_counts: Dict[Any, int] = {}
+        self._postings: Dict[str, List[Any]] = {}
+        for product_id, name in products:
+            self.names[product_id] = name
+            normalized = normalize_name(name)
+            self._exact.setdefault(normalized, product_id)
+            grams = trigrams(normalized)
+            self._gram_counts[product_id] = len(grams)
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(product_id)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def match(self, name: str) -> Optional[ProductMatch]:
+        """Best matching product by Dice similarity of trigrams, None if nothing shares one"""
+        normalized = normalize_name(name)
+        if not normalized:
+            return None
+        product_id = self._exact.get(normalized)
+        if product_id is not None:
+            return ProductMatch(product_id, self.names[product_id], 1.0)
+
+        grams = trigrams(normalized)
+        shared: Counter = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+        if not shared:
+            return None
+
+        score, product_id = max(
+            (2 * count / (len(grams) + self._gram_counts[product_id]), product_id)
+            for product_id, count in shared.items()
+        )
+        return ProductMatch(product_id, self.names[product_id], round(score, 3))
+
+
+# Indexes of recently used businesses: business id -> (version token, index)
+_indexes: 'OrderedDict[str, Tuple[str, ProductNameIndex]]' = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _version_key(business_id) -> str:
+    return f'product_index_version_{business_id}'
+
+
+def get_product_index(business_id) -> ProductNameIndex:
+    """
+    Product name index of a business, built on first use
+
+    Indexes are kept in this process for the PRODUCT_INDEX_CACHE_SIZE most
+    recently used businesses. A version token in the Django cache tells
+    whether products were created or renamed since, also by other processes
+    when the cache is shared.
+    """
+    key = str(business_id)
+    version = cache.get_or_set(_version_key(key), lambda: uuid.uuid4().hex, None)
+    with _indexes_lock:
+        cached = _indexes.get(key)
+        if cached and cached[0] == version:
+            _indexes.move_to_end(key)
+            return cached[1]
+
+    index = ProductNameIndex(Product.objects.filter(business_id=business_id).values_list('product_id', 'name'))
+    with _indexes_lock:
+        _indexes[key] = (version, index)
+        _indexes.move_to_end(key)
+        while len(_indexes) > max(1, getattr(settings, 'PRODUCT_INDEX_CACHE_SIZE', 100)):
+            _indexes.popitem(last=False)
+    return index
+
+
+def is_exact(match: Optional[ProductMatch]) -> bool:
+    """Whether an item can be booked against the matched product without review
+
+    Only names that normalize the same qualify, fuzzy matches also join size
+    variants such as "Coca Cola 1L" and "Coca Cola 2L".
+    """
+    return match is not None and match.score >= 1.0
+
+
+def is_suggestion(match: Optional[ProductMatch]) -> bool:
+    """Whether a match is close enough to offer the product for the user to confirm"""
+    return match is not None and match.score >= getattr(settings, 'PRODUCT_MATCH_MIN_SCORE', 0.75)
+
+
+def invalidate_product_index(business_id) -> None:
+    """Rebuild a business's index on next use, after products were created, renamed or deleted"""
+    _new_version(business_id)
+    # Other connections may rebuild before the change is committed, so do it again then
+    db_transaction.on_commit(lambda: _new_version(business_id))
+
+
+def _new_version(business_id) -> None:
+    cache.set(_version_key(business_id), uuid.uuid4().hex, None)
+    with _indexes_lock:
+        _indexes.pop(str(business_id), None)
+
+
+@receiver(post_save, sender=Product)
+def _product_saved(sender, instance, created, **kwargs):
+    """Stock and price saves keep the index, new and renamed products drop it"""
+    name = instance.__dict__.get('name')  # Deferred when not loaded, and then not saved either
+    if created or (name is not None and name != instance.loaded_name):
+        invalidate_product_index(instance.business_id)
+    instance.loaded_name = name
+
+
+@receiver(post_delete, sender=Product)
+def _product_deleted(sender, instance, **kwargs):
+    invalidate_product_index(instance.business_id)
@@ -0,0 +1,73 @@
+import logging
+import time
+from typing import Any, Iterable, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressReporter:
+    """Throttled progress writes for an upload record
+
+    Counters are set on the record in memory on every call but only written
+    with `save(update_fields=...)` once every `every_rows` rows or `every_ms`
+    milliseconds, whichever comes first. The first report is written right
+    away so pollers see work start, and `finish()` writes the final counters
+    however short the run was. Large JSON fields such as
+    processing_errors are never part of the flush, they are written once by
+    the service when processing completes.
+    """
+
+    def __init__(self, record, fields: Iterable[str], every_rows: Optional[int] = None,
+                 every_ms: Optional[int] = None) -> None:
+        """
+        Args:
+            record: Upload record being processed (FileUploadRecord, InventoryUploadRecord, ...)
+            fields: Counter fields written on each flush
+            every_rows: Flush after this many rows (defaults to UPLOAD_PROGRESS_EVERY_ROWS)
+            every_ms: Flush after this many milliseconds (defaults to UPLOAD_PROGRESS_EVERY_MS)
+        """
+        self.record = record
+        self.fields = list(fields)
+        self.every_rows = every_rows or getattr(settings, 'UPLOAD_PROGRESS_EVERY_ROWS', 500)
+        self.every_ms = every_ms or getattr(settings, 'UPLOAD_PROGRESS_EVERY_MS', 1000)
+        self.pending_rows = 0
+        self.flush_count = 0
+        self._last_flush = time.monotonic()
+
+    def advance(self, rows: int = 1, **values: Any) -> None:
+        """Record progress, flushing to the database when a threshold is reached
+
+        Args:
+            rows: Rows handled since the previous call
+            **values: Counter values to set on the record
+        """
+        for field, value in values.items():
+            setattr(self.record, field, value)
+
+        self.pending_rows += rows
+        elapsed_ms = (time.monotonic() - self._last_flush) * 1000
+        if not self.flush_count or self.pending_rows >= self.every_rows or elapsed_ms >= self.every_ms:
+            self.flush()
+
+    def finish(self, **values: Any) -> None:
+        """Write the final counters regardless of the throttle
+
+        Args:
+            **values: Counter values to set on the record
+        """
+        for field, value in values.items():
+            setattr(self.record, field, value)
+        self.flush()
+
+    def flush(self) -> None:
+        """Write the counter fields now"""
+        try:
+            self.record.save(update_fields=self.fields)
+            self.flush_count += 1
+        except Exception as e:
+            # Progress is best effort, never fail the import because of it
+            logger.warning(f"Failed to save upload progress: {e}")
+        self.pending_rows = 0
+        self._last_flush = time.monotonic()
@@ -1,20 +1,181 @@
 import hashlib
 import logging
+import threading
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import datetime, date
 from decimal import Decimal
-from typing import Dict, List, Any, Optional, Set
+from multiprocessing import get_context
+from typing import Dict, Iterable, List, Any, Optional, Set, Tuple
+import numpy as np
+from PIL import Image, ImageOps
+from django.conf import settings
 from django.db import transaction as db_transaction
+from django.db.models import Q
 from django.utils import timezone
-from .models import ReceiptUploadRecord, Transaction, Product, Customer
+from .models import ReceiptBatch, ReceiptUploadRecord, Transaction, Product, Customer
+from .product_index import get_product_index, invalidate_product_index, is_exact
+from .progress import ProgressReporter
+from .services import ImportHashIndex, SalesAccumulator
 from accounts.models import Business
 
 logger = logging.getLogger(__name__)
 
+OCR_ENGINES = ('mock', 'tesseract')
+
+# Side of the difference hash grid, 16x16 = 256 bits
+IMAGE_HASH_SIZE = 16
+# Brightness step a hash bit needs, keeps JPEG noise on blank paper from flipping bits
+IMAGE_HASH_MIN_STEP = 2
+
+# Receipts whose lines can be reviewed and booked again
+CONFIRMABLE_STATUSES = ('completed', 'confirmed')
+
+# OCR runs in its own processes so image work never holds up the upload threads
+_ocr_pool: Optional[ProcessPoolExecutor] = None
+_ocr_pool_lock = threading.Lock()
+
+
+class ReceiptNotConfirmable(ValueError):
+    """A receipt is still being processed, failed or reuses another receipt's lines, so it has none to confirm"""
+
+
+def ocr_engine() -> str:
+    """Configured receipt OCR engine"""
+    engine = getattr(settings, 'RECEIPT_OCR_ENGINE', 'mock')
+    if engine not in OCR_ENGINES:
+        raise ValueError(f"Unknown RECEIPT_OCR_ENGINE: {engine}")
+    return engine
+
+
+def _get_ocr_pool() -> ProcessPoolExecutor:
+    """Process pool for local OCR, started on first use"""
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            _ocr_pool = ProcessPoolExecutor(
+                max_workers=max(1, getattr(settings, 'RECEIPT_OCR_WORKERS', 2)),
+                mp_context=get_context('spawn')
+            )
+        return _ocr_pool
+
+
+def submit_local_ocr(image_path: str) -> Future:
+    """Queue a receipt image for Tesseract, the future resolves to the extracted data"""
+    from .local_ocr import extract_receipt_data
+
+    return _get_ocr_pool().submit(
+        extract_receipt_data, image_path, getattr(settings, 'RECEIPT_OCR_LANG', 'eng')
+    )
+
+
+def receipt_image_hash(image_path: str) -> Optional[str]:
+    """Perceptual (difference) hash of a receipt image as hex, None if it cannot be read
+
+    Each bit says whether brightness steps up from a cell of a small
+    grayscale thumbnail to its right neighbour, so re-encoding, resizing and
+    lighting changes barely move the hash while a different receipt moves
+    many bits.
+    """
+    try:
+        with Image.open(image_path) as image:
+            # JPEGs decode straight to a reduced size, no full resolution pixels needed
+            image.draft('L', (IMAGE_HASH_SIZE * 8, IMAGE_HASH_SIZE * 8))
+            thumbnail = ImageOps.exif_transpose(image).convert('L').resize(
+                (IMAGE_HASH_SIZE + 1, IMAGE_HASH_SIZE), Image.LANCZOS
+            )
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    pixels = np.asarray(thumbnail, dtype=np.int16)
+    return np.packbits(pixels[:, 1:] - pixels[:, :-1] > IMAGE_HASH_MIN_STEP).tobytes().hex()
+
+
+def image_hash_distance(first: str, second: str) -> int:
+    """Number of differing bits between two image hashes"""
+    return (int(first, 16) ^ int(second, 16)).bit_count()
+
+
+def find_similar_receipt(business: Business, image_hash: Optional[str]) -> Optional[Tuple[ReceiptUploadRecord, int]]:
+    """
+    Find the processed receipt of this business that looks most like an image
+
+    Byte-identical and re-encoded photos are found by an indexed lookup;
+    otherwise the last RECEIPT_DUPLICATE_LOOKBACK receipts are compared.
+
+    Returns:
+        (receipt, differing bits) within RECEIPT_DUPLICATE_FLAG_DISTANCE, or None
+    """
+    max_distance = getattr(settings, 'RECEIPT_DUPLICATE_FLAG_DISTANCE', 24)
+    if not image_hash or max_distance < 0:
+        return None
+
+    processed = ReceiptUploadRecord.objects.filter(
+        business=business, status='completed', image_hash__isnull=False
+    )
+    exact = processed.filter(image_hash=image_hash).order_by('uploaded_at').first()
+    if exact:
+        return exact, 0
+
+    lookback = getattr(settings, 'RECEIPT_DUPLICATE_LOOKBACK', 500)
+    recent = processed.order_by('-uploaded_at').values_list('image_id', 'image_hash')[:lookback]
+    best = min(
+        ((image_hash_distance(image_hash, other_hash), image_id) for image_id, other_hash in recent),
+        default=None
+    )
+    if best is None or best[0] > max_distance:
+        return None
+    return processed.get(image_id=best[1]), best[0]
+
+
+def finish_batch_receipt(receipt_upload: ReceiptUploadRecord, created_transactions: int = 0,
+                         affected_products: Iterable[str] = (), affected_customers: Iterable[str] = ()) -> None:
+    """
+    Count a completed or failed receipt towards its batch
+
+    The receipt that finishes the batch publishes one transaction.parsed
+    event for every receipt in it, when any transactions were created.
+    """
+    with db_transaction.atomic():
+        batch = ReceiptBatch.objects.select_for_update().get(batch_id=receipt_upload.batch_id)
+        batch.receipts_finished += 1
+        batch.created_transactions += created_transactions
+        batch.affected_products = sorted(set(batch.affected_products) | set(affected_products))
+        batch.affected_customers = sorted(set(batch.affected_customers) | set(affected_customers))
+        finished = batch.receipts_finished >= batch.receipt_count
+        if finished:
+            batch.status = 'completed'
+            batch.completed_at = timezone.now()
+        batch.save()
+
+    if finished and batch.created_transactions:
+        _publish_batch_event(batch)
+
+
+def _publish_batch_event(batch: ReceiptBatch) -> None:
+    """Publish the coalesced transaction.parsed event of a finished batch"""
+    try:
+        from apps.events.adapter import publish_event
+
+        payload = {
+            'business_id': str(batch.business_id),
+            'affected_products': batch.affected_products,
+            'affected_customers': batch.affected_customers,
+            'transaction_count': batch.created_transactions,
+            'receipt_batch_id': str(batch.batch_id)
+        }
+
+        logger.info(f"Event published: topic=transaction.parsed, payload={payload}")
+        publish_event('transaction.parsed', payload)
+    except ImportError:
+        logger.warning("Event adapter not available for receipt processing")
+    except Exception as e:
+        logger.error(f"Failed to publish transaction.parsed event: {e}")
+
 
 class ReceiptOCRService:
-    """Service to process receipt images with mocked OCR"""
+    """Service to process receipt images with mocked or local Tesseract OCR"""
 
-    # Mocked OCR sample data (Phase 2: Replace with actual Tesseract/Google Vision)
+    # Mocked OCR sample data, used while RECEIPT_OCR_ENGINE is 'mock'
     MOCK_RECEIPT_DATA = {
         "date": datetime.now().date().isoformat(),
         "items": [
@@ -31,15 +192,21 @@ class ReceiptOCRService:
         self.receipt_upload = receipt_upload
         self.business = receipt_upload.business
         self.created_transactions = 0
+        self.reversed_transactions = 0
         self.failed_items = 0
         self.errors: List[Dict[str, Any]] = []
         self.affected_products: Set[str] = set()  # Track affected product IDs
         self.affected_customers: Set[str] = set()  # Track affected customer IDs
+        self.import_hashes = ImportHashIndex(self.business)
+        self.progress = ProgressReporter(receipt_upload, fields=['created_transactions'])
 
-    def process_receipt(self) -> Dict[str, Any]:
+    def process_receipt(self, ocr_future: Optional[Future] = None) -> Dict[str, Any]:
         """
         Process receipt image and create transactions
 
+        Args:
+            ocr_future: Local OCR already submitted for this image, see submit_local_ocr
+
         Returns:
             Dictionary with processing results including extracted data and counts
         """
@@ -52,23 +219,12 @@ class ReceiptOCRService:
             self.receipt_upload.processing_started_at = timezone.now()
             self.receipt_upload.save()
 
-            # Extract receipt data (mocked for MVP)
-            extracted_data = self._extract_receipt_data()
+            extracted_data = self._extract_receipt_data(ocr_future)
 
             # Parse receipt date
             receipt_date = self._parse_date(extracted_data['date'])
 
-            # Process each item in receipt
-            for item_idx, item in enumerate(extracted_data.get('items', []), start=1):
-                try:
-                    self._process_receipt_item(item, receipt_date)
-                except Exception as e:
-                    self.failed_items += 1
-                    self.errors.append({
-                        'item': item_idx,
-                        'name': item.get('name', 'Unknown'),
-                        'error': str(e)
-                    })
+            self.book_items(extracted_data.get('items', []), receipt_date)
 
             # Mark as completed
             self.receipt_upload.status = 'completed'
@@ -82,8 +238,9 @@ class ReceiptOCRService:
                 f"failed {self.failed_items} items"
             )
 
-            # Publish event to trigger downstream processing
-            self._publish_transaction_parsed_event()
+            # Publish event to trigger downstream processing, batches publish once when all receipts are done
+            if not self.receipt_upload.batch_id:
+                self._publish_transaction_parsed_event()
 
             return {
                 'created_count': self.created_transactions,
@@ -105,42 +262,207 @@ class ReceiptOCRService:
                 'extracted_data': None,
                 'errors': [{'error': str(e)}]
             }
+        finally:
+            if self.receipt_upload.batch_id:
+                finish_batch_receipt(
+                    self.receipt_upload, self.created_transactions, self.affected_products, self.affected_customers
+                )
 
-    def _extract_receipt_data(self) -> Dict[str, Any]:
+    def _extract_receipt_data(self, ocr_future: Optional[Future] = None) -> Dict[str, Any]:
         """
-        Extract receipt data from image (mocked for MVP)
+        Extract receipt data from image
 
-        In Phase 2, replace with:
-        - Tesseract OCR library
-        - Google Cloud Vision API
-        - AWS Textract
+        The 'mock' engine returns sample data. The 'tesseract' engine waits for
+        the OCR process pool, submitting the image first if nobody else has.
 
         Returns:
             Dictionary with date, items (list of dicts), total, confidence
         """
-        # For MVP: Return mocked data
-        # In production, this would call actual OCR service
+        if ocr_future is None:
+            if ocr_engine() == 'mock':
+                return {
+                    "date": datetime.now().date().isoformat(),
+                    "items": [
+                        {"name": "Lay's Chips", "qty": 2, "price": 150},
+                        {"name": "Cold Drink", "qty": 1, "price": 100},
+                        {"name": "Bread", "qty": 3, "price": 75},
+                    ],
+                    "total": 595,
+                    "confidence": 95
+                }
+            ocr_future = submit_local_ocr(self.receipt_upload.file_path)
+        return ocr_future.result(timeout=getattr(settings, 'RECEIPT_OCR_TIMEOUT', 60))
+
+    def confirm_receipt(self, items: Optional[List[Dict[str, Any]]] = None,
+                        receipt_date: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Book the reviewed items of a receipt in place of its earlier lines and mark it confirmed
+
+        Args:
+            items: Corrected items, defaults to the extracted ones. An item may
+                carry the product_id proposed by the preview.
+            receipt_date: Corrected date (YYYY-MM-DD), defaults to the extracted one
+
+        Returns:
+            Dictionary with created, reversed and failed counts, transaction ids and item errors
+
+        Raises:
+            ReceiptNotConfirmable: The receipt is not completed or confirmed, or
+                is a byte-identical re-upload of another receipt
+        """
+        extracted_data = self.receipt_upload.extracted_data or {}
+        if items is None:
+            items = extracted_data.get('items', [])
+        receipt_date = self._parse_date(receipt_date or extracted_data.get('date') or timezone.now().date().isoformat())
+
+        transactions = self.book_items(items, receipt_date, replace=True)
+
+        self.receipt_upload.status = 'confirmed'
+        self.receipt_upload.created_transactions = len(transactions)
+        self.receipt_upload.save(update_fields=['status', 'created_transactions'])
+        if transactions or self.reversed_transactions:
+            self._publish_transaction_parsed_event()
+
         return {
-            "date": datetime.now().date().isoformat(),
-            "items": [
-                {"name": "Lay's Chips", "qty": 2, "price": 150},
-                {"name": "Cold Drink", "qty": 1, "price": 100},
-                {"name": "Bread", "qty": 3, "price": 75},
-            ],
-            "total": 595,
-            "confidence": 95
+            'created_count': len(transactions),
+            'reversed_count': self.reversed_transactions,
+            'failed_count': self.failed_items,
+            'transaction_ids': [str(transaction.transaction_id) for transaction in transactions],
+            'errors': self.errors
         }
 
-    def _process_receipt_item(self, item: Dict[str, Any], receipt_date: date) -> None:
+    def book_items(self, items: List[Dict[str, Any]], receipt_date: date,
+                   replace: bool = False) -> List[Transaction]:
+        """
+        Create the transactions of a receipt's items
+
+        Invalid items are recorded in errors and items booked before are
+        skipped. The rest are written in one atomic block: their products are
+        resolved with one query, transactions are bulk created and the stock
+        decrements and StockMovements are applied per product through
+        SalesAccumulator.
+
+        Args:
+            replace: Reverse the lines this receipt booked before, in the same
+                atomic block, so the items replace them instead of adding to them.
+                The receipt stays locked until the block commits, and must be
+                completed or confirmed.
+
+        Returns:
+            The created transactions
         """
-        Process a single receipt item and create transaction
+        lines = []
+        for item_idx, item in enumerate(items, start=1):
+            try:
+                lines.append(self._parse_item(item, receipt_date))
+            except Exception as e:
+                self.failed_items += 1
+                self.errors.append({
+                    'item': item_idx,
+                    'name': item.get('name', 'Unknown') if isinstance(item, dict) else 'Unknown',
+                    'error': str(e)
+                })
+
+        new_lines: List[Dict[str, Any]] = []
+        transactions: List[Transaction] = []
+        try:
+            with db_transaction.atomic():
+                sales = SalesAccumulator()
+                if replace:
+                    self._lock_for_replace()
+                    self._reverse_booked_lines(sales)
+
+                # Check every item against existing transactions in one query
+                self.import_hashes.load(line['row_hash'] for line in lines)
+                for line in lines:
+                    if not self.import_hashes.is_duplicate(line['row_hash']):
+                        self.import_hashes.add(line['row_hash'])
+                        new_lines.append(line)
+
+                if new_lines:
+                    products = self._resolve_products(new_lines)
+                    customer = self._get_or_create_customer("Walk-in")
+                    for line in new_lines:
+                        product = products[line['name']]
+                        transactions.append(Transaction(
+                            business=self.business,
+                            product=product,
+                            customer=customer,
+                            date=receipt_date,
+                            quantity=line['quantity'],
+                            unit_price=line['unit_price'],
+                            amount=line['amount'],
+                            payment_method='cash',
+                            csv_import_hash=line['row_hash'],
+                            receipt_upload=self.receipt_upload,
+                            notes=f"From receipt: {self.receipt_upload.original_filename}"
+                        ))
+                        sales.add(product, line['quantity'], customer, line['amount'], receipt_date)
+                        self.affected_products.add(str(product.product_id))
+                        self.affected_customers.add(str(customer.customer_id))
+                    Transaction.objects.bulk_create(transactions)
+
+                # One stock UPDATE and one customer UPDATE for the whole receipt
+                sales.apply(
+                    self.business,
+                    reference_type='receipt',
+                    reference_id=str(self.receipt_upload.image_id),
+                    user=self.receipt_upload.user
+                )
+        except Exception:
+            for line in new_lines:
+                self.import_hashes.discard(line['row_hash'])
+            raise
+
+        self.created_transactions += len(transactions)
+        self.progress.finish(created_transactions=self.created_transactions)
+        return transactions
+
+    def _lock_for_replace(self) -> None:
+        """Lock the receipt against concurrent confirms, which would each reverse the same lines
+
+        A byte-identical re-upload shares its original's OCR result but owns
+        no transactions, the original's lines are the ones to correct.
+        """
+        status, content_sha256, original_id, original_sha256 = (
+            ReceiptUploadRecord.objects.select_for_update(of=('self',))
+            .values_list('status', 'content_sha256', 'duplicate_of_id', 'duplicate_of__content_sha256')
+            .get(pk=self.receipt_upload.pk)
+        )
+        if status not in CONFIRMABLE_STATUSES:
+            raise ReceiptNotConfirmable(f"Receipt is {status}, only processed receipts can be confirmed")
+        if content_sha256 and content_sha256 == original_sha256:
+            raise ReceiptNotConfirmable(f"Same image as receipt {original_id}, confirm that receipt instead")
+
+    def _reverse_booked_lines(self, sales: SalesAccumulator) -> None:
+        """Delete the transactions this receipt booked and give their stock and amounts back through sales"""
+        booked = list(
+            Transaction.objects.select_for_update()
+            .filter(business=self.business, receipt_upload=self.receipt_upload)
+            .only('transaction_id', 'product_id', 'customer_id', 'quantity', 'amount')
+        )
+        if not booked:
+            return
+        for transaction in booked:
+            sales.reverse(transaction)
+            self.affected_products.add(str(transaction.product_id))
+            if transaction.customer_id is not None:
+                self.affected_customers.add(str(transaction.customer_id))
+        Transaction.objects.filter(pk__in=[transaction.pk for transaction in booked]).delete()
+        self.reversed_transactions += len(booked)
+
+    def _parse_item(self, item: Dict[str, Any], receipt_date: date) -> Dict[str, Any]:
+        """
+        Validate a receipt item
 
         Args:
-            item: Dictionary with keys: name, qty, price
+            item: Dictionary with keys: name, qty (or quantity), price (line amount), optionally product_id
             receipt_date: Date of receipt
         """
-        item_name = item.get('name', '').strip()
-        quantity = int(item.get('qty', 1))
+        if not isinstance(item, dict):
+            raise ValueError("Item must be an object")
+        item_name = str(item.get('name') or '').strip()
+        quantity = int(item.get('qty', item.get('quantity', 1)))
         amount = Decimal(str(item.get('price', 0)))
 
         # Validate item
@@ -151,53 +473,82 @@ class ReceiptOCRService:
         if amount <= 0:
             raise ValueError("Amount must be > 0")
 
-        # Calculate unit price
-        unit_price = amount / quantity
-
-        # Compute hash for duplicate detection
-        # Use receipt date + item name + qty + amount + "walk-in" (walk-in customer)
-        row_hash = self._compute_row_hash(receipt_date, item_name, quantity, amount)
+        return {
+            'name': item_name,
+            'quantity': quantity,
+            'amount': amount,
+            'unit_price': amount / quantity,
+            'product_id': item.get('product_id'),
+            # Use receipt date + item name + qty + amount + "walk-in" (walk-in customer)
+            'row_hash': self._compute_row_hash(receipt_date, item_name, quantity, amount),
+        }
 
-        # Check for duplicates
-        if self._is_duplicate(row_hash):
-            # Skip duplicate
-            return
+    def _resolve_products(self, lines: List[Dict[str, Any]]) -> Dict[str, Product]:
+        """
+        Product of every item, keyed by item name
 
-        # Use atomic transaction for consistency
-        with db_transaction.atomic():
-            # Get or create product
-            product = self._get_or_create_product(item_name, unit_price)
-            self.affected_products.add(str(product.product_id))
-
-            # Get or create walk-in customer
-            customer = self._get_or_create_customer("Walk-in")
-            if customer:
-                self.affected_customers.add(str(customer.customer_id))
-
-            # Create transaction
-            transaction = Transaction.objects.create(
-                business=self.business,
-                product=product,
-                customer=customer,
-                date=receipt_date,
-                quantity=quantity,
-                unit_price=unit_price,
-                amount=amount,
-                payment_method='cash',
-                csv_import_hash=row_hash,
-                notes=f"From receipt: {self.receipt_upload.original_filename}"
+        A product_id given with the item wins, confirmed by the user from the
+        preview's suggestions, then a name that normalizes the same as a
+        product's, then the exact name. Fuzzy matches are never booked
+        unconfirmed, they would merge size variants. All of them are loaded
+        with one query; products still missing are bulk created.
+        """
+        product_index = get_product_index(self.business.id)
+        wanted_ids: Dict[str, List[Any]] = {}
+        for line in lines:
+            candidates = wanted_ids.setdefault(line['name'], [])
+            if line['product_id']:
+                candidates.append(str(line['product_id']))
+            match = product_index.match(line['name'])
+            if is_exact(match):
+                candidates.append(str(match.product_id))
+
+        ids = {product_id for candidates in wanted_ids.values() for product_id in candidates}
+        loaded = list(Product.objects.filter(
+            Q(product_id__in=[product_id for product_id in ids if self._is_uuid(product_id)]) |
+            Q(name__in=list(wanted_ids)),
+            business=self.business
+        ))
+        by_id = {str(product.product_id): product for product in loaded}
+        by_name = {product.name: product for product in loaded}
+
+        products = {}
+        for name, candidates in wanted_ids.items():
+            product = next((by_id[product_id] for product_id in candidates if product_id in by_id), None)
+            product = product or by_name.get(name)
+            if product:
+                products[name] = product
+
+        missing = {line['name']: line['unit_price'] for line in lines if line['name'] not in products}
+        if missing:
+            Product.objects.bulk_create(
+                [
+                    Product(
+                        business=self.business,
+                        name=name,
+                        unit_price=unit_price,
+                        sku=f'SKU-OCR-{hashlib.md5(name.encode()).hexdigest()[:8].upper()}',
+                        reorder_point=50
+                    )
+                    for name, unit_price in missing.items()
+                ],
+                ignore_conflicts=True
             )
+            invalidate_product_index(self.business.id)
+            # Re-read so concurrently created products resolve to their stored rows
+            products.update(
+                (product.name, product)
+                for product in Product.objects.filter(business=self.business, name__in=list(missing))
+            )
+        return products
 
-            # Update product stock
-            product.current_stock -= quantity
-            product.save()
-
-            # Update customer stats
-            customer.total_purchases += amount
-            customer.last_purchase = receipt_date
-            customer.save()
-
-        self.created_transactions += 1
+    @staticmethod
+    def _is_uuid(value: str) -> bool:
+        try:
+            uuid.UUID(value)
+        except ValueError:
+            return False
+        return True
 
     def _parse_date(self, date_str: str) -> date:
         """Parse and validate date field"""
@@ -214,26 +565,6 @@ class ReceiptOCRService:
         hash_input = f"{date}|{product}|{qty}|{amount}|walk-in"
         return hashlib.md5(hash_input.encode()).hexdigest()
 
-    def _is_duplicate(self, row_hash: str) -> bool:
-        """Check if transaction hash already exists for this business"""
-        return Transaction.objects.filter(
-            business=self.business,
-            csv_import_hash=row_hash
-        ).exists()
-
-    def _get_or_create_product(self, product_name: str, unit_price: Decimal) -> Product:
-        """Get or create product with auto-generated SKU"""
-        product, created = Product.objects.get_or_create(
-            business=self.business,
-            name=product_name,
-            defaults={
-                'unit_price': unit_price,
-                'sku': f'SKU-OCR-{hashlib.md5(product_name.encode()).hexdigest()[:8].upper()}',
-                'reorder_point': 50
-            }
-        )
-        return product
-
     def _get_or_create_customer(self, customer_name: str) -> Customer:
         """Get or create customer"""
         customer, created = Customer.objects.get_or_create(
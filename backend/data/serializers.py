@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from .models import (
-    FileUploadRecord, Transaction, Product, Customer, ReceiptUploadRecord,
+    FileUploadRecord, Transaction, Product, Customer, ReceiptBatch, ReceiptUploadRecord,
     InventoryUploadRecord, StockMovement, StockAlert
 )
 
@@ -18,7 +18,7 @@ class FileUploadStatusSerializer(serializers.ModelSerializer):
         fields = [
             'file_id', 'status', 'original_filename', 'row_count',
             'rows_processed', 'rows_failed', 'created_transactions',
-            'percent_complete', 'processing_started_at', 'error_message'
+            'percent_complete', 'processing_started_at', 'error_message', 'duplicate_of'
         ]
         read_only_fields = fields
 
@@ -28,7 +28,7 @@ class FileUploadStatusSerializer(serializers.ModelSerializer):
         """Calculate completion percentage"""
         if obj.row_count == 0:
             return 0
-        return int((obj.rows_processed / obj.row_count) * 100)
+        return min(int((obj.rows_processed / obj.row_count) * 100), 100)  # row_count is an estimate until completion
 
 
 class TransactionSerializer(serializers.ModelSerializer):
@@ -69,7 +69,7 @@ class ReceiptStatusSerializer(serializers.ModelSerializer):
     class Meta:
         model = ReceiptUploadRecord
         fields = [
-            'image_id', 'status', 'original_filename', 'file_size',
+            'image_id', 'status', 'original_filename', 'file_size', 'duplicate_of', 'duplicate_distance',
             'extracted_data', 'created_transactions', 'error_message',
             'processing_started_at', 'processing_completed_at', 'percent_complete'
         ]
@@ -89,6 +89,19 @@ class ReceiptStatusSerializer(serializers.ModelSerializer):
             return 0
 
 
+class ReceiptBatchSerializer(serializers.ModelSerializer):
+    """Serializer for receipt batch status polling, with the status of every receipt"""
+    receipts = ReceiptStatusSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ReceiptBatch
+        fields = [
+            'batch_id', 'status', 'receipt_count', 'receipts_finished', 'created_transactions',
+            'rejected_files', 'created_at', 'completed_at', 'receipts'
+        ]
+        read_only_fields = fields
+
+
 class InventoryUploadStatusSerializer(serializers.ModelSerializer):
     """Serializer for inventory upload status polling"""
     class Meta:
@@ -96,6 +109,7 @@ class InventoryUploadStatusSerializer(serializers.ModelSerializer):
         fields = [
             'record_id', 'status', 'original_filename', 'row_count',
             'rows_processed', 'rows_failed', 'products_updated',
+            'products_created', 'products_changed', 'products_unchanged',
             'percent_complete', 'processing_started_at', 'error_message'
         ]
         read_only_fields = fields
@@ -106,7 +120,7 @@ class InventoryUploadStatusSerializer(serializers.ModelSerializer):
         """Calculate completion percentage"""
         if obj.row_count == 0:
             return 0
-        return int((obj.rows_processed / obj.row_count) * 100)
+        return min(int((obj.rows_processed / obj.row_count) * 100), 100)  # row_count is an estimate until completion
 
 
 class ProductDetailSerializer(serializers.ModelSerializer):
@@ -125,6 +139,9 @@ class ProductDetailSerializer(serializers.ModelSerializer):
 
     def get_total_sales(self, obj):
         """Get total sales quantity for this product"""
+        if hasattr(obj, 'total_sales'):
+            # Annotated by the list queryset, no query per product
+            return obj.total_sales or 0
         from django.db.models import Sum
         total = obj.transactions.aggregate(Sum('quantity'))['quantity__sum'] or 0
         return total
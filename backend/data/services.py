@@ -1,19 +1,169 @@
 import csv
 import hashlib
+import json
 import logging
 import os
 import uuid
-from datetime import datetime
+from collections import defaultdict
+from datetime import date as date_type, datetime, time as time_type
 from decimal import Decimal
-from typing import Dict, List, Any, Optional, Tuple, Set
+from typing import Dict, Iterable, List, Any, Optional, Tuple, Set
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import transaction as db_transaction
+from django.db.models import Case, DateField, DecimalField, F, IntegerField, Value, When
+from django.db.models.functions import Coalesce, Greatest
 from django.utils import timezone
-from .models import FileUploadRecord, Transaction, Product, Customer, FailedJob
+from .copy_import import CopyTransactionWriter
+from .csv_stream import (
+    OffsetLineReader, compression_for, count_data_rows, is_parquet, iter_chunks, open_csv_stream
+)
+from .models import FileUploadRecord, Transaction, Product, Customer, FailedJob, StockMovement
+from .product_index import invalidate_product_index
 from accounts.models import Business
 
 logger = logging.getLogger(__name__)
 
 
+class ImportHashIndex:
+    """Set-based duplicate detection on Transaction.csv_import_hash for one import
+
+    Hashes are checked against the database in bulk (one IN query per batch)
+    and every hash accepted during the import is remembered in memory, so
+    duplicates within the same file are caught before they are committed.
+    """
+
+    # Keep IN lists below SQLite's bound-parameter limit
+    QUERY_BATCH_SIZE = 500
+
+    def __init__(self, business: Business) -> None:
+        self.business = business
+        self._checked: Set[str] = set()  # Hashes already looked up in the database
+        self._known: Set[str] = set()  # Hashes stored in the database or accepted in this import
+
+    def load(self, row_hashes: Iterable[str]) -> None:
+        """Look up every not yet checked hash with as few queries as possible"""
+        pending = [row_hash for row_hash in set(row_hashes) if row_hash not in self._checked]
+        for start in range(0, len(pending), self.QUERY_BATCH_SIZE):
+            batch = pending[start:start + self.QUERY_BATCH_SIZE]
+            self._known.update(
+                Transaction.objects.filter(
+                    business=self.business,
+                    csv_import_hash__in=batch
+                ).values_list('csv_import_hash', flat=True)
+            )
+            self._checked.update(batch)
+
+    def is_duplicate(self, row_hash: str) -> bool:
+        """Check if hash is already stored or was accepted earlier in this import"""
+        if row_hash not in self._checked:
+            self.load([row_hash])
+        return row_hash in self._known
+
+    def add(self, row_hash: str) -> None:
+        """Remember a hash accepted by this import"""
+        self._checked.add(row_hash)
+        self._known.add(row_hash)
+
+    def discard(self, row_hash: str) -> None:
+        """Forget a hash whose row ended up not being written"""
+        self._known.discard(row_hash)
+
+
+class SalesAccumulator:
+    """Accumulate stock and customer-stat deltas for a batch of imported sales
+
+    Deltas are applied at commit time with a single F()-expression UPDATE per
+    model, so concurrent stock changes are never overwritten, and every product
+    gets one aggregated StockMovement for the batch: a 'sale', or a 'return'
+    when reversed sales outweigh new ones.
+    """
+
+    def __init__(self) -> None:
+        self.quantities: Dict[Any, int] = defaultdict(int)  # product_id -> units sold
+        self.sale_counts: Dict[Any, int] = defaultdict(int)  # product_id -> transactions
+        self.reversal_counts: Dict[Any, int] = defaultdict(int)  # product_id -> reversed transactions
+        self.purchase_totals: Dict[Any, Decimal] = defaultdict(Decimal)  # customer_id -> amount
+        self.last_purchases: Dict[Any, Any] = {}  # customer_id -> latest sale date
+
+    def add(self, product: Product, quantity: int, customer: Optional[Customer] = None,
+            amount: Optional[Decimal] = None, date: Optional[Any] = None) -> None:
+        """Record one sale"""
+        self.quantities[product.pk] += quantity
+        self.sale_counts[product.pk] += 1
+        if customer is not None:
+            self.purchase_totals[customer.pk] += amount
+            previous = self.last_purchases.get(customer.pk)
+            if previous is None or date > previous:
+                self.last_purchases[customer.pk] = date
+
+    def reverse(self, transaction: Transaction) -> None:
+        """Record the reversal of a booked sale, its stock and purchase amount are given back"""
+        self.quantities[transaction.product_id] -= transaction.quantity
+        self.reversal_counts[transaction.product_id] += 1
+        if transaction.customer_id is not None:
+            self.purchase_totals[transaction.customer_id] -= transaction.amount
+
+    def apply(self, business: Business, reference_type: str, reference_id: str, user=None) -> None:
+        """Write accumulated deltas and ledger entries, must be called inside an atomic block"""
+        now = timezone.now()
+
+        # Products whose reversals and new sales cancel out are left alone
+        quantities = {product_id: quantity for product_id, quantity in self.quantities.items() if quantity}
+        if quantities:
+            product_ids = list(quantities)
+            Product.objects.filter(business=business, pk__in=product_ids).update(
+                current_stock=F('current_stock') - Case(
+                    *[When(pk=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+                    output_field=IntegerField()
+                ),
+                updated_at=now
+            )
+
+            # Read back post-update stock (rows are locked until commit) to fill the ledger
+            stock_after = dict(
+                Product.objects.filter(pk__in=product_ids).values_list('product_id', 'current_stock')
+            )
+            StockMovement.objects.bulk_create([
+                StockMovement(
+                    business=business,
+                    product_id=product_id,
+                    movement_type='sale' if quantity > 0 else 'return',
+                    quantity_changed=-quantity,
+                    stock_before=stock_after[product_id] + quantity,
+                    stock_after=stock_after[product_id],
+                    reference_type=reference_type,
+                    reference_id=reference_id,
+                    notes=self._movement_notes(product_id),
+                    created_by=user
+                )
+                for product_id, quantity in quantities.items()
+            ])
+
+        if self.purchase_totals:
+            Customer.objects.filter(business=business, pk__in=list(self.purchase_totals)).update(
+                total_purchases=F('total_purchases') + Case(
+                    *[When(pk=customer_id, then=Value(total)) for customer_id, total in self.purchase_totals.items()],
+                    output_field=DecimalField(max_digits=12, decimal_places=2)
+                ),
+                last_purchase=Case(
+                    *[
+                        When(pk=customer_id, then=Greatest(Coalesce('last_purchase', Value(date)), Value(date)))
+                        for customer_id, date in self.last_purchases.items()
+                    ],
+                    default=F('last_purchase'),
+                    output_field=DateField()
+                ),
+                updated_at=now
+            )
+
+    def _movement_notes(self, product_id) -> str:
+        notes = f"{self.sale_counts[product_id]} sale(s) imported"
+        if self.reversal_counts[product_id]:
+            notes += f", {self.reversal_counts[product_id]} reversed"
+        return notes
+
+
 class CSVParserService:
     """Service to parse and validate CSV files with comprehensive validation and duplicate detection"""
 
@@ -26,21 +176,55 @@ class CSVParserService:
     REQUIRED_COLUMNS = {'Date', 'Product', 'Quantity', 'Amount'}
     OPTIONAL_COLUMNS = {'Time', 'Customer', 'PaymentMethod', 'UnitPrice', 'Notes'}
 
-    def __init__(self, file_upload_record: FileUploadRecord) -> None:
-        """Initialize parser with FileUploadRecord instance"""
+    # Chunk validation engines: 'python' validates row by row, 'pandas' column by column
+    VALIDATION_ENGINES = {'python', 'pandas'}
+
+    # Chunk writers: 'orm' bulk_create, 'copy' PostgreSQL COPY + INSERT ... ON CONFLICT,
+    # 'auto' uses 'copy' on PostgreSQL and 'orm' elsewhere
+    IMPORT_BACKENDS = {'auto', 'orm', 'copy'}
+
+    def __init__(self, file_upload_record: FileUploadRecord, batch_size: Optional[int] = None,
+                 engine: Optional[str] = None) -> None:
+        """Initialize parser with FileUploadRecord instance
+
+        Args:
+            file_upload_record: Upload to parse
+            batch_size: Rows written per bulk chunk (defaults to CSV_IMPORT_BATCH_SIZE,
+                a value of 1 falls back to row-by-row processing)
+            engine: Chunk validation engine (defaults to CSV_IMPORT_ENGINE)
+        """
         self.file_upload = file_upload_record
         self.business = file_upload_record.business
+        if batch_size is None:
+            batch_size = getattr(settings, 'CSV_IMPORT_BATCH_SIZE', 500)
+        self.batch_size = max(1, int(batch_size))
+        self.engine = engine or getattr(settings, 'CSV_IMPORT_ENGINE', 'python')
+        if self.engine not in self.VALIDATION_ENGINES:
+            raise ValueError(f"Unknown CSV validation engine: {self.engine}")
+        backend = getattr(settings, 'CSV_IMPORT_BACKEND', 'auto')
+        if backend not in self.IMPORT_BACKENDS:
+            raise ValueError(f"Unknown CSV import backend: {backend}")
+        # The ORM path remains the fallback where COPY is not available (SQLite)
+        self.backend = 'copy' if backend != 'orm' and CopyTransactionWriter.is_supported() else 'orm'
         self.processed_rows = 0
         self.failed_rows = 0
         self.created_transactions = 0
         self.skipped_duplicates = 0
-        self.errors: List[Dict[str, Any]] = []
+        self.errors: List[Dict[str, Any]] = []  # First error_limit errors, the rest only counted
+        self.error_counts: Dict[str, int] = {}  # Failed rows per error type
+        self.error_limit = getattr(settings, 'CSV_ERROR_SUMMARY_LIMIT', 100)
+        self._failed_jobs: List[FailedJob] = []  # Written in bulk at the end of each chunk
         self.affected_products: Set[str] = set()  # Track affected product IDs
         self.affected_customers: Set[str] = set()  # Track affected customer IDs
+        self.import_hashes = ImportHashIndex(self.business)
 
     def parse_csv(self) -> Dict[str, Any]:
         """Parse CSV file and create transactions
 
+        Rows are committed in numbered chunks, each together with a checkpoint
+        (chunk index and byte offset) on the upload record. If the upload has a
+        checkpoint from an interrupted run, parsing resumes right after it.
+
         Returns:
             Dictionary with parsing results including counts and errors
         """
@@ -52,83 +236,210 @@ class CSVParserService:
             logger.info(f"CSV upload started: file_id={self.file_upload.file_id}, "
                        f"business={self.business.name}, filename={self.file_upload.original_filename}")
 
+            resuming = self.file_upload.checkpoint_chunk > 0
+            if resuming:
+                self._restore_checkpoint()
+            else:
+                self.file_upload.processing_started_at = timezone.now()
+                # Cheap newline scan, the rows themselves are streamed below
+                self.file_upload.row_count = self._count_rows(file_path)
             self.file_upload.status = 'processing'
-            self.file_upload.processing_started_at = timezone.now()
+            self.file_upload.error_message = None
             self.file_upload.save()
 
-            with open(file_path, 'r', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-
-                if not reader.fieldnames:
-                    raise ValueError("CSV file is empty")
-
-                # Validate required columns exist (case-insensitive)
-                fieldnames_set = set(reader.fieldnames) if reader.fieldnames else set()
-                fieldnames_lower = {name.lower() for name in fieldnames_set}
-                required_lower = {name.lower() for name in self.REQUIRED_COLUMNS}
-                missing_columns = required_lower - fieldnames_lower
-                if missing_columns:
-                    raise ValueError(f"Missing required columns: {', '.join(sorted(missing_columns))}")
-
-                rows = list(reader)
-                self.file_upload.row_count = len(rows)
-                self.file_upload.save()
-
-                # Process each row
-                for row_num, row in enumerate(rows, start=2):  # Start at 2 (header is row 1)
-                    try:
-                        self._process_row(row, row_num)
-                    except Exception as e:
-                        self.failed_rows += 1
-                        self.errors.append({
-                            'row': row_num,
-                            'error': str(e)
-                        })
-                        # Create FailedJob record for audit trail
-                        self._store_failed_row(row_num, row, str(e))
-
-            # Mark as completed
-            self.file_upload.status = 'completed'
-            self.file_upload.processing_completed_at = timezone.now()
-            self.file_upload.rows_processed = self.processed_rows
-            self.file_upload.rows_failed = self.failed_rows
-            self.file_upload.created_transactions = self.created_transactions
-            self.file_upload.processing_errors = self.errors
-            self.file_upload.save()
+            if is_parquet(file_path):
+                self._import_parquet(resuming)
+                return self._complete()
 
-            logger.info(
-                f"CSV parsing: Created {self.created_transactions} transactions, "
-                f"skipped {self.skipped_duplicates} duplicates, failed {self.failed_rows}"
-            )
+            # .gz/.zip uploads are decompressed while reading, offsets refer to the CSV
+            with open_csv_stream(file_path) as csvfile:
+                lines = OffsetLineReader(csvfile)
+                reader = csv.DictReader(lines)
 
-            # Verify data consistency
-            self._verify_data_consistency()
+                self._validate_headers(reader.fieldnames)
 
-            # Publish event to trigger downstream processing
-            self._publish_transaction_parsed_event()
+                if resuming:
+                    if (compression_for(file_path) is None
+                            and self.file_upload.checkpoint_offset > os.path.getsize(file_path)):
+                        raise ValueError("Checkpoint offset is beyond the end of the file")
+                    lines.seek(self.file_upload.checkpoint_offset)
 
-            return {
-                'created_count': self.created_transactions,
-                'skipped_count': self.skipped_duplicates,
-                'failed_count': self.failed_rows,
-                'duplicates_count': self.skipped_duplicates,
-                'errors': self.errors
-            }
+                # Start at 2 (header is row 1), after the rows already committed
+                numbered_rows = enumerate(reader, start=2 + self.processed_rows + self.failed_rows)
+
+                for chunk in iter_chunks(numbered_rows, self.batch_size):
+                    with db_transaction.atomic():
+                        self._import_chunk(chunk)
+                        self._save_checkpoint(lines.offset)
+
+            return self._complete()
 
         except Exception as e:
-            # Critical error - mark as failed
-            logger.error(f"CSV parsing failed: {str(e)}")
-            self.file_upload.status = 'failed'
-            self.file_upload.error_message = str(e)
-            self.file_upload.processing_completed_at = timezone.now()
-            self.file_upload.save()
-            return {
-                'created_count': 0,
-                'skipped_count': 0,
-                'failed_count': 0,
-                'duplicates_count': 0,
-                'errors': [{'error': str(e), 'row': 0}]
-            }
+            return self._fail(e)
+
+    def _count_rows(self, file_path: str) -> int:
+        """Data rows of the upload, estimated for CSV and exact from the footer for Parquet"""
+        if is_parquet(file_path):
+            from .parquet_import import ParquetTransactionReader
+
+            return ParquetTransactionReader(file_path, ()).num_rows
+        return count_data_rows(file_path)
+
+    def _import_parquet(self, resuming: bool) -> None:
+        """Import a Parquet export in record batches through the same chunked path
+
+        Columns keep their types, so rows are validated by the row parser without
+        a string round-trip. The checkpoint offset is the number of rows consumed.
+        """
+        from .parquet_import import ParquetTransactionReader
+
+        reader = ParquetTransactionReader(self.file_upload.file_path, self.REQUIRED_COLUMNS | self.OPTIONAL_COLUMNS)
+        self._validate_headers(reader.fieldnames)
+
+        # The columnar engine works on strings, typed values go through the row parser
+        self.engine = 'python'
+        consumed = self.file_upload.checkpoint_offset if resuming else 0
+        # Start at 1 (no header row), after the rows already committed
+        numbered_rows = enumerate(reader.iter_rows(self.batch_size, start=consumed), start=1 + consumed)
+
+        for chunk in iter_chunks(numbered_rows, self.batch_size):
+            consumed += len(chunk)
+            with db_transaction.atomic():
+                self._import_chunk(chunk)
+                self._save_checkpoint(consumed)
+
+    def _complete(self) -> Dict[str, Any]:
+        """Mark the upload completed, verify data and publish the downstream event"""
+        self._flush_failed_rows()
+        self.file_upload.status = 'completed'
+        self.file_upload.processing_completed_at = timezone.now()
+        self.file_upload.row_count = self.processed_rows + self.failed_rows  # Replace the estimate
+        self.file_upload.rows_processed = self.processed_rows
+        self.file_upload.rows_failed = self.failed_rows
+        self.file_upload.created_transactions = self.created_transactions
+        self.file_upload.processing_errors = self.errors
+        self.file_upload.error_counts = self.error_counts
+        self.file_upload.save()
+
+        logger.info(
+            f"CSV parsing: Created {self.created_transactions} transactions, "
+            f"skipped {self.skipped_duplicates} duplicates, failed {self.failed_rows}"
+        )
+
+        # Verify data consistency
+        self._verify_data_consistency()
+
+        # Publish event to trigger downstream processing
+        self._publish_transaction_parsed_event()
+
+        return {
+            'created_count': self.created_transactions,
+            'skipped_count': self.skipped_duplicates,
+            'failed_count': self.failed_rows,
+            'duplicates_count': self.skipped_duplicates,
+            'errors': self.errors
+        }
+
+    def _fail(self, error: Exception) -> Dict[str, Any]:
+        """Critical error - mark the upload as failed"""
+        logger.error(f"CSV parsing failed: {str(error)}")
+        self.file_upload.status = 'failed'
+        self.file_upload.error_message = str(error)
+        self.file_upload.processing_completed_at = timezone.now()
+        # Leave counters and checkpoint as last committed so the import can be resumed
+        self.file_upload.save(update_fields=['status', 'error_message', 'processing_completed_at'])
+        return {
+            'created_count': 0,
+            'skipped_count': 0,
+            'failed_count': 0,
+            'duplicates_count': 0,
+            'errors': [{'error': str(error), 'row': 0}]
+        }
+
+    def _validate_headers(self, fieldnames: Optional[List[str]]) -> None:
+        """Validate required columns exist (case-insensitive)"""
+        if not fieldnames:
+            raise ValueError("CSV file is empty")
+
+        fieldnames_lower = {name.lower() for name in fieldnames}
+        required_lower = {name.lower() for name in self.REQUIRED_COLUMNS}
+        missing_columns = required_lower - fieldnames_lower
+        if missing_columns:
+            raise ValueError(f"Missing required columns: {', '.join(sorted(missing_columns))}")
+
+    def _import_chunk(self, chunk: List[Tuple[int, Dict[str, str]]]) -> None:
+        """Import a chunk of numbered rows, batched or row by row"""
+        if self.batch_size > 1:
+            # Batched mode: validate the chunk, then write it in one atomic block
+            self._process_chunk(chunk)
+        else:
+            # Process each row
+            for row_num, row in chunk:
+                try:
+                    self._process_row(row, row_num)
+                except Exception as e:
+                    self._record_failed_row(row_num, row, str(e))
+
+        self._flush_failed_rows()
+
+    def _iter_range_chunks(self, fieldnames: List[str], start: int, end: int,
+                           first_row_num: int) -> Iterable[List[Tuple[int, Dict[str, str]]]]:
+        """Yield chunks of numbered rows read from a line-aligned byte range of the file"""
+        with open_csv_stream(self.file_upload.file_path) as csvfile:
+            lines = OffsetLineReader(csvfile, end=end)
+            lines.seek(start)
+            reader = csv.DictReader(lines, fieldnames=fieldnames)
+            yield from iter_chunks(enumerate(reader, start=first_row_num), self.batch_size)
+
+    def scan_range(self, fieldnames: List[str], start: int, end: int) -> Dict[str, Any]:
+        """Validate a byte range without writing anything
+
+        Used by the parallel import to create every referenced product and
+        customer before any rows are written.
+
+        Returns:
+            Dictionary with first unit price per product name, customer names,
+            row hashes of valid rows, and whether any field spans several lines
+        """
+        products: Dict[str, Decimal] = {}
+        customers: Set[str] = set()
+        row_hashes: List[str] = []
+        multiline = False
+
+        for chunk in self._iter_range_chunks(fieldnames, start, end, first_row_num=0):
+            multiline = multiline or any(
+                isinstance(value, str) and '\n' in value
+                for _, row in chunk for value in row.values()
+            )
+            valid_rows, _ = self._parse_chunk(chunk)
+            for _, _, parsed in valid_rows:
+                products.setdefault(parsed['product_name'], parsed['unit_price'])
+                customers.add(parsed['customer_name'])
+                row_hashes.append(parsed['row_hash'])
+
+        return {
+            'products': products,
+            'customers': customers,
+            'row_hashes': row_hashes,
+            'multiline': multiline
+        }
+
+    def import_range(self, fieldnames: List[str], start: int, end: int, first_row_num: int,
+                     claimed_hashes: Iterable[str] = ()) -> None:
+        """Import a byte range of the file without touching the upload record
+
+        Args:
+            fieldnames: Header of the file
+            start: Byte offset of the first line of the range
+            end: Byte offset right after the last line of the range
+            first_row_num: Row number of the first line
+            claimed_hashes: Row hashes already imported from earlier ranges
+        """
+        for row_hash in claimed_hashes:
+            self.import_hashes.add(row_hash)
+
+        for chunk in self._iter_range_chunks(fieldnames, start, end, first_row_num):
+            self._import_chunk(chunk)
 
     def _process_row(self, row: Dict[str, str], row_num: int) -> None:
         """Process a single CSV row
@@ -137,6 +448,103 @@ class CSVParserService:
             row: Dictionary representing a CSV row
             row_num: Row number in CSV file
 
+        Raises:
+            ValueError: If any validation fails
+        """
+        parsed = self._parse_row(row)
+        row_hash = parsed['row_hash']
+
+        # Check for duplicates
+        if self._is_duplicate(row_hash):
+            self.skipped_duplicates += 1
+            self.processed_rows += 1
+            logger.info(f"Duplicate detected: hash={row_hash}, skipped")
+            return
+
+        customer_name = parsed['customer_name']
+        amount = parsed['amount']
+        quantity = parsed['quantity']
+        date = parsed['date']
+
+        # Use atomic transaction for consistency
+        with db_transaction.atomic():
+            # Get or create product
+            product = self._get_or_create_product(parsed['product_name'], parsed['unit_price'])
+            self.affected_products.add(str(product.product_id))
+
+            # Get or create customer (only if not "Walk-in")
+            customer = None
+            if customer_name and customer_name.lower() != 'walk-in':
+                customer = self._get_or_create_customer(customer_name)
+                if customer:
+                    self.affected_customers.add(str(customer.customer_id))
+
+            # Create transaction
+            transaction = Transaction.objects.create(
+                business=self.business,
+                product=product,
+                customer=customer,
+                date=date,
+                time=parsed['time'],
+                quantity=quantity,
+                unit_price=parsed['unit_price'],
+                amount=amount,
+                payment_method=parsed['payment_method'],
+                notes=parsed['notes'] or None,
+                file_upload=self.file_upload,
+                csv_import_hash=row_hash
+            )
+
+            # Update product stock, customer stats and the stock ledger
+            sales = SalesAccumulator()
+            sales.add(product, quantity, customer, amount, date)
+            self._apply_sales(sales)
+
+        self.import_hashes.add(row_hash)
+        self.processed_rows += 1
+        self.created_transactions += 1
+
+    def _save_checkpoint(self, offset: int) -> None:
+        """Record a committed chunk, called inside the chunk's atomic block"""
+        self.file_upload.checkpoint_chunk += 1
+        self.file_upload.checkpoint_offset = offset
+        self.file_upload.checkpoint_at = timezone.now()
+        self.file_upload.rows_processed = self.processed_rows
+        self.file_upload.rows_failed = self.failed_rows
+        self.file_upload.created_transactions = self.created_transactions
+        self.file_upload.save(update_fields=[
+            'checkpoint_chunk', 'checkpoint_offset', 'checkpoint_at',
+            'rows_processed', 'rows_failed', 'created_transactions'
+        ])
+
+    def _restore_checkpoint(self) -> None:
+        """Continue counters, errors and affected products from the committed chunks"""
+        self.processed_rows = self.file_upload.rows_processed
+        self.failed_rows = self.file_upload.rows_failed
+        self.created_transactions = self.file_upload.created_transactions
+        failed_jobs = FailedJob.objects.filter(file_upload=self.file_upload).order_by('row_number')
+        for error_message in failed_jobs.values_list('error_message', flat=True).iterator():
+            error_type = self._error_type(error_message)
+            self.error_counts[error_type] = self.error_counts.get(error_type, 0) + 1
+        self.errors = [
+            {'row': row_number, 'error': error_message}
+            for row_number, error_message in failed_jobs.values_list('row_number', 'error_message')[:self.error_limit]
+        ]
+        self.affected_products.update(
+            str(product_id) for product_id in StockMovement.objects.filter(
+                business=self.business,
+                reference_type='csv_upload',
+                reference_id=str(self.file_upload.file_id)
+            ).values_list('product_id', flat=True).distinct()
+        )
+        logger.info(
+            f"Resuming CSV upload {self.file_upload.file_id} after chunk "
+            f"{self.file_upload.checkpoint_chunk} (byte {self.file_upload.checkpoint_offset})"
+        )
+
+    def _parse_row(self, row: Dict[str, str]) -> Dict[str, Any]:
+        """Validate a CSV row and return its parsed values
+
         Raises:
             ValueError: If any validation fails
         """
@@ -151,13 +559,13 @@ class CSVParserService:
         amount_str = self._get_field(normalized_row, 'Amount')
 
         # Validate required fields
-        if not date_str:
+        if date_str in (None, ''):
             raise ValueError("Date is required")
         if not product_name:
             raise ValueError("Product is required")
-        if not quantity_str:
+        if quantity_str in (None, ''):
             raise ValueError("Quantity is required")
-        if not amount_str:
+        if amount_str in (None, ''):
             raise ValueError("Amount is required")
 
         # Parse and validate date
@@ -186,57 +594,237 @@ class CSVParserService:
         if payment_method not in self.VALID_PAYMENT_METHODS:
             payment_method = 'other'
 
-        # Compute hash for duplicate detection
-        row_hash = self._compute_row_hash(date, product_name, quantity, amount, customer_name)
+        return {
+            'date': date,
+            'time': time_obj,
+            'product_name': product_name,
+            'quantity': quantity,
+            'amount': amount,
+            'unit_price': unit_price,
+            'customer_name': customer_name,
+            'payment_method': payment_method,
+            'notes': notes,
+            # Compute hash for duplicate detection
+            'row_hash': self._compute_row_hash(date, product_name, quantity, amount, customer_name),
+        }
+
+    def _process_chunk(self, chunk: List[Tuple[int, Dict[str, str]]]) -> None:
+        """Validate a chunk of rows and write the valid ones in a single atomic block
+
+        If the bulk write fails the chunk is replayed row by row so errors are
+        still attributed to the offending rows.
+        """
+        valid_rows = self._validate_chunk(chunk)
+
+        if self.backend == 'copy':
+            # Duplicates are skipped by the database (ON CONFLICT), no lookup needed
+            parsed_rows = valid_rows
+        else:
+            # One query for the whole chunk, intra-file duplicates are caught in memory
+            self.import_hashes.load(parsed['row_hash'] for _, _, parsed in valid_rows)
+
+            parsed_rows = []
+            for row_num, row, parsed in valid_rows:
+                row_hash = parsed['row_hash']
+                if self.import_hashes.is_duplicate(row_hash):
+                    self.skipped_duplicates += 1
+                    self.processed_rows += 1
+                    logger.info(f"Duplicate detected: hash={row_hash}, skipped")
+                    continue
+
+                self.import_hashes.add(row_hash)
+                parsed_rows.append((row_num, row, parsed))
+
+        if not parsed_rows:
+            return
 
-        # Check for duplicates
-        if self._is_duplicate(row_hash):
-            self.skipped_duplicates += 1
-            self.processed_rows += 1
-            logger.info(f"Duplicate detected: hash={row_hash}, skipped")
+        try:
+            with db_transaction.atomic():
+                if self.backend == 'copy':
+                    created = self._copy_chunk([parsed for _, _, parsed in parsed_rows])
+                else:
+                    self._write_chunk([parsed for _, _, parsed in parsed_rows])
+                    created = len(parsed_rows)
+        except Exception as e:
+            logger.warning(f"Batch write failed, retrying {len(parsed_rows)} rows individually: {e}")
+            for row_num, row, parsed in parsed_rows:
+                # Rolled back, so the row must not count as a duplicate of itself
+                self.import_hashes.discard(parsed['row_hash'])
+                try:
+                    self._process_row(row, row_num)
+                except Exception as row_error:
+                    self._record_failed_row(row_num, row, str(row_error))
             return
 
-        # Use atomic transaction for consistency
-        with db_transaction.atomic():
-            # Get or create product
-            product = self._get_or_create_product(product_name, unit_price)
-            self.affected_products.add(str(product.product_id))
+        self.processed_rows += len(parsed_rows)
+        self.created_transactions += created
+        self.skipped_duplicates += len(parsed_rows) - created
+
+    def _validate_chunk(self, chunk: List[Tuple[int, Dict[str, str]]]) -> List[Tuple[int, Dict[str, str], Dict[str, Any]]]:
+        """Parse a chunk with the configured engine, recording failed rows"""
+        valid_rows, failed_rows = self._parse_chunk(chunk)
+        for row_num, row, error_message in failed_rows:
+            self._record_failed_row(row_num, row, error_message)
+        return valid_rows
+
+    def _parse_chunk(self, chunk: List[Tuple[int, Dict[str, str]]]) -> Tuple[
+            List[Tuple[int, Dict[str, str], Dict[str, Any]]], List[Tuple[int, Dict[str, str], str]]]:
+        """Parse a chunk with the configured engine into valid rows and (row_num, row, error) failures"""
+        if self.engine == 'pandas':
+            from .csv_validation import ColumnarChunkValidator
+
+            validator = ColumnarChunkValidator(
+                max_quantity=self.MAX_QUANTITY,
+                max_amount=self.MAX_AMOUNT,
+                payment_methods=self.VALID_PAYMENT_METHODS,
+                fallback=self._parse_row
+            )
+            return validator.validate(chunk)
 
-            # Get or create customer (only if not "Walk-in")
-            customer = None
-            if customer_name and customer_name.lower() != 'walk-in':
-                customer = self._get_or_create_customer(customer_name)
-                if customer:
-                    self.affected_customers.add(str(customer.customer_id))
+        valid_rows = []
+        failed_rows = []
+        for row_num, row in chunk:
+            try:
+                valid_rows.append((row_num, row, self._parse_row(row)))
+            except Exception as e:
+                failed_rows.append((row_num, row, str(e)))
+        return valid_rows, failed_rows
 
-            # Create transaction
-            transaction = Transaction.objects.create(
+    def _write_chunk(self, parsed_rows: List[Dict[str, Any]]) -> None:
+        """Bulk create transactions for parsed rows and apply stock/customer aggregates
+
+        Must be called inside an atomic block.
+        """
+        products = self._resolve_products(parsed_rows)
+        customers = self._resolve_customers(parsed_rows)
+
+        transactions = []
+        sales = SalesAccumulator()
+
+        for parsed in parsed_rows:
+            product = products[parsed['product_name']]
+            customer = customers.get(parsed['customer_name'])
+
+            transactions.append(Transaction(
                 business=self.business,
                 product=product,
                 customer=customer,
-                date=date,
-                time=time_obj,
-                quantity=quantity,
-                unit_price=unit_price,
-                amount=amount,
-                payment_method=payment_method,
-                notes=notes or None,
+                date=parsed['date'],
+                time=parsed['time'],
+                quantity=parsed['quantity'],
+                unit_price=parsed['unit_price'],
+                amount=parsed['amount'],
+                payment_method=parsed['payment_method'],
+                notes=parsed['notes'] or None,
                 file_upload=self.file_upload,
-                csv_import_hash=row_hash
-            )
+                csv_import_hash=parsed['row_hash']
+            ))
+
+            sales.add(product, parsed['quantity'], customer, parsed['amount'], parsed['date'])
+            self.affected_products.add(str(product.product_id))
+            if customer:
+                self.affected_customers.add(str(customer.customer_id))
+
+        Transaction.objects.bulk_create(transactions, batch_size=self.batch_size)
 
-            # Update product stock
-            product.current_stock -= quantity
-            product.save()
+        # One stock UPDATE and one customer UPDATE for the whole chunk
+        self._apply_sales(sales)
 
-            # Update customer stats if applicable
+    def _copy_chunk(self, parsed_rows: List[Dict[str, Any]]) -> int:
+        """Write parsed rows through COPY and a set-based insert, returning the created count
+
+        Must be called inside an atomic block.
+        """
+        products = self._resolve_products(parsed_rows)
+        customers = self._resolve_customers(parsed_rows)
+        products_by_id = {str(product.pk): product for product in products.values()}
+        customers_by_id = {str(customer.pk): customer for customer in customers.values()}
+
+        created = CopyTransactionWriter(self.business, self.file_upload).write(parsed_rows)
+
+        # Stock and customer stats only for rows that were not duplicates
+        sales = SalesAccumulator()
+        for product_id, customer_id, quantity, amount, date in created:
+            product = products_by_id[str(product_id)]
+            customer = customers_by_id.get(str(customer_id)) if customer_id else None
+            sales.add(product, quantity, customer, amount, date)
+            self.affected_products.add(str(product.product_id))
             if customer:
-                customer.total_purchases += amount
-                customer.last_purchase = date
-                customer.save()
+                self.affected_customers.add(str(customer.customer_id))
+
+        self._apply_sales(sales)
+        return len(created)
+
+    def _apply_sales(self, sales: SalesAccumulator) -> None:
+        """Apply accumulated sales against this upload, must be called inside an atomic block"""
+        sales.apply(
+            self.business,
+            reference_type='csv_upload',
+            reference_id=str(self.file_upload.file_id),
+            user=self.file_upload.user
+        )
 
-        self.processed_rows += 1
-        self.created_transactions += 1
+    def _resolve_products(self, parsed_rows: List[Dict[str, Any]]) -> Dict[str, Product]:
+        """Load or create every product referenced by a chunk, keyed by name"""
+        unit_prices: Dict[str, Decimal] = {}
+        for parsed in parsed_rows:
+            unit_prices.setdefault(parsed['product_name'], parsed['unit_price'])
+        return self._ensure_products(unit_prices)
+
+    def _ensure_products(self, unit_prices: Dict[str, Decimal]) -> Dict[str, Product]:
+        """Load products by name, creating missing ones with the given unit price"""
+        products = self._load_by_name(Product, unit_prices)
+
+        missing = [name for name in unit_prices if name not in products]
+        if missing:
+            Product.objects.bulk_create(
+                [
+                    Product(
+                        business=self.business,
+                        name=name,
+                        unit_price=unit_prices[name],
+                        sku=f'SKU-{uuid.uuid4().hex[:8].upper()}',
+                        reorder_point=50
+                    )
+                    for name in missing
+                ],
+                ignore_conflicts=True
+            )
+            invalidate_product_index(self.business.id)
+            # Re-read so concurrently created products resolve to their stored rows
+            products.update(self._load_by_name(Product, missing))
+
+        return products
+
+    def _resolve_customers(self, parsed_rows: List[Dict[str, Any]]) -> Dict[str, Customer]:
+        """Load or create every named (non walk-in) customer in a chunk, keyed by name"""
+        return self._ensure_customers(parsed['customer_name'] for parsed in parsed_rows)
+
+    def _ensure_customers(self, names: Iterable[str]) -> Dict[str, Customer]:
+        """Load customers by name, creating missing ones; walk-in sales have no customer"""
+        names = {name for name in names if name and name.lower() != 'walk-in'}
+        if not names:
+            return {}
+
+        customers = self._load_by_name(Customer, names)
+
+        missing = [name for name in names if name not in customers]
+        if missing:
+            Customer.objects.bulk_create(
+                [Customer(business=self.business, name=name, phone=None, email=None) for name in missing],
+                ignore_conflicts=True
+            )
+            customers.update(self._load_by_name(Customer, missing))
+
+        return customers
+
+    def _load_by_name(self, model, names: Iterable[str]) -> Dict[str, Any]:
+        """Fetch this business's products or customers by name, one IN query per batch"""
+        return {
+            obj.name: obj
+            for batch in iter_chunks(names, ImportHashIndex.QUERY_BATCH_SIZE)
+            for obj in model.objects.filter(business=self.business, name__in=batch)
+        }
 
     def _get_field(self, row: Dict[str, str], field_name: str) -> Optional[str]:
         """Get field value from row (case-insensitive)"""
@@ -246,9 +834,14 @@ class CSVParserService:
         return None
 
     def _parse_date(self, date_str: str) -> datetime.date:
-        """Parse and validate date field"""
+        """Parse and validate date field, typed dates (Parquet) are used as they are"""
         try:
-            date = datetime.strptime(date_str, '%Y-%m-%d').date()
+            if isinstance(date_str, datetime):
+                date = date_str.date()
+            elif isinstance(date_str, date_type):
+                date = date_str
+            else:
+                date = datetime.strptime(date_str, '%Y-%m-%d').date()
             if date > timezone.now().date():
                 raise ValueError(f"Date cannot be in the future: {date_str}")
             return date
@@ -258,6 +851,8 @@ class CSVParserService:
     def _parse_quantity(self, quantity_str: str) -> int:
         """Parse and validate quantity field"""
         try:
+            if isinstance(quantity_str, float) and not quantity_str.is_integer():
+                raise ValueError("Quantity must be a whole number")
             quantity = int(quantity_str)
             if quantity <= 0:
                 raise ValueError("Quantity must be > 0")
@@ -270,7 +865,7 @@ class CSVParserService:
     def _parse_amount(self, amount_str: str) -> Decimal:
         """Parse and validate amount field"""
         try:
-            amount = Decimal(amount_str)
+            amount = self._to_decimal(amount_str)
             if amount <= 0:
                 raise ValueError("Amount must be > 0")
             if amount > self.MAX_AMOUNT:
@@ -280,7 +875,11 @@ class CSVParserService:
             raise ValueError(f"Invalid amount: {amount_str}")
 
     def _parse_time(self, time_str: str) -> Optional[datetime.time]:
-        """Parse and validate time field"""
+        """Parse and validate time field, typed times (Parquet) are used as they are"""
+        if isinstance(time_str, datetime):
+            return time_str.time()
+        if isinstance(time_str, time_type):
+            return time_str
         try:
             return datetime.strptime(time_str, '%H:%M').time()
         except ValueError:
@@ -289,10 +888,18 @@ class CSVParserService:
     def _parse_unit_price(self, unit_price_str: str) -> Decimal:
         """Parse and validate unit price field"""
         try:
-            return Decimal(unit_price_str)
+            return self._to_decimal(unit_price_str)
         except Exception:
             raise ValueError(f"Invalid unit price: {unit_price_str}")
 
+    @staticmethod
+    def _to_decimal(value: Any) -> Decimal:
+        """Convert a CSV string or typed number to Decimal"""
+        if isinstance(value, float):
+            # Shortest repr, Decimal(0.1) would keep the binary expansion
+            return Decimal(repr(value))
+        return Decimal(value)
+
     def _compute_row_hash(self, date: datetime.date, product: str, qty: int,
                          amount: Decimal, customer: str) -> str:
         """Compute MD5 hash for duplicate detection"""
@@ -300,11 +907,8 @@ class CSVParserService:
         return hashlib.md5(hash_input.encode()).hexdigest()
 
     def _is_duplicate(self, row_hash: str) -> bool:
-        """Check if transaction hash already exists for this business"""
-        return Transaction.objects.filter(
-            business=self.business,
-            csv_import_hash=row_hash
-        ).exists()
+        """Check if transaction hash already exists for this business or this file"""
+        return self.import_hashes.is_duplicate(row_hash)
 
     def _get_or_create_product(self, product_name: str, unit_price: Decimal) -> Product:
         """Get or create product with auto-generated SKU"""
@@ -331,19 +935,50 @@ class CSVParserService:
         )
         return customer
 
+    def _record_failed_row(self, row_num: int, row: Dict[str, str], error_message: str) -> None:
+        """Count a failed row, keep it in the error summary and store it for the audit trail"""
+        self.failed_rows += 1
+        self.add_error_summary(
+            [{'row': row_num, 'error': error_message}],
+            {self._error_type(error_message): 1}
+        )
+        # Create FailedJob record for audit trail
+        self._store_failed_row(row_num, row, error_message)
+
+    def add_error_summary(self, errors: List[Dict[str, Any]], error_counts: Dict[str, int]) -> None:
+        """Merge errors into the capped summary stored on the upload record"""
+        self.errors.extend(errors[:max(self.error_limit - len(self.errors), 0)])
+        for error_type, count in error_counts.items():
+            self.error_counts[error_type] = self.error_counts.get(error_type, 0) + count
+
+    @staticmethod
+    def _error_type(error_message: str) -> str:
+        """Group errors by the message before any row-specific value, e.g. 'Invalid quantity'"""
+        return error_message.split(':', 1)[0].strip()[:100] or 'Unknown error'
+
     def _store_failed_row(self, row_num: int, row: Dict[str, str], error_message: str) -> None:
-        """Store failed row in FailedJob table for debugging"""
+        """Buffer failed row for the FailedJob table, see _flush_failed_rows"""
+        self._failed_jobs.append(FailedJob(
+            business=self.business,
+            file_upload=self.file_upload,
+            row_number=row_num,
+            # Dates and Decimals of typed (Parquet) rows as strings
+            row_data=json.loads(json.dumps(row, cls=DjangoJSONEncoder)),
+            error_message=error_message
+        ))
+
+    def _flush_failed_rows(self) -> None:
+        """Write buffered failed rows with one bulk insert"""
+        if not self._failed_jobs:
+            return
         try:
-            FailedJob.objects.create(
-                business=self.business,
-                file_upload=self.file_upload,
-                row_number=row_num,
-                row_data=dict(row),
-                error_message=error_message
-            )
-        except Exception:
-            # Log but don't fail if we can't store the failed job
-            pass
+            # Savepoint, the rows are stored inside the chunk's transaction
+            with db_transaction.atomic():
+                FailedJob.objects.bulk_create(self._failed_jobs, batch_size=self.batch_size)
+        except Exception as e:
+            # Log but don't fail if we can't store the failed jobs
+            logger.warning(f"Failed to store {len(self._failed_jobs)} failed rows: {e}")
+        self._failed_jobs = []
 
     def _publish_transaction_parsed_event(self) -> None:
         """Publish event to trigger downstream processing"""
@@ -365,55 +1000,14 @@ class CSVParserService:
             logger.error(f"Failed to publish transaction.parsed event: {e}")
 
     def _verify_data_consistency(self) -> None:
-        """Verify data consistency after parsing completes"""
-        logger.info("Verifying data consistency...")
-
-        try:
-            # 1. Assert all transactions belong to correct business
-            bad_transactions = Transaction.objects.filter(
-                file_upload=self.file_upload
-            ).exclude(business=self.business)
-
-            if bad_transactions.exists():
-                logger.warning(
-                    f"Data consistency issue: {bad_transactions.count()} transactions "
-                    f"belong to different business than upload"
-                )
-
-            # 2. Verify product stock consistency
-            for product_id in self.affected_products:
-                try:
-                    product = Product.objects.get(product_id=product_id, business=self.business)
-
-                    # Calculate expected stock from all transactions for this product
-                    # Expected stock = initial stock - sum of quantities
-                    # Since we don't track initial stock, we just verify stock is non-negative
-                    if product.current_stock < 0:
-                        logger.warning(
-                            f"Data consistency issue: Product {product.name} "
-                            f"(ID: {product_id}) has negative stock: {product.current_stock}"
-                        )
-                except Product.DoesNotExist:
-                    logger.warning(f"Data consistency issue: Product {product_id} not found")
-
-            # 3. Verify all customers referenced in transactions exist
-            from_file = Transaction.objects.filter(
-                file_upload=self.file_upload,
-                customer__isnull=False
-            ).values_list('customer_id', flat=True).distinct()
-
-            missing_customers = []
-            for customer_id in from_file:
-                if not Customer.objects.filter(customer_id=customer_id).exists():
-                    missing_customers.append(customer_id)
-
-            if missing_customers:
-                logger.warning(
-                    f"Data consistency issue: {len(missing_customers)} customers "
-                    f"referenced in transactions but not found: {missing_customers}"
-                )
+        """Verify data consistency after parsing completes, in the background if CSV_VERIFY_ASYNC is set"""
+        from .import_verification import ImportVerificationService
 
-            logger.info("Data consistency verification completed")
+        if getattr(settings, 'CSV_VERIFY_ASYNC', False):
+            ImportVerificationService.verify_in_background(self.file_upload.file_id)
+            return
 
+        try:
+            ImportVerificationService(self.file_upload).verify()
         except Exception as e:
             logger.error(f"Error during data consistency verification: {e}")
@@ -1,9 +1,11 @@
 import io
 import os
+import shutil
 import tempfile
 from datetime import datetime
 from decimal import Decimal
-from django.test import TestCase, Client
+from unittest import mock
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
@@ -11,10 +13,22 @@ from django.utils import timezone
 from rest_framework.test import APIClient, APITestCase
 from rest_framework_simplejwt.tokens import RefreshToken
 from accounts.models import Business
-from .models import FileUploadRecord, Product, Customer, Transaction, FailedJob
+from .models import FileUploadRecord, ChunkedUploadSession, Product, Customer, Transaction, FailedJob
 from .services import CSVParserService
 
 
+class TempMediaRootMixin:
+    """Run each test against its own empty MEDIA_ROOT, removed afterwards"""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+
 class CSVUploadTestCase(APITestCase):
     """Test CSV upload endpoint"""
 
@@ -31,6 +45,10 @@ class CSVUploadTestCase(APITestCase):
 
         self.upload_url = '/api/data/upload-csv'
 
+        # Upload rate limit counters are kept in the cache between tests
+        from django.core.cache import cache
+        cache.clear()
+
     def _create_csv_file(self, content, filename='test.csv'):
         """Helper to create CSV file"""
         csv_file = SimpleUploadedFile(
@@ -298,6 +316,334 @@ class CSVUploadTestCase(APITestCase):
         file_id = response.data['data']['file_id']
         self.assertTrue(FileUploadRecord.objects.filter(file_id=file_id).exists())
 
+    # Test 13: Failed rows are paginated per upload
+    def test_list_upload_errors_paginated(self):
+        """Test failed row detail is served from FailedJob page by page"""
+        rows = ''.join(f"2025-11-01,Product {i},abc,100\n" for i in range(12))
+        file_path = tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False).name
+        with open(file_path, 'w') as f:
+            f.write("Date,Product,Quantity,Amount\n" + rows)
+        self.addCleanup(os.unlink, file_path)
+        file_upload = FileUploadRecord.objects.create(
+            business=self.business, user=self.user, file_path=file_path,
+            original_filename='bad.csv', file_size=100
+        )
+        CSVParserService(file_upload).parse_csv()
+
+        url = f'/api/data/upload-csv/{file_upload.file_id}/errors/'
+        response = self.client.get(url, {'limit': 5, 'offset': 10})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 12)
+        self.assertEqual(response.data['error_counts'], {'Invalid quantity': 12})
+        self.assertEqual([item['row_number'] for item in response.data['results']], [12, 13])
+
+        other_user = User.objects.create_user(username='other', password='testpass123')
+        Business.objects.create(owner=other_user, name='Other Store', type='convenience')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(other_user).access_token}')
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    # Test 14: Byte-identical re-upload completes without processing
+    def test_reupload_of_processed_file_short_circuits(self):
+        """Test a re-upload of a processed file links to the original upload"""
+        import hashlib
+        from . import views
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        csv_content = self._get_valid_csv()
+
+        with override_settings(MEDIA_ROOT=media_root), \
+                mock.patch.object(views._executor, 'submit') as submit:
+            first = self.client.post(
+                '/api/data/upload-csv/', {'file': self._create_csv_file(csv_content)}, format='multipart'
+            )
+            self.assertEqual(first.status_code, 202)
+            original = FileUploadRecord.objects.get(file_id=first.data['data']['file_id'])
+            self.assertEqual(original.content_sha256, hashlib.sha256(csv_content.encode()).hexdigest())
+
+            # Still pending, the same bytes are processed again
+            pending = self.client.post(
+                '/api/data/upload-csv/', {'file': self._create_csv_file(csv_content)}, format='multipart'
+            )
+            self.assertEqual(pending.status_code, 202)
+            self.assertEqual(submit.call_count, 2)
+
+            CSVParserService(original).parse_csv()
+            response = self.client.post(
+                '/api/data/upload-csv/', {'file': self._create_csv_file(csv_content, 'again.csv')},
+                format='multipart'
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'completed')
+        self.assertEqual(response.data['data']['duplicate_of'], str(original.file_id))
+        self.assertEqual(submit.call_count, 2)
+
+        reupload = FileUploadRecord.objects.get(file_id=response.data['data']['file_id'])
+        self.assertEqual(reupload.status, 'completed')
+        self.assertEqual(reupload.duplicate_of, original)
+        self.assertEqual(reupload.rows_processed, 3)
+        self.assertEqual(reupload.created_transactions, 3)
+        self.assertEqual(Transaction.objects.filter(business=self.business).count(), 3)
+        # The original's transactions are reachable through the re-upload
+        self.assertEqual(
+            set(reupload.imported_transactions().values_list('pk', flat=True)),
+            set(original.transactions.values_list('pk', flat=True))
+        )
+
+        status_response = self.client.get(f'/api/data/upload-csv/{reupload.file_id}/')
+        self.assertEqual(status_response.data['duplicate_of'], original.file_id)
+
+        # An original with failed rows is imported again so those rows are retried
+        FileUploadRecord.objects.filter(content_sha256=original.content_sha256).update(rows_failed=1)
+        with override_settings(MEDIA_ROOT=media_root), \
+                mock.patch.object(views._executor, 'submit') as submit:
+            retry = self.client.post(
+                '/api/data/upload-csv/', {'file': self._create_csv_file(csv_content, 'retry.csv')},
+                format='multipart'
+            )
+        self.assertEqual(retry.status_code, 202)
+        self.assertNotIn('duplicate_of', retry.data['data'])
+        submit.assert_called_once()
+
+    # Test 15: Uploads stream straight to their final location
+    def test_upload_streamed_to_media_root(self):
+        """Test the upload is written once under MEDIA_ROOT and hashed on the way"""
+        import hashlib
+        from . import views
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        csv_content = self._get_valid_csv()
+
+        with override_settings(MEDIA_ROOT=media_root), \
+                mock.patch.object(views._executor, 'submit'), \
+                mock.patch.object(views, '_validate_csv_file', wraps=views._validate_csv_file) as validate:
+            response = self.client.post(
+                '/api/data/upload-csv/', {'file': self._create_csv_file(csv_content)}, format='multipart'
+            )
+
+        self.assertEqual(response.status_code, 202)
+        file_upload = FileUploadRecord.objects.get(file_id=response.data['data']['file_id'])
+        upload_dir = os.path.join(media_root, 'uploads', str(self.business.id))
+        self.assertEqual(os.listdir(upload_dir), [os.path.basename(file_upload.file_path)])
+        with open(file_upload.file_path, 'rb') as f:
+            self.assertEqual(f.read(), csv_content.encode())
+        self.assertEqual(file_upload.content_sha256, hashlib.sha256(csv_content.encode()).hexdigest())
+        self.assertTrue(validate.call_args[0][0].preview_validated)
+
+    # Test 16: Oversized and malformed uploads are rejected while streaming
+    def test_streamed_upload_rejected_early(self):
+        """Test size and header checks stop the upload and leave nothing on disk"""
+        import gzip
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        big_csv = 'Date,Product,Quantity,Amount\n' + '2025-11-01,Test,1,100\n' * 2000
+
+        with override_settings(MEDIA_ROOT=media_root, CSV_UPLOAD_MAX_SIZE=1024):
+            too_large = self.client.post(
+                '/api/data/upload-csv/', {'file': self._create_csv_file(big_csv)}, format='multipart'
+            )
+        with override_settings(MEDIA_ROOT=media_root):
+            not_gzip = self.client.post(
+                '/api/data/upload-csv/',
+                {'file': SimpleUploadedFile('day.csv.gz', b'Date,Product\n', content_type='application/gzip')},
+                format='multipart'
+            )
+            empty_gzip = self.client.post(
+                '/api/data/upload-csv/',
+                {'file': SimpleUploadedFile('day.csv.gz', gzip.compress(b''), content_type='application/gzip')},
+                format='multipart'
+            )
+
+        self.assertEqual(too_large.status_code, 400)
+        self.assertEqual(too_large.data['message'], 'File exceeds maximum size of 1KB')
+        self.assertEqual(not_gzip.status_code, 400)
+        self.assertIn('Invalid CSV format', not_gzip.data['message'])
+        self.assertEqual(empty_gzip.data['message'], 'CSV file appears to be empty')
+        self.assertEqual(os.listdir(os.path.join(media_root, 'uploads', str(self.business.id))), [])
+        self.assertFalse(FileUploadRecord.objects.exists())
+
+
+@override_settings(CSV_UPLOAD_CHUNK_SIZE=32)
+class ChunkedUploadTestCase(TempMediaRootMixin, APITestCase):
+    """Test resumable chunked upload endpoints"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        from django.core.cache import cache
+
+        super().setUp()
+        self.user = User.objects.create_user(username='chunkuser', password='testpass123')
+        self.business = Business.objects.create(owner=self.user, name='Chunk Store', type='convenience')
+
+        self.client = APIClient()
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        cache.clear()
+
+        self.csv_content = (
+            'Date,Product,Quantity,Amount\n'
+            '2025-11-01,Chips,5,150\n'
+            '2025-11-02,Soda,2,80\n'
+            '2025-11-03,Bread,1,45\n'
+        ).encode()
+
+    def _init_upload(self, file_name='sales.csv', total_size=None):
+        """Helper to start an upload of csv_content"""
+        return self.client.post('/api/data/upload-csv/chunked/', {
+            'file_name': file_name,
+            'total_size': len(self.csv_content) if total_size is None else total_size
+        }, format='json')
+
+    def _put_chunk(self, upload_id, index, data=None):
+        """Helper to send chunk `index` of csv_content"""
+        if data is None:
+            data = self.csv_content[index * 32:(index + 1) * 32]
+        return self.client.put(
+            f'/api/data/upload-csv/chunked/{upload_id}/chunks/{index}/',
+            data, content_type='application/octet-stream'
+        )
+
+    # Test 1: Chunks can arrive out of order and the upload resumes
+    def test_resume_out_of_order_chunks(self):
+        """Test status lists the missing chunks after a partial upload"""
+        response = self._init_upload()
+        self.assertEqual(response.status_code, 201)
+        upload_id = response.data['data']['upload_id']
+        self.assertEqual(response.data['data']['total_chunks'], 3)
+
+        self.assertEqual(self._put_chunk(upload_id, 2).status_code, 200)
+        self.assertEqual(self._put_chunk(upload_id, 0).status_code, 200)
+
+        status = self.client.get(f'/api/data/upload-csv/chunked/{upload_id}/')
+        self.assertEqual(status.status_code, 200)
+        self.assertEqual(status.data['data']['missing_chunks'], [1])
+        self.assertEqual(status.data['data']['received_ranges'], [[0, 32], [64, len(self.csv_content)]])
+
+        self._put_chunk(upload_id, 1)
+        session = ChunkedUploadSession.objects.get(upload_id=upload_id)
+        self.assertTrue(session.is_complete())
+        with open(session.file_path, 'rb') as f:
+            self.assertEqual(f.read(), self.csv_content)
+
+    # Test 2: Finalize before every chunk arrived
+    def test_finalize_incomplete_upload(self):
+        """Test finalize is refused while chunks are missing"""
+        upload_id = self._init_upload().data['data']['upload_id']
+        self._put_chunk(upload_id, 0)
+
+        response = self.client.post(f'/api/data/upload-csv/chunked/{upload_id}/finalize/')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error_code'], 'UPLOAD_INCOMPLETE')
+        self.assertEqual(response.data['missing_chunks'], [1, 2])
+        self.assertFalse(FileUploadRecord.objects.exists())
+
+    # Test 3: Chunks of the wrong length or index are rejected
+    def test_invalid_chunk_rejected(self):
+        """Test a short chunk and an out of range index leave nothing recorded"""
+        upload_id = self._init_upload().data['data']['upload_id']
+
+        short = self._put_chunk(upload_id, 0, b'Date,Product')
+        out_of_range = self._put_chunk(upload_id, 3, b'x')
+
+        self.assertEqual(short.status_code, 400)
+        self.assertEqual(out_of_range.status_code, 400)
+        self.assertEqual(ChunkedUploadSession.objects.get(upload_id=upload_id).received_ranges, [])
+
+    # Test 4: Init validates the file name and size
+    def test_init_validation(self):
+        """Test unsupported extensions and oversized files are refused up front"""
+        wrong_type = self._init_upload(file_name='sales.xlsx')
+        with override_settings(CSV_UPLOAD_MAX_SIZE=10):
+            too_large = self._init_upload()
+
+        self.assertEqual(wrong_type.status_code, 400)
+        self.assertEqual(too_large.status_code, 400)
+        self.assertFalse(ChunkedUploadSession.objects.exists())
+
+    # Test 5: Finalize queues the import like a regular upload
+    def test_finalize_creates_upload_record(self):
+        """Test finalize creates the FileUploadRecord and enqueues processing"""
+        import hashlib
+        from . import views
+
+        upload_id = self._init_upload().data['data']['upload_id']
+        for index in range(3):
+            self._put_chunk(upload_id, index)
+
+        with mock.patch.object(views._executor, 'submit') as submit:
+            response = self.client.post(f'/api/data/upload-csv/chunked/{upload_id}/finalize/')
+
+        self.assertEqual(response.status_code, 202)
+        file_upload = FileUploadRecord.objects.get(file_id=response.data['data']['file_id'])
+        submit.assert_called_once_with(views._process_csv_file, file_upload.file_id)
+        self.assertEqual(file_upload.status, 'pending')
+        self.assertEqual(file_upload.original_filename, 'sales.csv')
+        self.assertEqual(file_upload.content_sha256, hashlib.sha256(self.csv_content).hexdigest())
+        self.assertTrue(file_upload.file_path.endswith('_sales.csv'))
+        with open(file_upload.file_path, 'rb') as f:
+            self.assertEqual(f.read(), self.csv_content)
+
+        session = ChunkedUploadSession.objects.get(upload_id=upload_id)
+        self.assertEqual(session.status, 'completed')
+        self.assertEqual(session.file_upload, file_upload)
+        self.assertEqual(self._put_chunk(upload_id, 0).status_code, 400)
+
+    # Test 6: A file that fails validation ends the session
+    def test_finalize_invalid_file_discards_session(self):
+        """Test a rejected file marks the session failed and deletes the partial file"""
+        upload_id = self._init_upload(file_name='sales.csv.gz').data['data']['upload_id']
+        for index in range(3):
+            self._put_chunk(upload_id, index)
+        part_path = ChunkedUploadSession.objects.get(upload_id=upload_id).file_path
+
+        response = self.client.post(f'/api/data/upload-csv/chunked/{upload_id}/finalize/')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error_code'], 'INVALID_FILE_FORMAT')
+        self.assertEqual(ChunkedUploadSession.objects.get(upload_id=upload_id).status, 'failed')
+        self.assertFalse(os.path.exists(part_path))
+        self.assertEqual(self._put_chunk(upload_id, 0).status_code, 400)
+        self.assertFalse(FileUploadRecord.objects.exists())
+
+    # Test 7: A chunk for a partial file that is gone
+    def test_chunk_after_partial_file_removed(self):
+        """Test a missing partial file is a conflict rather than a server error"""
+        upload_id = self._init_upload().data['data']['upload_id']
+        os.remove(ChunkedUploadSession.objects.get(upload_id=upload_id).file_path)
+
+        response = self._put_chunk(upload_id, 0)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['error_code'], 'UPLOAD_EXPIRED')
+        self.assertEqual(ChunkedUploadSession.objects.get(upload_id=upload_id).received_ranges, [])
+
+    # Test 8: Idle sessions are expired by the cleanup command
+    def test_expire_idle_uploads(self):
+        """Test only uploads idle past the expiry are failed and their files deleted"""
+        from datetime import timedelta
+        from django.core.management import call_command
+
+        stale_id = self._init_upload().data['data']['upload_id']
+        active_id = self._init_upload().data['data']['upload_id']
+        ChunkedUploadSession.objects.filter(upload_id=stale_id).update(
+            updated_at=timezone.now() - timedelta(hours=25)
+        )
+        stale_path = ChunkedUploadSession.objects.get(upload_id=stale_id).file_path
+
+        call_command('expire_chunked_uploads', stdout=io.StringIO())
+
+        self.assertEqual(ChunkedUploadSession.objects.get(upload_id=stale_id).status, 'failed')
+        self.assertFalse(os.path.exists(stale_path))
+        active = ChunkedUploadSession.objects.get(upload_id=active_id)
+        self.assertEqual(active.status, 'uploading')
+        self.assertTrue(os.path.exists(active.file_path))
+        self.assertEqual(self._put_chunk(stale_id, 0).status_code, 400)
+
 
 class ProductModelTestCase(TestCase):
     """Test Product model"""
@@ -668,6 +1014,1283 @@ class CSVParserServiceTestCase(TestCase):
         self.assertEqual(result['created_count'], 2)
         self.assertEqual(Transaction.objects.filter(business=self.business).count(), 2)
 
+    # Test 16: Batched mode keeps query count independent of row count
+    def test_batched_mode_query_count(self):
+        """Test batched ingestion does not issue per-row queries"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        lines = ["Date,Product,Quantity,Amount,Customer"]
+        for i in range(200):
+            lines.append(f"2025-11-01,Product {i % 5},1,{100 + i},Customer {i % 3}")
+        file_upload = self._create_file_upload_record("\n".join(lines))
+
+        parser = CSVParserService(file_upload, batch_size=500)
+        with CaptureQueriesContext(connection) as ctx:
+            result = parser.parse_csv()
+
+        self.assertEqual(result['created_count'], 200)
+        sql = [query['sql'] for query in ctx.captured_queries]
+        # SQLite splits bulk inserts by its parameter limit, but never per row
+        self.assertLess(sum(1 for q in sql if q.startswith('INSERT INTO "data_transaction"')), 10)
+        self.assertEqual(sum(1 for q in sql if q.startswith('UPDATE "data_product"')), 1)
+        product = Product.objects.get(business=self.business, name='Product 0')
+        self.assertEqual(product.current_stock, -40)
+        customer = Customer.objects.get(business=self.business, name='Customer 0')
+        self.assertEqual(customer.total_purchases, sum(100 + i for i in range(0, 200, 3)))
+
+    # Test 17: Row-by-row mode still available
+    def test_row_by_row_mode(self):
+        """Test batch_size=1 processes rows individually with the same results"""
+        csv_content = """Date,Product,Quantity,Amount,Customer
+2025-11-01,Chips,5,150,John
+2025-11-01,Chips,5,150,John
+2025-11-02,Bread,abc,80,Jane"""
+
+        file_upload = self._create_file_upload_record(csv_content)
+        parser = CSVParserService(file_upload, batch_size=1)
+        result = parser.parse_csv()
+
+        self.assertEqual(result['created_count'], 1)
+        self.assertEqual(result['skipped_count'], 1)
+        self.assertEqual(result['failed_count'], 1)
+        self.assertEqual(FailedJob.objects.filter(file_upload=file_upload).count(), 1)
+
+    # Test 18: Failed bulk write is replayed row by row
+    def test_batch_write_failure_falls_back_to_rows(self):
+        """Test a failed bulk write is rolled back and replayed row by row"""
+        csv_content = """Date,Product,Quantity,Amount,Customer
+2025-11-01,Chips,5,150,John
+2025-11-02,Bread,4,80,Jane"""
+
+        file_upload = self._create_file_upload_record(csv_content)
+        parser = CSVParserService(file_upload)
+        original_write = parser._write_chunk
+
+        def failing_write(parsed_rows):
+            original_write(parsed_rows)
+            raise RuntimeError("simulated bulk failure")
+
+        parser._write_chunk = failing_write
+        result = parser.parse_csv()
+
+        # Bulk write rolled back, both rows replayed individually
+        self.assertEqual(result['created_count'], 2)
+        self.assertEqual(Transaction.objects.filter(business=self.business).count(), 2)
+        self.assertEqual(Product.objects.get(business=self.business, name='Chips').current_stock, -5)
+
+
+    # Test 19: Duplicate lookups are one query per chunk
+    def test_duplicate_lookup_once_per_chunk(self):
+        """Test duplicate detection issues one hash lookup per chunk and spans chunks"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        lines = ["Date,Product,Quantity,Amount,Customer"]
+        for i in range(30):
+            lines.append(f"2025-11-01,Chips,1,{100 + i},John")
+        lines.extend(lines[1:11])  # Repeat first ten rows in a later chunk
+        file_upload = self._create_file_upload_record("\n".join(lines))
+
+        parser = CSVParserService(file_upload, batch_size=10)
+        parser._publish_transaction_parsed_event = lambda: None
+        with CaptureQueriesContext(connection) as ctx:
+            result = parser.parse_csv()
+
+        self.assertEqual(result['created_count'], 30)
+        self.assertEqual(result['skipped_count'], 10)
+        hash_lookups = [
+            q['sql'] for q in ctx.captured_queries
+            if 'csv_import_hash' in q['sql'] and q['sql'].startswith('SELECT')
+        ]
+        self.assertEqual(len(hash_lookups), 3)  # Repeated chunk is answered from memory
+
+
+    # Test 20: Columnar engine matches row-by-row parsing
+    def test_pandas_engine_matches_python_engine(self):
+        """Test the pandas validation engine yields the same rows and errors"""
+        import csv
+        from datetime import timedelta
+
+        future = (timezone.now().date() + timedelta(days=3)).isoformat()
+        csv_content = f"""Date,Time,Product,Quantity,UnitPrice,Amount,Customer,PaymentMethod,Notes
+2025-11-01,09:30,Chips,5,30,150,John,Cash,note
+2025-11-01,9:05,Chips,+5,,150.50,,BKASH,
+2025-1-2,,Bread,05,,0150,Walk-in,weird,
+{future},,Bread,1,,10,Jane,cash,
+2025-13-01,,Bread,1,,10,Jane,cash,
+2025-11-01,,Bread,0,,10,Jane,cash,
+2025-11-01,,Bread,1001,,10,Jane,cash,
+2025-11-01,,Bread,abc,,10,Jane,cash,
+2025-11-01,,Bread,2,,-10,Jane,cash,
+2025-11-01,,Bread,2,,1e3,Jane,cash,
+2025-11-01,,Bread,2,,10000000,Jane,cash,
+2025-11-01,,Bread,2,,10000001,Jane,cash,
+2025-11-01,25:00,Bread,2,,10,Jane,cash,
+2025-11-01,,Bread,2,x,10,Jane,cash,
+2025-11-01,,,2,,10,Jane,cash,
+,,Bread,2,,10,Jane,cash,
+2025-11-01,,Bread,2,,10,Jane,cash,extra,values"""
+        rows = list(enumerate(csv.DictReader(io.StringIO(csv_content)), start=2))
+        file_upload = self._create_file_upload_record(csv_content)
+
+        def run(engine):
+            parser = CSVParserService(file_upload, engine=engine)
+            parser._store_failed_row = lambda *args: None
+            valid = parser._validate_chunk(rows)
+            parsed = [
+                (row_num, {key: value for key, value in values.items() if key != 'notes'}, values['notes'] or None)
+                for row_num, _, values in valid
+            ]
+            return parsed, parser.errors
+
+        python_rows, python_errors = run('python')
+        pandas_rows, pandas_errors = run('pandas')
+
+        self.assertEqual(len(python_rows), 5)
+        self.assertEqual(pandas_rows, python_rows)
+        self.assertEqual(pandas_errors, python_errors)
+
+    # Test 21: Columnar engine end to end
+    def test_pandas_engine_parse_csv(self):
+        """Test parse_csv with the pandas engine creates transactions and errors"""
+        csv_content = """Date,Product,Quantity,Amount,Customer
+2025-11-01,Chips,5,150,John
+2025-11-01,Chips,5,150,John
+2025-11-02,Bread,abc,80,Jane"""
+
+        file_upload = self._create_file_upload_record(csv_content)
+        result = CSVParserService(file_upload, engine='pandas').parse_csv()
+
+        self.assertEqual(result['created_count'], 1)
+        self.assertEqual(result['skipped_count'], 1)
+        self.assertEqual(result['errors'], [{'row': 4, 'error': 'Invalid quantity: abc'}])
+        transaction = Transaction.objects.get(business=self.business)
+        self.assertEqual(transaction.unit_price, Decimal('30'))
+        self.assertEqual(transaction.customer.name, 'John')
+
+    # Test 22: Aggregated stock updates feed the stock ledger
+    def test_import_writes_aggregated_stock_movements(self):
+        """Test CSV sales produce one sale movement per product per chunk"""
+        from .models import StockMovement
+
+        Product.objects.create(business=self.business, name='Rice', current_stock=100, unit_price=50)
+        csv_content = """Date,Product,Quantity,Amount,Customer
+2025-11-01,Rice,5,250,John
+2025-11-02,Rice,10,500,John
+2025-11-03,Rice,1,50,Jane
+2025-10-01,Bread,2,80,John"""
+
+        file_upload = self._create_file_upload_record(csv_content)
+        CSVParserService(file_upload).parse_csv()
+
+        movement = StockMovement.objects.get(business=self.business, product__name='Rice')
+        self.assertEqual(movement.movement_type, 'sale')
+        self.assertEqual(movement.quantity_changed, -16)
+        self.assertEqual(movement.stock_before, 100)
+        self.assertEqual(movement.stock_after, 84)
+        self.assertEqual(movement.reference_type, 'csv_upload')
+        self.assertEqual(movement.reference_id, str(file_upload.file_id))
+        self.assertEqual(StockMovement.objects.filter(business=self.business).count(), 2)
+
+        john = Customer.objects.get(business=self.business, name='John')
+        self.assertEqual(john.total_purchases, Decimal('830'))
+        self.assertEqual(john.last_purchase.isoformat(), '2025-11-02')
+
+    # Test 23: Stock deltas do not overwrite concurrent changes
+    def test_stock_delta_preserves_concurrent_updates(self):
+        """Test chunk stock updates are relative to the stored value"""
+        product = Product.objects.create(business=self.business, name='Rice', current_stock=100, unit_price=50)
+        csv_content = """Date,Product,Quantity,Amount
+2025-11-01,Rice,5,250"""
+
+        file_upload = self._create_file_upload_record(csv_content)
+        parser = CSVParserService(file_upload)
+        original_resolve = parser._resolve_products
+
+        def resolve_then_restock(parsed_rows):
+            products = original_resolve(parsed_rows)
+            # Another request restocks after the chunk loaded its products
+            Product.objects.filter(pk=product.pk).update(current_stock=200)
+            return products
+
+        parser._resolve_products = resolve_then_restock
+        parser.parse_csv()
+
+        product.refresh_from_db()
+        self.assertEqual(product.current_stock, 195)
+
+    # Test 24: Each committed chunk records a checkpoint
+    def test_checkpoint_per_chunk(self):
+        """Test chunk index and byte offset are stored after every chunk"""
+        rows = ''.join(f"2025-11-01,Product {i},1,{100 + i}\n" for i in range(25))
+        csv_content = "Date,Product,Quantity,Amount\n" + rows
+
+        file_upload = self._create_file_upload_record(csv_content)
+        CSVParserService(file_upload, batch_size=10).parse_csv()
+
+        file_upload.refresh_from_db()
+        self.assertEqual(file_upload.status, 'completed')
+        self.assertEqual(file_upload.checkpoint_chunk, 3)
+        self.assertEqual(file_upload.checkpoint_offset, len(csv_content.encode()))
+        self.assertIsNotNone(file_upload.checkpoint_at)
+
+    # Test 25: Interrupted import resumes after the last committed chunk
+    def test_resume_from_checkpoint(self):
+        """Test a resumed import skips committed chunks and keeps row numbers"""
+        rows = [f"2025-11-01,Product {i},1,{100 + i}" for i in range(30)]
+        rows[3] = "2025-11-01,Bad Row,abc,100"
+        rows[25] = "2025-11-01,Bad Row,0,100"
+        csv_content = "Date,Product,Quantity,Amount\n" + "\n".join(rows) + "\n"
+
+        file_upload = self._create_file_upload_record(csv_content)
+        parser = CSVParserService(file_upload, batch_size=10)
+        original_process_chunk = parser._process_chunk
+        processed_chunks = []
+
+        def crash_on_third_chunk(chunk):
+            if len(processed_chunks) == 2:
+                raise RuntimeError('worker recycled')
+            processed_chunks.append(chunk)
+            original_process_chunk(chunk)
+
+        parser._process_chunk = crash_on_third_chunk
+        parser.parse_csv()
+
+        file_upload.refresh_from_db()
+        self.assertEqual(file_upload.status, 'failed')
+        self.assertEqual(file_upload.checkpoint_chunk, 2)
+        self.assertEqual(file_upload.rows_processed, 19)
+        self.assertEqual(Transaction.objects.filter(business=self.business).count(), 19)
+
+        resumed = CSVParserService(file_upload, batch_size=10)
+        resumed._publish_transaction_parsed_event = lambda: None
+        result = resumed.parse_csv()
+
+        file_upload.refresh_from_db()
+        self.assertEqual(file_upload.status, 'completed')
+        self.assertEqual(file_upload.checkpoint_chunk, 3)
+        self.assertEqual(file_upload.rows_processed, 28)
+        self.assertEqual(file_upload.rows_failed, 2)
+        self.assertEqual(file_upload.row_count, 30)
+        self.assertEqual(result['created_count'], 28)
+        self.assertEqual([error['row'] for error in result['errors']], [5, 27])
+        self.assertEqual(Transaction.objects.filter(business=self.business).count(), 28)
+        self.assertEqual(resumed.skipped_duplicates, 0)
+        self.assertEqual(len(resumed.affected_products), 28)
+
+    # Test 26: Management command picks up stalled imports
+    def test_resume_stalled_imports_command(self):
+        """Test resume_csv_imports completes imports stuck in processing, each by one run only"""
+        from datetime import timedelta
+        from django.core.management import call_command
+
+        csv_content = """Date,Product,Quantity,Amount
+2025-11-01,Chips,5,150"""
+        stalled = self._create_file_upload_record(csv_content)
+        stalled.status = 'processing'
+        stalled.processing_started_at = timezone.now() - timedelta(minutes=30)
+        stalled.save()
+        active = self._create_file_upload_record(csv_content)
+        active.status = 'processing'
+        active.processing_started_at = timezone.now()
+        active.save()
+
+        # A second run overlapping the first finds the stalled upload already claimed
+        resumed = []
+        parse_csv = CSVParserService.parse_csv
+
+        def resume(service):
+            resumed.append(service.file_upload.file_id)
+            if len(resumed) == 1:
+                call_command('resume_csv_imports', stdout=io.StringIO())
+            return parse_csv(service)
+
+        with mock.patch.object(CSVParserService, 'parse_csv', autospec=True, side_effect=resume):
+            call_command('resume_csv_imports', stdout=io.StringIO())
+
+        self.assertEqual(resumed, [stalled.file_id])
+        stalled.refresh_from_db()
+        active.refresh_from_db()
+        self.assertEqual(stalled.status, 'completed')
+        self.assertEqual(stalled.created_transactions, 1)
+        self.assertEqual(active.status, 'processing')
+
+
+    # Test 27: Failed rows are written in bulk and summarised on the upload
+    def test_failed_rows_buffered_and_summarised(self):
+        """Test one FailedJob insert per chunk and a capped error summary"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        rows = [f"2025-11-01,Product {i},abc,100" for i in range(30)]
+        rows += [f"2025-13-01,Product {i},1,100" for i in range(5)]
+        csv_content = "Date,Product,Quantity,Amount\n" + "\n".join(rows)
+
+        file_upload = self._create_file_upload_record(csv_content)
+        with override_settings(CSV_ERROR_SUMMARY_LIMIT=5):
+            parser = CSVParserService(file_upload, batch_size=50)
+            with CaptureQueriesContext(connection) as context:
+                result = parser.parse_csv()
+
+        failed_job_inserts = [
+            query for query in context.captured_queries
+            if query['sql'].startswith('INSERT INTO "data_failedjob"')
+        ]
+        self.assertEqual(len(failed_job_inserts), 1)
+        self.assertEqual(FailedJob.objects.filter(file_upload=file_upload).count(), 35)
+
+        file_upload.refresh_from_db()
+        self.assertEqual(file_upload.rows_failed, 35)
+        self.assertEqual([error['row'] for error in file_upload.processing_errors], [2, 3, 4, 5, 6])
+        self.assertEqual(file_upload.error_counts, {'Invalid quantity': 30, 'Invalid date format (use YYYY-MM-DD)': 5})
+        self.assertEqual(len(result['errors']), 5)
+
+    # Test 28: Consistency verification uses a fixed number of queries
+    def test_verification_is_set_based(self):
+        """Test post-import checks run two aggregate queries and report issues"""
+        from .import_verification import ImportVerificationService
+
+        rows = ''.join(f"2025-11-01,Product {i},2,{100 + i}\n" for i in range(40))
+        file_upload = self._create_file_upload_record("Date,Product,Quantity,Amount\n" + rows)
+        parser = CSVParserService(file_upload)
+        parser._publish_transaction_parsed_event = lambda: None
+        parser.parse_csv()
+
+        other_user = User.objects.create_user(username='other', password='testpass123')
+        other_business = Business.objects.create(owner=other_user, name='Other Store', type='convenience')
+        Transaction.objects.filter(file_upload=file_upload, product__name='Product 0').update(business=other_business)
+
+        with self.assertNumQueries(2):
+            report = ImportVerificationService(file_upload).verify()
+
+        self.assertEqual(report['cross_tenant_transactions'], 1)
+        self.assertEqual(report['orphaned_product_refs'], 0)
+        self.assertEqual(report['orphaned_customer_refs'], 0)
+        self.assertEqual(len(report['negative_stock_products']), 20)
+        self.assertEqual(report['negative_stock_products'][0]['current_stock'], -2)
+
+    # Test 29: Verification can run after completion in the background
+    def test_verification_async(self):
+        """Test CSV_VERIFY_ASYNC queues the checks instead of running them inline"""
+        from .import_verification import ImportVerificationService
+
+        file_upload = self._create_file_upload_record("Date,Product,Quantity,Amount\n2025-11-01,Chips,1,10")
+        parser = CSVParserService(file_upload)
+        parser._publish_transaction_parsed_event = lambda: None
+
+        with override_settings(CSV_VERIFY_ASYNC=True), \
+                mock.patch.object(ImportVerificationService, 'verify_in_background') as background, \
+                mock.patch.object(ImportVerificationService, 'verify') as inline:
+            parser.parse_csv()
+
+        background.assert_called_once_with(file_upload.file_id)
+        inline.assert_not_called()
+        file_upload.refresh_from_db()
+        self.assertEqual(file_upload.status, 'completed')
+
+    # Test 30: COPY backend falls back to the ORM outside PostgreSQL
+    def test_import_backend_selection(self):
+        """Test CSV_IMPORT_BACKEND resolves to the ORM writer on SQLite"""
+        from django.db import connection
+
+        file_upload = self._create_file_upload_record("Date,Product,Quantity,Amount\n2025-11-01,Chips,1,10")
+        expected = 'copy' if connection.vendor == 'postgresql' else 'orm'
+
+        self.assertEqual(CSVParserService(file_upload).backend, expected)
+        with override_settings(CSV_IMPORT_BACKEND='copy'):
+            self.assertEqual(CSVParserService(file_upload).backend, expected)
+        with override_settings(CSV_IMPORT_BACKEND='orm'):
+            self.assertEqual(CSVParserService(file_upload).backend, 'orm')
+        with override_settings(CSV_IMPORT_BACKEND='bulk'):
+            with self.assertRaises(ValueError):
+                CSVParserService(file_upload)
+
+    # Test 31: Staging rows are serialised for COPY
+    def test_copy_staging_csv(self):
+        """Test staging CSV keeps values and writes NULLs as empty unquoted fields"""
+        import csv as csv_module
+        from .copy_import import CopyTransactionWriter
+
+        file_upload = self._create_file_upload_record("Date,Product,Quantity,Amount\n2025-11-01,Chips,1,10")
+        parser = CSVParserService(file_upload)
+        parsed = [
+            parser._parse_row({'Date': '2025-11-01', 'Time': '09:30', 'Product': 'Chips, large',
+                               'Quantity': '3', 'Amount': '100', 'Customer': 'John', 'Notes': 'said "hi"'}),
+            parser._parse_row({'Date': '2025-11-02', 'Product': 'Bread', 'Quantity': '1', 'Amount': '40'}),
+        ]
+
+        data = CopyTransactionWriter.staging_csv(parsed)
+        rows = list(csv_module.reader(io.StringIO(data)))
+
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0][0], '0')
+        self.assertEqual(rows[0][2:7], ['Chips, large', 'John', '2025-11-01', '09:30:00', '3'])
+        self.assertEqual(rows[0][8:], ['100', 'cash', 'said "hi"', parsed[0]['row_hash']])
+        # Walk-in customer, time and notes are NULL
+        self.assertEqual([rows[1][3], rows[1][5], rows[1][10]], ['', '', ''])
+        self.assertNotIn('""', data.splitlines()[1])
+
+    # Test 32: COPY import on PostgreSQL
+    def test_copy_import_postgres(self):
+        """Test COPY import creates rows once and counts duplicates via ON CONFLICT"""
+        from unittest import SkipTest
+        from django.db import connection
+        from .models import StockMovement
+
+        if connection.vendor != 'postgresql':
+            raise SkipTest('COPY import requires PostgreSQL')
+
+        Product.objects.create(business=self.business, name='Chips', unit_price=30, current_stock=100)
+        csv_content = """Date,Product,Quantity,Amount,Customer
+2025-11-01,Chips,5,150,John
+2025-11-01,Chips,5,150,John
+2025-11-02,Bread,2,80,Walk-in"""
+
+        file_upload = self._create_file_upload_record(csv_content)
+        result = CSVParserService(file_upload).parse_csv()
+
+        self.assertEqual(result['created_count'], 2)
+        self.assertEqual(result['duplicates_count'], 1)
+        self.assertEqual(Product.objects.get(business=self.business, name='Chips').current_stock, 95)
+        self.assertEqual(Customer.objects.get(business=self.business, name='John').total_purchases, Decimal('150'))
+        self.assertEqual(StockMovement.objects.filter(reference_id=str(file_upload.file_id)).count(), 2)
+
+        second_upload = self._create_file_upload_record(csv_content)
+        result = CSVParserService(second_upload).parse_csv()
+        self.assertEqual(result['created_count'], 0)
+        self.assertEqual(result['duplicates_count'], 3)
+
+    # Test 33: Typed values (Parquet rows) parse without strings
+    def test_parse_typed_row(self):
+        """Test dates, ints and decimals from typed sources validate like their CSV text"""
+        from datetime import date, time
+
+        file_upload = self._create_file_upload_record("Date,Product,Quantity,Amount\n")
+        parser = CSVParserService(file_upload)
+
+        parsed = parser._parse_row({
+            'Date': date(2025, 11, 1), 'Time': time(9, 30), 'Product': 'Chips',
+            'Quantity': 5, 'Amount': Decimal('150.00'), 'UnitPrice': 30.0, 'Customer': None
+        })
+        text = parser._parse_row({'Date': '2025-11-01', 'Product': 'Chips', 'Quantity': '5', 'Amount': '150.00'})
+
+        self.assertEqual(parsed['date'], date(2025, 11, 1))
+        self.assertEqual(parsed['time'], time(9, 30))
+        self.assertEqual(parsed['unit_price'], Decimal('30.0'))
+        self.assertEqual(parsed['customer_name'], 'Walk-in')
+        self.assertEqual(parsed['row_hash'], text['row_hash'])
+
+        with self.assertRaisesMessage(ValueError, 'Invalid quantity'):
+            parser._parse_row({'Date': date(2025, 11, 1), 'Product': 'Chips', 'Quantity': 0, 'Amount': 10})
+        with self.assertRaisesMessage(ValueError, 'Invalid quantity'):
+            parser._parse_row({'Date': date(2025, 11, 1), 'Product': 'Chips', 'Quantity': 2.5, 'Amount': 10})
+
+    # Test 34: Parquet export import
+    def test_parquet_import(self):
+        """Test a Parquet export is imported in record batches with typed columns"""
+        from datetime import date
+        from unittest import SkipTest
+
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SkipTest('Parquet import requires pyarrow')
+
+        table = pa.table({
+            'date': pa.array([date(2025, 11, 1), date(2025, 11, 1), date(2025, 11, 2), date(2099, 1, 1)]),
+            'product': ['Chips', 'Chips', 'Bread', 'Bread'],
+            'quantity': pa.array([5, 5, 2, 1], type=pa.int32()),
+            'amount': pa.array([Decimal('150.00'), Decimal('150.00'), Decimal('80.00'), Decimal('40.00')],
+                               type=pa.decimal128(12, 2)),
+            'customer': ['John', 'John', None, None],
+        })
+        file_path = tempfile.NamedTemporaryFile(suffix='.parquet', delete=False).name
+        self.addCleanup(os.unlink, file_path)
+        pq.write_table(table, file_path, row_group_size=2)
+        file_upload = FileUploadRecord.objects.create(
+            business=self.business, user=self.user, original_filename='export.parquet',
+            file_path=file_path, file_size=os.path.getsize(file_path)
+        )
+
+        result = CSVParserService(file_upload, batch_size=2).parse_csv()
+
+        self.assertEqual(result['created_count'], 2)
+        self.assertEqual(result['duplicates_count'], 1)
+        self.assertEqual(result['failed_count'], 1)
+        self.assertEqual(result['errors'][0]['row'], 4)
+        file_upload.refresh_from_db()
+        self.assertEqual(file_upload.checkpoint_offset, 4)
+        self.assertEqual(FailedJob.objects.get(file_upload=file_upload).row_data['Date'], '2099-01-01')
+        self.assertEqual(Transaction.objects.get(business=self.business, product__name='Bread').amount,
+                         Decimal('80.00'))
+
+
+class ImportHashIndexTestCase(TestCase):
+    """Test set-based duplicate detection shared by CSV and receipt imports"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.business = Business.objects.create(owner=self.user, name='Test Store', type='convenience')
+        self.product = Product.objects.create(business=self.business, name='Chips', unit_price=30)
+
+    def test_known_and_new_hashes(self):
+        """Test stored hashes are duplicates and accepted hashes become duplicates"""
+        from .services import ImportHashIndex
+
+        Transaction.objects.create(
+            business=self.business, product=self.product, date=datetime(2025, 11, 1).date(),
+            quantity=1, unit_price=30, amount=30, csv_import_hash='a' * 32
+        )
+        index = ImportHashIndex(self.business)
+
+        with self.assertNumQueries(1):
+            index.load(['a' * 32, 'b' * 32])
+            self.assertTrue(index.is_duplicate('a' * 32))
+            self.assertFalse(index.is_duplicate('b' * 32))
+
+        index.add('b' * 32)
+        self.assertTrue(index.is_duplicate('b' * 32))
+        index.discard('b' * 32)
+        self.assertFalse(index.is_duplicate('b' * 32))
+
+    def test_receipt_items_checked_in_one_query(self):
+        """Test receipt processing checks all item hashes together"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .models import ReceiptUploadRecord
+        from .models import ReceiptUploadRecord
+        from .receipt_ocr import ReceiptOCRService
+
+        receipt = ReceiptUploadRecord.objects.create(
+            business=self.business, user=self.user, file_path='/tmp/receipt.jpg',
+            original_filename='receipt.jpg', file_size=100
+        )
+        service = ReceiptOCRService(receipt)
+        service._publish_transaction_parsed_event = lambda: None
+        with CaptureQueriesContext(connection) as ctx:
+            result = service.process_receipt()
+
+        self.assertEqual(result['created_count'], 3)
+        hash_lookups = [
+            q['sql'] for q in ctx.captured_queries
+            if 'csv_import_hash' in q['sql'] and q['sql'].startswith('SELECT')
+        ]
+        self.assertEqual(len(hash_lookups), 1)
+
+        # Reprocessing the same receipt skips every item
+        result = ReceiptOCRService(receipt).process_receipt()
+        self.assertEqual(result['created_count'], 0)
+
+class CSVStreamTestCase(TestCase):
+    """Test streaming helpers used by the ingest path"""
+
+    def _write_temp(self, content):
+        temp_file = tempfile.NamedTemporaryFile(mode='wb', suffix='.csv', delete=False)
+        temp_file.write(content)
+        temp_file.close()
+        self.addCleanup(os.unlink, temp_file.name)
+        return temp_file.name
+
+    def test_count_data_rows(self):
+        """Test row count pre-pass with and without trailing newline"""
+        from .csv_stream import count_data_rows
+
+        self.assertEqual(count_data_rows(self._write_temp(b'Date,Product\n2025-11-01,A\n2025-11-02,B\n')), 2)
+        self.assertEqual(count_data_rows(self._write_temp(b'Date,Product\n2025-11-01,A\n2025-11-02,B')), 2)
+        self.assertEqual(count_data_rows(self._write_temp(b'Date,Product')), 0)
+        self.assertEqual(count_data_rows(self._write_temp(b'')), 0)
+
+    def test_iter_text_lines_split_multibyte(self):
+        """Test lines decode correctly when a character spans two chunks"""
+        from .csv_stream import iter_text_lines
+
+        data = 'Product\nচাল\nডাল'.encode('utf-8')
+        chunks = [data[i:i + 5] for i in range(0, len(data), 5)]
+        self.assertEqual(list(iter_text_lines(chunks)), ['Product\n', 'চাল\n', 'ডাল'])
+
+    def test_validation_reads_only_preview(self):
+        """Test upload validation only consumes the first chunk of the file"""
+        from .views import _validate_csv_file
+
+        content = 'Date,Product,Quantity,Amount\n' + ('2025-11-01,Test,1,100\n' * 20000)
+        csv_file = SimpleUploadedFile('big.csv', content.encode(), content_type='text/csv')
+        chunk_sizes = []
+        original_chunks = csv_file.chunks
+
+        def tracking_chunks(chunk_size=None):
+            for chunk in original_chunks(chunk_size):
+                chunk_sizes.append(len(chunk))
+                yield chunk
+
+        csv_file.chunks = tracking_chunks
+        self.assertEqual(_validate_csv_file(csv_file), (True, 'Valid'))
+        self.assertEqual(len(chunk_sizes), 1)
+
+        with override_settings(CSV_UPLOAD_MAX_SIZE=1024):
+            is_valid, message = _validate_csv_file(csv_file)
+        self.assertFalse(is_valid)
+        self.assertIn('1KB', message)
+
+    def _compress(self, content, compression, member='data.csv'):
+        import gzip
+        import zipfile
+
+        if compression == 'gzip':
+            return gzip.compress(content)
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(member, content)
+        return buffer.getvalue()
+
+    def _write_compressed(self, content, compression):
+        suffix = '.csv.gz' if compression == 'gzip' else '.zip'
+        temp_file = tempfile.NamedTemporaryFile(mode='wb', suffix=suffix, delete=False)
+        temp_file.write(self._compress(content, compression))
+        temp_file.close()
+        self.addCleanup(os.unlink, temp_file.name)
+        return temp_file.name
+
+    def test_validate_compressed_uploads(self):
+        """Test .csv.gz and .zip uploads are validated through the decompressor"""
+        import zipfile
+        from .views import _validate_csv_file
+
+        content = b'Date,Product,Quantity,Amount\n2025-11-01,Test,1,100\n'
+        gz_file = SimpleUploadedFile('day.csv.gz', self._compress(content, 'gzip'),
+                                     content_type='application/gzip')
+        zip_file = SimpleUploadedFile('day.zip', self._compress(content, 'zip'), content_type='application/zip')
+        self.assertEqual(_validate_csv_file(gz_file), (True, 'Valid'))
+        self.assertEqual(_validate_csv_file(zip_file), (True, 'Valid'))
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('a.csv', content)
+            archive.writestr('b.csv', content)
+        two_files = SimpleUploadedFile('two.zip', buffer.getvalue(), content_type='application/zip')
+        is_valid, message = _validate_csv_file(two_files)
+        self.assertFalse(is_valid)
+        self.assertIn('exactly one CSV', message)
+
+        not_gzip = SimpleUploadedFile('day.csv.gz', content, content_type='application/gzip')
+        self.assertFalse(_validate_csv_file(not_gzip)[0])
+
+    def test_import_compressed_files(self):
+        """Test CSV and inventory imports read .csv.gz and .zip uploads"""
+        from .inventory_service import InventoryUploadService
+        from .models import InventoryUploadRecord
+
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        business = Business.objects.create(owner=user, name='Test Store', type='convenience')
+
+        content = b'Date,Product,Quantity,Amount\n2025-11-01,Rice,2,100\n2025-11-02,Dal,1,80\n'
+        file_path = self._write_compressed(content, 'gzip')
+        upload = FileUploadRecord.objects.create(
+            business=business, user=user, file_path=file_path,
+            original_filename='sales.csv.gz', file_size=os.path.getsize(file_path)
+        )
+        result = CSVParserService(upload, batch_size=1).parse_csv()
+        self.assertEqual(result['created_count'], 2)
+        upload.refresh_from_db()
+        self.assertEqual(upload.row_count, 2)
+
+        file_path = self._write_compressed(b'Product,Quantity\nRice,10\nSugar,4\n', 'zip')
+        inventory_upload = InventoryUploadRecord.objects.create(
+            business=business, user=user, file_path=file_path,
+            original_filename='stock.zip', file_size=os.path.getsize(file_path)
+        )
+        result = InventoryUploadService(inventory_upload).process_csv()
+        self.assertEqual(result['status'], 'completed')
+        self.assertEqual(Product.objects.get(business=business, name='Sugar').current_stock, 4)
+
+    def test_decompressed_size_guard(self):
+        """Test an archive expanding past the limit fails the import"""
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        business = Business.objects.create(owner=user, name='Test Store', type='convenience')
+        content = b'Date,Product,Quantity,Amount\n' + b'2025-11-01,Rice,2,100\n' * 5000
+        file_path = self._write_compressed(content, 'gzip')
+        upload = FileUploadRecord.objects.create(
+            business=business, user=user, file_path=file_path,
+            original_filename='bomb.csv.gz', file_size=os.path.getsize(file_path)
+        )
+
+        with override_settings(CSV_UPLOAD_MAX_DECOMPRESSED_SIZE=10 * 1024):
+            CSVParserService(upload).parse_csv()
+
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, 'failed')
+        self.assertIn('Decompressed file exceeds maximum size of 10KB', upload.error_message)
+        self.assertFalse(Transaction.objects.filter(business=business).exists())
+
+
+class ParallelCSVImportTestCase(TestCase):
+    """Test the multi-process import on line-aligned byte ranges (ranges run in-process here)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.business = Business.objects.create(owner=self.user, name='Test Store', type='convenience')
+
+    def _create_upload(self, content):
+        temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False, encoding='utf-8')
+        temp_file.write(content)
+        temp_file.close()
+        self.addCleanup(os.unlink, temp_file.name)
+        return FileUploadRecord.objects.create(
+            business=self.business, user=self.user, file_path=temp_file.name,
+            original_filename='big.csv', file_size=len(content.encode())
+        )
+
+    def test_split_line_ranges(self):
+        """Test ranges cover the body exactly and start on line boundaries"""
+        from .csv_stream import split_line_ranges
+
+        header = 'Date,Product,Quantity,Amount\n'
+        content = header + ''.join(f'2025-11-01,Product {i},1,{100 + i}\n' for i in range(100))
+        upload = self._create_upload(content)
+        data = content.encode()
+
+        ranges = split_line_ranges(upload.file_path, len(header), 8)
+
+        self.assertEqual(len(ranges), 8)
+        self.assertEqual(ranges[0][0], len(header))
+        self.assertEqual(ranges[-1][1], len(data))
+        for (start, end, lines_before), (next_start, _, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, next_start)
+            self.assertEqual(data[start - 1:start], b'\n')
+            self.assertEqual(lines_before, data[len(header):start].count(b'\n'))
+
+    def test_parallel_import_matches_serial(self):
+        """Test ranged import creates the same rows, errors and stock as a serial import"""
+        from .parallel_import import ParallelCSVImporter
+
+        rows = [f'2025-11-01,Product {i % 7},1,{100 + i},Customer {i % 5}' for i in range(120)]
+        rows[10] = '2025-11-01,Bad Row,abc,100,'
+        rows[100] = rows[20]  # Duplicate in a later range
+        content = 'Date,Product,Quantity,Amount,Customer\n' + '\n'.join(rows) + '\n'
+        upload = self._create_upload(content)
+        Product.objects.create(business=self.business, name='Product 0', unit_price=1, current_stock=500)
+
+        importer = ParallelCSVImporter(upload, workers=1, batch_size=10)
+        events = []
+        importer.parser._publish_transaction_parsed_event = lambda: events.append(True)
+        result = importer.run()
+
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, 'completed')
+        self.assertEqual(result['created_count'], 118)
+        self.assertEqual(result['duplicates_count'], 1)
+        self.assertEqual([error['row'] for error in result['errors']], [12])
+        self.assertEqual(upload.rows_processed, 119)
+        self.assertEqual(upload.rows_failed, 1)
+        self.assertEqual(Transaction.objects.filter(business=self.business).count(), 118)
+        self.assertEqual(Product.objects.filter(business=self.business).count(), 7)
+        self.assertEqual(Customer.objects.filter(business=self.business).count(), 5)
+        self.assertEqual(len(importer.parser.affected_products), 7)
+        self.assertEqual(events, [True])
+
+        sold = sum(
+            Transaction.objects.filter(business=self.business, product__name='Product 0')
+            .values_list('quantity', flat=True)
+        )
+        self.assertEqual(Product.objects.get(business=self.business, name='Product 0').current_stock, 500 - sold)
+
+    def test_multiline_fields_import_serially(self):
+        """Test files with quoted newlines fall back to the serial import"""
+        from .parallel_import import ParallelCSVImporter
+
+        content = 'Date,Product,Quantity,Amount,Notes\n' + ''.join(
+            f'2025-11-01,Product {i},1,{100 + i},"line one\nline two"\n' for i in range(20)
+        )
+        upload = self._create_upload(content)
+
+        importer = ParallelCSVImporter(upload, workers=1, batch_size=5)
+        importer.parser._publish_transaction_parsed_event = lambda: None
+        result = importer.run()
+
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, 'completed')
+        self.assertEqual(result['created_count'], 20)
+        self.assertEqual(upload.checkpoint_chunk, 4)
+
+    def test_small_files_use_serial_import(self):
+        """Test the parallel import is only chosen for large files when enabled"""
+        from .parallel_import import use_parallel_import
+
+        upload = self._create_upload('Date,Product,Quantity,Amount\n2025-11-01,Chips,1,10\n')
+
+        self.assertFalse(use_parallel_import(upload))
+        with override_settings(CSV_IMPORT_WORKERS=8, CSV_PARALLEL_MIN_ROWS=1):
+            self.assertTrue(use_parallel_import(upload))
+        with override_settings(CSV_IMPORT_WORKERS=8, CSV_PARALLEL_MIN_ROWS=2):
+            self.assertFalse(use_parallel_import(upload))
+
+
+class ProgressReporterTestCase(TestCase):
+    """Test throttled progress writes during imports"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.business = Business.objects.create(owner=self.user, name='Test Store', type='convenience')
+
+    def _create_inventory_upload(self, rows):
+        from .models import InventoryUploadRecord
+
+        temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False)
+        temp_file.write('Product,Quantity\n')
+        for i in range(rows):
+            temp_file.write(f'Item {i},5\n')
+        temp_file.close()
+        self.addCleanup(os.unlink, temp_file.name)
+        return InventoryUploadRecord.objects.create(
+            business=self.business, user=self.user, file_path=temp_file.name,
+            original_filename='stock.csv', file_size=100
+        )
+
+    def test_flush_every_n_rows(self):
+        """Test counters are written once per threshold with update_fields only"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .progress import ProgressReporter
+
+        upload = FileUploadRecord.objects.create(
+            business=self.business, user=self.user, file_path='/tmp/test.csv',
+            original_filename='test.csv', file_size=100
+        )
+        reporter = ProgressReporter(upload, fields=['rows_processed'], every_rows=10, every_ms=60000)
+
+        with CaptureQueriesContext(connection) as context:
+            for i in range(1, 26):
+                reporter.advance(rows_processed=i)
+
+        # The first report, then once every 10 rows
+        self.assertEqual(reporter.flush_count, 3)
+        self.assertEqual(len(context.captured_queries), 3)
+        self.assertNotIn('processing_errors', context.captured_queries[0]['sql'])
+        upload.refresh_from_db()
+        self.assertEqual(upload.rows_processed, 21)
+
+        reporter.finish(rows_processed=25)
+        upload.refresh_from_db()
+        self.assertEqual(upload.rows_processed, 25)
+
+    def test_flush_after_interval(self):
+        """Test a slow import still flushes once the time threshold passes"""
+        from .progress import ProgressReporter
+
+        upload = FileUploadRecord.objects.create(
+            business=self.business, user=self.user, file_path='/tmp/test.csv',
+            original_filename='test.csv', file_size=100
+        )
+        reporter = ProgressReporter(upload, fields=['rows_processed'], every_rows=1000, every_ms=1)
+        reporter.advance(rows_processed=1)
+        reporter._last_flush -= 1
+        reporter.advance(rows_processed=2)
+
+        self.assertEqual(reporter.flush_count, 2)
+        upload.refresh_from_db()
+        self.assertEqual(upload.rows_processed, 2)
+
+    def test_inventory_upload_throttled(self):
+        """Test inventory uploads no longer save the record on every row"""
+        from .inventory_service import InventoryUploadService
+
+        upload = self._create_inventory_upload(25)
+        with override_settings(UPLOAD_PROGRESS_EVERY_ROWS=10, UPLOAD_PROGRESS_EVERY_MS=60000):
+            service = InventoryUploadService(upload)
+            result = service.process_csv()
+
+        self.assertEqual(result['status'], 'completed')
+        self.assertEqual(service.progress.flush_count, 3)
+        upload.refresh_from_db()
+        self.assertEqual(upload.rows_processed, 25)
+        self.assertEqual(upload.products_updated, 25)
+
+    def test_short_receipt_run_reports_final(self):
+        """Test a receipt shorter than the throttle still writes its final counters, once"""
+        from .models import ReceiptUploadRecord
+        from .receipt_ocr import ReceiptOCRService
+
+        receipt = ReceiptUploadRecord.objects.create(
+            business=self.business, user=self.user, file_path='/tmp/receipt.jpg',
+            original_filename='receipt.jpg', file_size=100
+        )
+        with override_settings(UPLOAD_PROGRESS_EVERY_ROWS=1000, UPLOAD_PROGRESS_EVERY_MS=60000):
+            service = ReceiptOCRService(receipt)
+            transactions = service.book_items(
+                [{'name': 'Bread', 'qty': 1, 'price': 75}, {'name': 'Milk', 'qty': 2, 'price': 120}],
+                timezone.now().date()
+            )
+
+        self.assertEqual(len(transactions), 2)
+        self.assertEqual(service.progress.flush_count, 1)
+        self.assertEqual(ReceiptUploadRecord.objects.get(pk=receipt.pk).created_transactions, 2)
+
+
+class InventoryUploadServiceTestCase(TestCase):
+    """Test batched inventory imports"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.business = Business.objects.create(owner=self.user, name='Test Store', type='convenience')
+
+    def _create_inventory_upload(self, csv_content):
+        from .models import InventoryUploadRecord
+
+        temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False)
+        temp_file.write(csv_content)
+        temp_file.close()
+        self.addCleanup(os.unlink, temp_file.name)
+        return InventoryUploadRecord.objects.create(
+            business=self.business, user=self.user, file_path=temp_file.name,
+            original_filename='stock.csv', file_size=len(csv_content)
+        )
+
+    def _import(self, csv_content, batch_size):
+        from .inventory_service import InventoryUploadService
+
+        upload = self._create_inventory_upload(csv_content)
+        result = InventoryUploadService(upload, batch_size=batch_size).process_csv()
+        upload.refresh_from_db()
+        return upload, result
+
+    # Test 1: Batched mode creates, updates and alerts like row-by-row mode
+    def test_batched_matches_row_by_row(self):
+        """Test both modes leave the same products, movements and alerts"""
+        from .models import StockAlert, StockMovement
+
+        csv_content = (
+            'Product,Quantity,Unit Price,SKU\n'
+            'Rice,100,60,RICE-1\n'
+            'Dal,10,,\n'
+            'Salt,0,20,SALT-1\n'
+            'Bad,-4,10,\n'
+            'Rice,40,,\n'
+        )
+        results = {}
+        for batch_size in (1, 2, 500):
+            Product.objects.filter(business=self.business).delete()
+            Product.objects.create(business=self.business, name='Dal', current_stock=80, unit_price=Decimal('90'))
+
+            upload, result = self._import(csv_content, batch_size)
+
+            self.assertEqual(result['status'], 'completed')
+            products = {
+                product.name: (product.current_stock, product.unit_price, product.sku)
+                for product in Product.objects.filter(business=self.business)
+            }
+            movements = sorted(
+                StockMovement.objects.filter(business=self.business)
+                .values_list('product__name', 'movement_type', 'stock_before', 'stock_after')
+            )
+            alerts = sorted(
+                StockAlert.objects.filter(business=self.business).values_list('product__name', 'alert_type')
+            )
+            counters = (upload.rows_processed, upload.rows_failed, upload.products_updated)
+            results[batch_size] = (products, movements, alerts, counters)
+
+        self.assertEqual(results[2], results[1])
+        self.assertEqual(results[500], results[1])
+        products, movements, alerts, counters = results[500]
+        self.assertEqual(products['Rice'], (40, Decimal('60.00'), 'RICE-1'))
+        self.assertEqual(products['Dal'][:2], (10, Decimal('90.00')))
+        self.assertEqual(movements, [
+            ('Dal', 'adjustment', 80, 10),
+            ('Rice', 'adjustment', 100, 40),
+            ('Rice', 'initial_load', 0, 100),
+            ('Salt', 'initial_load', 0, 0),
+        ])
+        self.assertEqual(alerts, [('Dal', 'low_stock'), ('Rice', 'low_stock'), ('Salt', 'out_of_stock')])
+        self.assertEqual(counters, (5, 1, 4))
+
+    # Test 2: Re-uploading the current stock list writes nothing
+    def test_unchanged_rows_skipped(self):
+        """Test only rows differing from current stock, price or SKU are written"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .models import StockAlert, StockMovement
+
+        csv_content = 'Product,Quantity,Unit Price,SKU\nRice,100,60,RICE-1\nDal,10,90,DAL-1\nSalt,30,20,SALT-1\n'
+        self._import(csv_content, 500)
+        StockAlert.objects.filter(business=self.business).update(is_acknowledged=True)
+        movements = StockMovement.objects.filter(business=self.business).count()
+
+        for batch_size in (1, 500):
+            with self.subTest(batch_size=batch_size):
+                with CaptureQueriesContext(connection) as context:
+                    upload, result = self._import(csv_content, batch_size)
+
+                self.assertEqual(result['products_unchanged'], 3)
+                self.assertEqual((upload.products_created, upload.products_changed, upload.products_unchanged), (0, 0, 3))
+                self.assertEqual(upload.products_updated, 0)
+                self.assertEqual(result['products_updated'], 0)
+                self.assertFalse([q for q in context.captured_queries if 'data_product' in q['sql'] and 'UPDATE' in q['sql']])
+                self.assertEqual(StockMovement.objects.filter(business=self.business).count(), movements)
+                self.assertFalse(StockAlert.objects.filter(business=self.business, is_acknowledged=False).exists())
+
+        # Price only change: product written, no zero-change movement
+        upload, _ = self._import(
+            'Product,Quantity,Unit Price,SKU\nRice,100,65,RICE-1\nDal,5,90,DAL-1\nSugar,8,40,\n', 500
+        )
+        self.assertEqual((upload.products_created, upload.products_changed, upload.products_unchanged), (1, 2, 0))
+        self.assertEqual(upload.products_updated, 3)
+        self.assertEqual(Product.objects.get(business=self.business, name='Rice').unit_price, Decimal('65.00'))
+        self.assertEqual(StockMovement.objects.filter(business=self.business).count(), movements + 2)
+        self.assertFalse(StockMovement.objects.filter(business=self.business, quantity_changed=0).exists())
+
+    # Test 3: Query count does not grow with the number of rows
+    def test_batched_query_count(self):
+        """Test a large stock take runs in a constant number of queries"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .models import StockAlert
+
+        for i in range(100):
+            Product.objects.create(business=self.business, name=f'Item {i}', current_stock=100)
+        StockAlert.objects.create(
+            business=self.business, product=Product.objects.get(name='Item 1'),
+            alert_type='low_stock', threshold=50, current_stock=40, is_acknowledged=True
+        )
+        csv_content = 'Product,Quantity\n' + ''.join(f'Item {i},{i % 60}\n' for i in range(300))
+
+        with CaptureQueriesContext(connection) as context:
+            upload, result = self._import(csv_content, 500)
+
+        self.assertEqual(result['status'], 'completed')
+        self.assertLess(len(context.captured_queries), 40)
+        self.assertEqual(upload.products_updated, 300)
+        alert = StockAlert.objects.get(product__name='Item 1')
+        self.assertEqual((alert.alert_type, alert.current_stock, alert.is_acknowledged), ('low_stock', 1, False))
+        self.assertEqual(StockAlert.objects.get(product__name='Item 60').alert_type, 'out_of_stock')
+        # Stock of 51-59 is above the reorder point
+        self.assertEqual(StockAlert.objects.filter(business=self.business).count(), 255)
+
+    # Test 4: A failing bulk write is replayed row by row
+    def test_failed_chunk_replayed(self):
+        """Test rows of a chunk whose bulk write failed are still imported"""
+        from .models import StockMovement
+
+        Product.objects.create(business=self.business, name='Rice', current_stock=5)
+
+        with mock.patch.object(StockMovement.objects, 'bulk_create', side_effect=Exception('database error')):
+            upload, result = self._import('Product,Quantity\nRice,70\nSugar,80\n', 500)
+
+        self.assertEqual(result['status'], 'completed')
+        self.assertEqual(upload.products_updated, 2)
+        self.assertEqual(Product.objects.get(name='Rice').current_stock, 70)
+        self.assertEqual(Product.objects.get(name='Sugar').current_stock, 80)
+        self.assertEqual(StockMovement.objects.filter(business=self.business).count(), 2)
+
+    # Test 5: Stock sold while the upload runs is seen by later chunks
+    def test_stock_changed_between_chunks(self):
+        """Test each chunk reads current stock instead of values cached by earlier chunks"""
+        from django.db.models import F
+        from .inventory_service import InventoryUploadService
+        from .models import StockMovement
+
+        Product.objects.create(business=self.business, name='Rice', current_stock=20)
+        process_chunk = InventoryUploadService._process_chunk
+        chunks = []
+
+        def sell_after_first_chunk(service, chunk):
+            process_chunk(service, chunk)
+            if not chunks:
+                Product.objects.filter(name='Rice').update(current_stock=F('current_stock') - 5)
+            chunks.append(chunk)
+
+        with mock.patch.object(InventoryUploadService, '_process_chunk', sell_after_first_chunk):
+            upload, result = self._import('Product,Quantity\nRice,50\nDal,10\nRice,50\n', 2)
+
+        self.assertEqual(result['status'], 'completed')
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(Product.objects.get(name='Rice').current_stock, 50)
+        self.assertEqual((upload.products_created, upload.products_changed, upload.products_unchanged), (1, 2, 0))
+        self.assertEqual(
+            list(StockMovement.objects.filter(product__name='Rice').order_by('created_at', 'stock_before')
+                 .values_list('stock_before', 'stock_after')),
+            [(20, 50), (45, 50)]
+        )
+
+
+class ImportBenchmarkTestCase(TestCase):
+    """Test the import benchmark harness"""
+
+    def _generator(self, **kwargs):
+        from .import_benchmark import (
+            DEFAULT_INVENTORY_SAMPLE, DEFAULT_TRANSACTION_SAMPLE, BenchmarkDataGenerator
+        )
+        return BenchmarkDataGenerator(DEFAULT_TRANSACTION_SAMPLE, DEFAULT_INVENTORY_SAMPLE, **kwargs)
+
+    # Test 1: Generated files follow the samples and the requested shape
+    def test_generated_files(self):
+        """Test generated CSVs have the sample headers, product count and error rate"""
+        import csv
+
+        work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, work_dir, ignore_errors=True)
+        generator = self._generator(products=25, customers=5, error_rate=0.5, seed=1)
+        path = os.path.join(work_dir, 'transactions.csv')
+        generator.write_transactions(path, 200)
+
+        with open(path, newline='') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), 200)
+        self.assertEqual(list(rows[0]), ['Date', 'Product', 'Quantity', 'Amount', 'Customer', 'PaymentMethod'])
+        self.assertLessEqual(len({row['Product'] for row in rows}), 25)
+        self.assertIn('Rice 2', generator.catalogue)
+        invalid = sum(1 for row in rows if row['Quantity'] == 'abc' or row['Date'] == '2024-13-45')
+        self.assertTrue(50 < invalid < 150)
+
+        # Same seed, same file
+        again = os.path.join(work_dir, 'again.csv')
+        self._generator(products=25, customers=5, error_rate=0.5, seed=1).write_transactions(again, 200)
+        with open(path) as first, open(again) as second:
+            self.assertEqual(first.read(), second.read())
+
+    # Test 2: The report covers every stage
+    def test_benchmark_report(self):
+        """Test the command reports rows/sec, queries per row and peak memory per stage"""
+        import json
+        from io import StringIO
+        from django.core.management import call_command
+
+        output = StringIO()
+        # The test database is already fresh
+        with mock.patch('data.management.commands.benchmark_imports.setup_databases'), \
+                mock.patch('data.management.commands.benchmark_imports.teardown_databases'):
+            call_command('benchmark_imports', rows=120, products=12, stdout=output, stderr=StringIO())
+
+        report = json.loads(output.getvalue())
+        self.assertEqual(
+            list(report['stages']), ['generate', 'transaction_import', 'inventory_import', 'inventory_reimport']
+        )
+        transaction_import = report['stages']['transaction_import']
+        self.assertEqual(transaction_import['rows'], 120)
+        self.assertGreater(transaction_import['rows_per_sec'], 0)
+        self.assertGreater(transaction_import['queries_per_row'], 0)
+        self.assertGreater(transaction_import['peak_memory_bytes'], 0)
+        self.assertEqual(transaction_import['result']['failed_count'], 0)
+        self.assertEqual(report['stages']['inventory_reimport']['result']['products_unchanged'], 12)
+
+
+# Maximum SQL queries per hot endpoint, with 10 and with 1,000 rows of data.
+# Both budgets being equal is the point: a count that grows with the data is an N+1.
+QUERY_BUDGETS = {
+    # name: (path, max queries at 10 rows, max queries at 1,000 rows)
+    'transactions-list': ('/api/data/transactions/', 4, 4),
+    'transactions-summary': ('/api/data/transactions/summary/', 8, 8),
+    'products-list': ('/api/data/inventory/products/', 3, 3),
+    'inventory-report': ('/api/data/inventory/report/', 6, 6),
+    'customers': ('/api/data/customers/', 4, 4),
+    'customers-refresh': ('/api/data/customers/?refresh=true', 14, 14),  # Scores persist under a savepoint
+    'movements-list': ('/api/data/inventory/movements/', 4, 4),
+    'alerts-list': ('/api/data/inventory/alerts/', 3, 3),
+    'forecast': ('/api/data/forecast/{product_id}/?periods=7', 4, 4),
+}
+
+
+class QueryBudgetTestCase(APITestCase):
+    """Test hot endpoints stay within their query budgets as data grows"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datasets = {size: cls._create_dataset(size) for size in (10, 1000)}
+
+    @classmethod
+    def _create_dataset(cls, size):
+        """Business with `size` products, customers, transactions, movements and alerts"""
+        from datetime import date, timedelta
+        from apps.churn.tasks import recalculate_rfm_scores
+        from .models import StockAlert, StockMovement
+
+        user = User.objects.create_user(username=f'budget{size}', password='testpass123')
+        business = Business.objects.create(owner=user, name=f'Budget Store {size}', type='convenience')
+        products = Product.objects.bulk_create([
+            Product(business=business, name=f'Product {i}', current_stock=i % 80, unit_price=Decimal('10.00'))
+            for i in range(size)
+        ])
+        customers = Customer.objects.bulk_create([
+            Customer(business=business, name=f'Customer {i}') for i in range(size)
+        ])
+        # Half of the sales go to the first product so it has history to forecast
+        Transaction.objects.bulk_create([
+            Transaction(
+                business=business,
+                product=products[0] if i % 2 == 0 else products[i],
+                customer=customers[i],
+                date=date(2025, 1, 1) + timedelta(days=i % 60),
+                quantity=1 + i % 5,
+                unit_price=Decimal('10.00'),
+                amount=Decimal('10.00') * (1 + i % 5),
+                payment_method=['cash', 'bkash', 'card'][i % 3],
+            )
+            for i in range(size)
+        ])
+        StockMovement.objects.bulk_create([
+            StockMovement(
+                business=business, product=products[i], movement_type='adjustment',
+                quantity_changed=1, stock_before=0, stock_after=1, created_by=user
+            )
+            for i in range(size)
+        ])
+        StockAlert.objects.bulk_create([
+            StockAlert(
+                business=business, product=products[i], alert_type='low_stock',
+                threshold=50, current_stock=products[i].current_stock
+            )
+            for i in range(size)
+        ])
+        # Churn scores are computed on the first customers request
+        recalculate_rfm_scores(str(business.id))
+        return user, products[0]
+
+    def _count_queries(self, size, path):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        user, product = self.datasets[size]
+        client = APIClient()
+        refresh = RefreshToken.for_user(user)
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(path.format(product_id=product.product_id))
+        self.assertEqual(response.status_code, 200, f'{path}: {response.data}')
+        return len(context.captured_queries)
+
+    # Test 1: Every hot endpoint within budget at both data sizes
+    def test_query_budgets(self):
+        """Test query counts stay within budget and do not grow with the data"""
+        for name, (path, small_budget, large_budget) in QUERY_BUDGETS.items():
+            with self.subTest(endpoint=name):
+                small = self._count_queries(10, path)
+                large = self._count_queries(1000, path)
+                self.assertLessEqual(small, small_budget, f'{name} ran {small} queries with 10 rows')
+                self.assertLessEqual(large, large_budget, f'{name} ran {large} queries with 1,000 rows')
+
+    # Test 2: Churn scores are persisted all or nothing
+    def test_churn_scores_persisted_atomically(self):
+        """Test a failed score write keeps the business's previous scores"""
+        from apps.churn.models import CustomerChurnScore
+        from apps.churn.services import RFMCalculator
+
+        user, _ = self.datasets[10]
+        business = Business.objects.get(owner=user)
+        previous = dict(CustomerChurnScore.objects.filter(business=business).values_list('customer_id', 'updated_at'))
+        new_customer = Customer.objects.create(business=business, name='New Customer')
+
+        calculator = RFMCalculator(business)
+        metrics = calculator._collect_metrics(list(Customer.objects.filter(business=business)))
+        scores = [calculator._build_score(m) for m in metrics.values()]
+        with mock.patch.object(Customer.objects, 'bulk_update', side_effect=Exception('database error')):
+            with self.assertRaises(Exception):
+                calculator._persist_scores(scores)
+
+        self.assertFalse(CustomerChurnScore.objects.filter(customer=new_customer).exists())
+        self.assertEqual(
+            dict(CustomerChurnScore.objects.filter(business=business).values_list('customer_id', 'updated_at')),
+            previous
+        )
+
 
 class ReceiptUploadTestCase(APITestCase):
     """Test receipt image upload endpoint"""
@@ -823,6 +2446,832 @@ class ReceiptUploadTestCase(APITestCase):
         self.assertEqual(response.status_code, 202)
         self.assertEqual(response.data['status'], 'pending')
 
+    # Test 8: Content that is not an image is rejected while streaming
+    def test_image_signature_rejected(self):
+        """Test a .jpg whose bytes are not an image is rejected and not kept on disk"""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        fake_image = SimpleUploadedFile('receipt.jpg', b'GIF89a not really', content_type='image/jpeg')
+
+        with override_settings(MEDIA_ROOT=media_root):
+            response = self.client.post('/api/data/upload-receipt/', {'image': fake_image}, format='multipart')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['message'], 'File content is not a JPG or PNG image')
+        receipt_dir = os.path.join(media_root, 'receipts', str(self.business.id))
+        self.assertEqual(os.listdir(receipt_dir), [])
+
+
+
+class LocalReceiptOCRTestCase(APITestCase):
+    """Test local Tesseract OCR preprocessing, line parsing and process pool hand-off"""
+
+    RECEIPT_LINES = [
+        ('CORNER STORE', 91.0),
+        ('Date: 05/03/2024', 88.0),
+        ("2 Lay's Chips 150.00", 90.0),
+        ('Cold Drink x1 100', 80.0),
+        ('Bread 3 x 25.00 75.00', 85.0),
+        ('Subtotal 325.00', 87.0),
+        ('VAT 15.00', 86.0),
+        ('TOTAL 340.00', 94.0),
+        ('Cash 500.00', 90.0),
+    ]
+
+    # Test 1: OCR lines map to the structure ReceiptOCRService consumes
+    def test_parse_receipt_lines(self):
+        """Test items, total, date and confidence are read from OCR lines"""
+        from datetime import date
+        from .local_ocr import parse_receipt_lines
+
+        data = parse_receipt_lines(self.RECEIPT_LINES, today=date(2024, 6, 1))
+
+        self.assertEqual(data['date'], '2024-03-05')
+        self.assertEqual(data['items'], [
+            {'name': "Lay's Chips", 'qty': 2, 'price': 150},
+            {'name': 'Cold Drink', 'qty': 1, 'price': 100},
+            {'name': 'Bread', 'qty': 3, 'price': 75},
+        ])
+        self.assertEqual(data['total'], 340)
+        self.assertEqual(data['confidence'], round((90 + 80 + 85 + 94) / 4))
+
+        # Without a total line the items are summed, without a date today is used
+        data = parse_receipt_lines([('Milk 2 x 45.50 91.00', 70.0)], today=date(2024, 6, 1))
+        self.assertEqual(data['total'], 91)
+        self.assertEqual(data['date'], '2024-06-01')
+
+    # Test 2: Photos are downscaled, binarised and deskewed
+    def test_preprocess_image(self):
+        """Test preprocessing returns a downscaled black and white image and detects skew"""
+        from PIL import Image, ImageDraw
+        from .local_ocr import estimate_skew, preprocess_image
+
+        image = Image.new('RGB', (1200, 3200), 'white')
+        draw = ImageDraw.Draw(image)
+        for top in range(100, 3100, 120):
+            draw.rectangle((100, top, 1100, top + 30), fill=(40, 40, 40))
+
+        prepared = preprocess_image(image, max_side=1000)
+        self.assertEqual(prepared.mode, 'L')
+        self.assertEqual(max(prepared.size), 1000)
+        self.assertEqual(set(prepared.getdata()), {0, 255})
+
+        tilted = image.convert('L').rotate(3, expand=True, fillcolor=255)
+        self.assertAlmostEqual(estimate_skew(tilted), -3, delta=0.5)
+        self.assertEqual(estimate_skew(image.convert('L')), 0)
+
+    # Test 3: With the tesseract engine OCR runs in the process pool, then a thread saves it
+    def test_upload_hands_off_to_ocr_pool(self):
+        """Test the upload submits OCR to the pool and saves its result from the thread pool"""
+        from concurrent.futures import Future
+        from PIL import Image
+        from . import views
+        from .local_ocr import parse_receipt_lines
+        from .models import ReceiptUploadRecord
+
+        user = User.objects.create_user(username='ocruser', password='testpass123')
+        business = Business.objects.create(owner=user, name='OCR Store', type='convenience')
+        self.client.force_authenticate(user=user)
+
+        ocr_future = Future()
+        ocr_future.set_result(parse_receipt_lines(self.RECEIPT_LINES))
+        image_bytes = io.BytesIO()
+        Image.new('RGB', (100, 100), color='white').save(image_bytes, format='PNG')
+        image = SimpleUploadedFile('receipt.png', image_bytes.getvalue(), content_type='image/png')
+
+        with override_settings(RECEIPT_OCR_ENGINE='tesseract'), \
+                mock.patch.object(views, 'submit_local_ocr', return_value=ocr_future) as submit_ocr, \
+                mock.patch.object(views._executor, 'submit', side_effect=lambda fn, *args: fn(*args)), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/data/upload-receipt/', {'image': image}, format='multipart')
+
+        self.assertEqual(response.status_code, 202)
+        receipt = ReceiptUploadRecord.objects.get(image_id=response.data['data']['image_id'])
+        submit_ocr.assert_called_once_with(receipt.file_path)
+        self.assertEqual(receipt.status, 'completed')
+        self.assertEqual(receipt.created_transactions, 3)
+        self.assertEqual(receipt.extracted_data['total'], 340)
+        self.assertEqual(Transaction.objects.filter(business=business).count(), 3)
+
+    # Test 4: A rendered receipt is read end to end
+    def test_tesseract_extracts_rendered_receipt(self):
+        """Test Tesseract reads items and the total off a rendered receipt image"""
+        import unittest
+        from PIL import Image, ImageDraw, ImageFont
+
+        if not shutil.which('tesseract'):
+            raise unittest.SkipTest('tesseract binary not installed')
+        from .local_ocr import extract_receipt_data
+
+        image = Image.new('L', (900, 420), 255)
+        draw = ImageDraw.Draw(image)
+        font = ImageFont.load_default(size=40)
+        for index, line in enumerate(['Bread 3 x 25.00 75.00', 'Cold Drink 100.00', 'TOTAL 175.00']):
+            draw.text((40, 40 + index * 120), line, fill=0, font=font)
+        path = os.path.join(tempfile.mkdtemp(), 'receipt.png')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path), ignore_errors=True)
+        image.save(path)
+
+        data = extract_receipt_data(path)
+        self.assertEqual([item['name'] for item in data['items']], ['Bread', 'Cold Drink'])
+        self.assertEqual(data['total'], 175)
+        self.assertGreater(data['confidence'], 0)
+
+
+class ReceiptDuplicateTestCase(TempMediaRootMixin, APITestCase):
+    """Test receipt photos that were already processed reuse or flag the earlier OCR"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        super().setUp()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.business = Business.objects.create(owner=self.user, name='Test Store', type='convenience')
+        self.client.force_authenticate(user=self.user)
+
+    RECEIPT_LINES = [
+        'CORNER STORE', '2026-10-01 18:42', "Lay's Chips 2 x 150.00", 'Cold Drink 1 x 100.00',
+        'Bread 3 x 75.00', 'Milk 1 x 120.00', 'TOTAL 595.00', 'Thank you'
+    ]
+
+    def _receipt_image(self, lines=None):
+        """Render a receipt as text lines, the default lines unless given"""
+        from PIL import Image, ImageDraw, ImageFont
+
+        image = Image.new('RGB', (600, 900), 'white')
+        draw = ImageDraw.Draw(image)
+        font = ImageFont.load_default(size=28)
+        for index, line in enumerate(lines or self.RECEIPT_LINES):
+            draw.text((40, 40 + index * 100), line, fill=(20, 20, 20), font=font)
+        return image
+
+    def _other_sale(self):
+        """Same store and layout, one item and the total differ"""
+        lines = list(self.RECEIPT_LINES)
+        lines[5:7] = ['Eggs 1 x 140.00', 'TOTAL 615.00']
+        return self._receipt_image(lines)
+
+    def _upload(self, image, name='receipt.jpg', image_format='JPEG', **save_options):
+        """Upload an image, processing it inline instead of in the thread pool"""
+        image_bytes = io.BytesIO()
+        image.save(image_bytes, format=image_format, **save_options)
+        return self._upload_bytes(image_bytes.getvalue(), name, f'image/{image_format.lower()}')
+
+    def _upload_bytes(self, content, name, content_type):
+        from . import views
+
+        upload = SimpleUploadedFile(name, content, content_type=content_type)
+        with mock.patch.object(views._executor, 'submit', side_effect=lambda fn, *args: fn(*args)) as submit, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/data/upload-receipt/', {'image': upload}, format='multipart')
+        return response, submit
+
+    # Test 1: Re-encoded photos hash close together, other receipts far apart
+    def test_image_hash_distance(self):
+        """Test the perceptual hash tolerates resizing and re-encoding"""
+        from PIL import ImageEnhance
+        from .receipt_ocr import image_hash_distance, receipt_image_hash
+
+        work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, work_dir, ignore_errors=True)
+        paths = {}
+        for name, image, options in [
+            ('original.png', self._receipt_image(), {}),
+            ('smaller.jpg', self._receipt_image().resize((450, 675)), {'quality': 60}),
+            ('darker.jpg', ImageEnhance.Brightness(self._receipt_image()).enhance(0.85), {'quality': 80}),
+            ('other.png', self._receipt_image(['SUPER SHOP', '2026-09-12', 'Rice 1 x 450.00', 'TOTAL 450.00']), {}),
+        ]:
+            paths[name] = os.path.join(work_dir, name)
+            image.save(paths[name], **options)
+        hashes = {name: receipt_image_hash(path) for name, path in paths.items()}
+
+        self.assertEqual(len(hashes['original.png']), 64)
+        self.assertLessEqual(image_hash_distance(hashes['original.png'], hashes['smaller.jpg']), 8)
+        self.assertLessEqual(image_hash_distance(hashes['original.png'], hashes['darker.jpg']), 8)
+        self.assertGreater(image_hash_distance(hashes['original.png'], hashes['other.png']), 24)
+
+        with open(os.path.join(work_dir, 'broken.jpg'), 'wb') as f:
+            f.write(b'\xff\xd8\xff not a jpeg')
+        self.assertIsNone(receipt_image_hash(os.path.join(work_dir, 'broken.jpg')))
+
+    # Test 2: Only a byte-identical re-upload reuses the OCR result
+    def test_identical_upload_reuses_ocr_result(self):
+        """Test re-uploading the same file completes at once with the earlier extracted data"""
+        from .models import ReceiptUploadRecord
+
+        image_bytes = io.BytesIO()
+        self._receipt_image().save(image_bytes, format='PNG')
+        first, _ = self._upload_bytes(image_bytes.getvalue(), 'first.png', 'image/png')
+        self.assertEqual(first.status_code, 202)
+        original = ReceiptUploadRecord.objects.get(image_id=first.data['data']['image_id'])
+        self.assertEqual(original.status, 'completed')
+        transaction_count = Transaction.objects.filter(business=self.business).count()
+
+        second, submit = self._upload_bytes(image_bytes.getvalue(), 'again.png', 'image/png')
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data['status'], 'completed')
+        self.assertEqual(second.data['data']['duplicate_of'], str(original.image_id))
+        submit.assert_not_called()
+        duplicate = ReceiptUploadRecord.objects.get(image_id=second.data['data']['image_id'])
+        self.assertEqual(duplicate.extracted_data, original.extracted_data)
+        self.assertEqual(duplicate.content_sha256, original.content_sha256)
+        self.assertEqual(duplicate.created_transactions, 0)
+        self.assertEqual(Transaction.objects.filter(business=self.business).count(), transaction_count)
+
+    # Test 3: Look-alike receipts are processed and flagged, never reused
+    def test_similar_receipt_processed_and_flagged(self):
+        """Test a different sale on the same receipt layout is OCR'd, not dropped as a duplicate"""
+        from .models import ReceiptUploadRecord
+        from .receipt_ocr import ReceiptOCRService
+
+        first, _ = self._upload(self._receipt_image(), name='first.png', image_format='PNG')
+
+        # The OCR of the other sale differs in one item and the total
+        other_sale = dict(ReceiptOCRService.MOCK_RECEIPT_DATA, total=615, items=[
+            {"name": "Lay's Chips", "qty": 2, "price": 150},
+            {"name": "Cold Drink", "qty": 1, "price": 100},
+            {"name": "Eggs", "qty": 1, "price": 140},
+        ])
+        with mock.patch.object(ReceiptOCRService, '_extract_receipt_data', return_value=other_sale):
+            for image, options in [(self._other_sale(), {'image_format': 'PNG'}),
+                                   (self._receipt_image().resize((450, 675)), {'quality': 70})]:
+                with self.subTest(options=options):
+                    response, submit = self._upload(image, **options)
+
+                    self.assertEqual(response.status_code, 202)
+                    self.assertEqual(response.data['data']['possible_duplicate_of'], first.data['data']['image_id'])
+                    submit.assert_called_once()
+                    flagged = ReceiptUploadRecord.objects.get(image_id=response.data['data']['image_id'])
+                    self.assertLessEqual(flagged.duplicate_distance, 24)
+                    self.assertEqual(flagged.status, 'completed')
+                    self.assertEqual(flagged.extracted_data['total'], 615)
+
+        # The new sale was booked
+        self.assertTrue(Transaction.objects.filter(business=self.business, product__name='Eggs').exists())
+
+        # Another business never matches
+        other_user = User.objects.create_user(username='otheruser', password='testpass123')
+        Business.objects.create(owner=other_user, name='Other Store', type='convenience')
+        self.client.force_authenticate(user=other_user)
+        third, _ = self._upload(self._receipt_image())
+        self.assertEqual(third.status_code, 202)
+        self.assertNotIn('possible_duplicate_of', third.data['data'])
+
+    # Test 4: A reused receipt is corrected through its original
+    def test_identical_upload_not_confirmable(self):
+        """Test confirming a byte-identical re-upload is refused and leaves the original's lines"""
+        image_bytes = io.BytesIO()
+        self._receipt_image().save(image_bytes, format='PNG')
+        first, _ = self._upload_bytes(image_bytes.getvalue(), 'first.png', 'image/png')
+        second, _ = self._upload_bytes(image_bytes.getvalue(), 'again.png', 'image/png')
+        booked = sorted(Transaction.objects.filter(business=self.business).values_list('transaction_id', flat=True))
+        items = [{'name': 'Bread', 'qty': 1, 'price': 25}]
+
+        response = self.client.post(
+            f"/api/data/receipts/{second.data['data']['image_id']}/confirm/", {'items': items}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 409)
+        self.assertIn(first.data['data']['image_id'], response.data['error'])
+        self.assertEqual(
+            sorted(Transaction.objects.filter(business=self.business).values_list('transaction_id', flat=True)), booked
+        )
+
+        response = self.client.post(
+            f"/api/data/receipts/{first.data['data']['image_id']}/confirm/", {'items': items}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created_count'], response.data['reversed_count']), (1, len(booked)))
+
+
+class ReceiptBatchUploadTestCase(TempMediaRootMixin, APITestCase):
+    """Test uploading several receipt images in one request"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        super().setUp()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.business = Business.objects.create(owner=self.user, name='Test Store', type='convenience')
+        self.client.force_authenticate(user=self.user)
+
+    def _image_file(self, name, seed):
+        """A PNG receipt-like image, each seed draws different lines"""
+        import random
+        from PIL import Image, ImageDraw
+
+        lengths = random.Random(seed)
+        image = Image.new('RGB', (300, 700), 'white')
+        draw = ImageDraw.Draw(image)
+        for top in range(40, 660, 30):
+            draw.rectangle((20, top, 20 + lengths.randint(60, 260), top + 11), fill=(30, 30, 30))
+        image_bytes = io.BytesIO()
+        image.save(image_bytes, format='PNG')
+        return SimpleUploadedFile(name, image_bytes.getvalue(), content_type='image/png')
+
+    def _post(self, files):
+        """Post a batch, processing receipts inline and capturing published events"""
+        from . import views
+
+        with mock.patch.object(views._executor, 'submit', side_effect=lambda fn, *args: fn(*args)) as submit, \
+                mock.patch('apps.events.adapter.publish_event') as publish_event, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/data/upload-receipt/batch/', {'images': files}, format='multipart')
+        return response, submit, publish_event
+
+    # Test 1: Every image is processed and one event covers the batch
+    def test_batch_upload(self):
+        """Test a batch returns per-image statuses, skips invalid files and publishes one event"""
+        from .models import ReceiptUploadRecord
+
+        files = [
+            self._image_file('first.png', 1),
+            self._image_file('second.png', 2),
+            SimpleUploadedFile('fake.jpg', b'GIF89a not really', content_type='image/jpeg'),
+            self._image_file('third.png', 3),
+            SimpleUploadedFile('notes.txt', b'hello', content_type='text/plain'),
+        ]
+        response, submit, publish_event = self._post(files)
+
+        self.assertEqual(response.status_code, 202)
+        data = response.data['data']
+        self.assertEqual(data['receipt_count'], 3)
+        self.assertEqual([receipt['file_name'] for receipt in data['receipts']], ['first.png', 'second.png', 'third.png'])
+        self.assertEqual(
+            [rejected['file_name'] for rejected in data['rejected_files']], ['fake.jpg', 'notes.txt']
+        )
+        self.assertEqual(submit.call_count, 3)
+
+        # The mocked OCR returns the same three items for every image, later receipts skip them
+        publish_event.assert_called_once()
+        topic, payload = publish_event.call_args.args
+        self.assertEqual(topic, 'transaction.parsed')
+        self.assertEqual(payload['transaction_count'], 3)
+        self.assertEqual(payload['receipt_batch_id'], data['batch_id'])
+        self.assertEqual(len(payload['affected_products']), 3)
+
+        status_response = self.client.get(f"/api/data/upload-receipt/batch/{data['batch_id']}/")
+        self.assertEqual(status_response.status_code, 200)
+        self.assertEqual(status_response.data['status'], 'completed')
+        self.assertEqual(status_response.data['receipts_finished'], 3)
+        self.assertEqual(status_response.data['created_transactions'], 3)
+        self.assertEqual(len(status_response.data['receipts']), 3)
+        self.assertTrue(all(receipt['status'] == 'completed' for receipt in status_response.data['receipts']))
+        self.assertEqual(ReceiptUploadRecord.objects.filter(batch_id=data['batch_id']).count(), 3)
+
+        # Rejected files are not kept on disk
+        receipt_dir = os.path.join(self.media_root, 'receipts', str(self.business.id))
+        self.assertEqual(len(os.listdir(receipt_dir)), 3)
+
+    # Test 2: Failed receipts still count towards finishing the batch
+    def test_failed_receipt_finishes_batch(self):
+        """Test the batch completes and publishes once even when a receipt fails"""
+        from .receipt_ocr import ReceiptOCRService
+
+        extracted = {
+            'date': '2024-01-15',
+            'items': [{'name': 'Bread', 'qty': 1, 'price': 75}],
+            'total': 75,
+            'confidence': 90
+        }
+        with mock.patch.object(
+            ReceiptOCRService, '_extract_receipt_data', side_effect=[extracted, ValueError('Unreadable image')]
+        ):
+            response, _, publish_event = self._post([self._image_file('good.png', 1), self._image_file('bad.png', 2)])
+
+        self.assertEqual(response.status_code, 202)
+        publish_event.assert_called_once()
+        self.assertEqual(publish_event.call_args.args[1]['transaction_count'], 1)
+
+        status_response = self.client.get(f"/api/data/upload-receipt/batch/{response.data['data']['batch_id']}/")
+        self.assertEqual(status_response.data['status'], 'completed')
+        statuses = {receipt['original_filename']: receipt['status'] for receipt in status_response.data['receipts']}
+        self.assertEqual(statuses, {'good.png': 'completed', 'bad.png': 'failed'})
+
+    # Test 3: Empty and oversized batches are refused
+    def test_batch_limits(self):
+        """Test batches without valid images or with too many images are rejected"""
+        import uuid
+        from . import views
+        from .models import ReceiptBatch
+
+        response, _, _ = self._post([SimpleUploadedFile('notes.txt', b'hello', content_type='text/plain')])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error_code'], 'INVALID_FILE_FORMAT')
+        self.assertEqual(len(response.data['rejected_files']), 1)
+
+        # The upload stops at the first file over the limit, it is never written
+        with override_settings(RECEIPT_BATCH_MAX_IMAGES=2), \
+                mock.patch.object(views, '_validate_image_preview', wraps=views._validate_image_preview) as preview:
+            response, submit, _ = self._post([self._image_file(f'{index}.png', index) for index in range(4)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error_code'], 'TOO_MANY_IMAGES')
+        self.assertEqual(preview.call_count, 2)
+        submit.assert_not_called()
+        self.assertFalse(ReceiptBatch.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'receipts', str(self.business.id))), [])
+
+        other_user = User.objects.create_user(username='otheruser', password='testpass123')
+        self.client.force_authenticate(user=other_user)
+        Business.objects.create(owner=other_user, name='Other Store', type='convenience')
+        response = self.client.get(f'/api/data/upload-receipt/batch/{uuid.uuid4()}/')
+        self.assertEqual(response.status_code, 404)
+
+    # Test 4: The same image twice in a batch is processed once
+    def test_repeated_image_in_batch(self):
+        """Test a repeated file is skipped before queueing so its items are not booked twice"""
+        from .models import ReceiptUploadRecord
+
+        files = [self._image_file('first.png', 1), self._image_file('copy.png', 1), self._image_file('second.png', 2)]
+        response, submit, publish_event = self._post(files)
+
+        self.assertEqual(response.status_code, 202)
+        data = response.data['data']
+        self.assertEqual(data['receipt_count'], 2)
+        self.assertEqual([receipt['file_name'] for receipt in data['receipts']], ['first.png', 'second.png'])
+        self.assertEqual(data['rejected_files'], [{'file_name': 'copy.png', 'error': 'Same image as first.png in this batch'}])
+        self.assertEqual(submit.call_count, 2)
+        self.assertEqual(ReceiptUploadRecord.objects.filter(batch_id=data['batch_id']).count(), 2)
+        publish_event.assert_called_once()
+        self.assertEqual(
+            len(os.listdir(os.path.join(self.media_root, 'receipts', str(self.business.id)))), 2
+        )
+
+    # Test 5: A receipt failing to record leaves no half-created batch
+    def test_batch_rolled_back_on_error(self):
+        """Test an error while recording the receipts queues nothing and removes the saved images"""
+        from . import views
+        from .models import ReceiptBatch, ReceiptUploadRecord
+
+        files = [self._image_file('first.png', 1), self._image_file('second.png', 2)]
+        self.client.raise_request_exception = False
+        with mock.patch.object(views, 'receipt_image_hash', side_effect=['0' * 64, OSError('disk error')]):
+            response, submit, publish_event = self._post(files)
+
+        self.assertEqual(response.status_code, 500)
+        submit.assert_not_called()
+        publish_event.assert_not_called()
+        self.assertFalse(ReceiptBatch.objects.exists())
+        self.assertFalse(ReceiptUploadRecord.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'receipts', str(self.business.id))), [])
+
+
+class ProductIndexTestCase(APITestCase):
+    """Test fuzzy matching of OCR'd item names to existing products"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        from django.core.cache import cache
+        from . import product_index
+
+        # Business ids are reused between tests, start without cached indexes
+        cache.clear()
+        product_index._indexes.clear()
+
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.business = Business.objects.create(owner=self.user, name='Test Store', type='convenience')
+        self.client.force_authenticate(user=self.user)
+        for name in ["Lay's Chips", 'Cold Drink', 'Milk 1L', 'Bread']:
+            Product.objects.create(business=self.business, name=name, unit_price=Decimal('50.00'), sku=f'SKU-{name}')
+
+    # Test 1: Spelling variants score high, different products low
+    def test_match_scores(self):
+        """Test names are matched by trigram similarity after normalization"""
+        from .product_index import get_product_index, is_suggestion
+
+        index = get_product_index(self.business.id)
+        self.assertEqual(len(index), 4)
+        self.assertEqual(index.match('LAYS chips').name, "Lay's Chips")
+        self.assertEqual(index.match('LAYS chips').score, 1.0)
+        self.assertEqual(index.match('Cold Drnk').name, 'Cold Drink')
+        self.assertGreaterEqual(index.match('Cold Drnk').score, 0.75)
+        self.assertLess(index.match('Milk 2L').score, 0.75)
+        self.assertFalse(is_suggestion(index.match('Milk 2L')))
+        self.assertIsNone(index.match('Żółć'))
+        self.assertIsNone(index.match('  '))
+
+    # Test 2: Indexes are built once and dropped on create, rename and delete
+    def test_index_invalidation(self):
+        """Test the index is cached until a product is created, renamed or deleted"""
+        from .product_index import get_product_index
+
+        with self.assertNumQueries(1):
+            index = get_product_index(self.business.id)
+        with self.assertNumQueries(0):
+            self.assertIs(get_product_index(self.business.id), index)
+
+        # Stock and price updates keep the index
+        bread = Product.objects.get(business=self.business, name='Bread')
+        bread.current_stock = 20
+        bread.save()
+        self.assertIs(get_product_index(self.business.id), index)
+
+        bread.name = 'Brown Bread'
+        bread.save()
+        renamed = get_product_index(self.business.id)
+        self.assertIsNot(renamed, index)
+        self.assertEqual(renamed.match('brown bread').product_id, bread.product_id)
+
+        Product.objects.create(business=self.business, name='Eggs', unit_price=Decimal('12.00'))
+        self.assertEqual(get_product_index(self.business.id).match('Eggs').name, 'Eggs')
+
+        product_id = bread.product_id
+        bread.delete()
+        self.assertNotIn(product_id, get_product_index(self.business.id).names)
+
+        # Least recently used businesses are evicted
+        with override_settings(PRODUCT_INDEX_CACHE_SIZE=1):
+            index = get_product_index(self.business.id)
+            other_user = User.objects.create_user(username='otheruser', password='testpass123')
+            other = Business.objects.create(owner=other_user, name='Other Store', type='convenience')
+            get_product_index(other.id)
+            self.assertIsNot(get_product_index(self.business.id), index)
+
+    # Test 3: Exact names are booked against their products, close ones only suggested
+    def test_receipt_items_use_matches(self):
+        """Test normalized names resolve to existing products and the preview suggests close ones"""
+        from .models import ReceiptUploadRecord
+        from .receipt_ocr import ReceiptOCRService
+
+        receipt = ReceiptUploadRecord.objects.create(
+            business=self.business, user=self.user, file_path='/tmp/receipt.jpg',
+            original_filename='receipt.jpg', file_size=100
+        )
+        extracted = {
+            'date': '2024-01-15',
+            'items': [
+                {'name': 'Lays Chips', 'qty': 2, 'price': 100},
+                {'name': 'Cold Drnk', 'qty': 1, 'price': 50},
+                {'name': 'Toothpaste', 'qty': 1, 'price': 80},
+            ],
+            'total': 230,
+            'confidence': 90
+        }
+        with mock.patch.object(ReceiptOCRService, '_extract_receipt_data', return_value=extracted):
+            result = ReceiptOCRService(receipt).process_receipt()
+
+        self.assertEqual(result['created_count'], 3)
+        self.assertEqual(Product.objects.get(business=self.business, name="Lay's Chips").current_stock, -2)
+        self.assertFalse(Product.objects.filter(business=self.business, name='Lays Chips').exists())
+        # A fuzzy match is not booked unconfirmed
+        self.assertEqual(Product.objects.get(business=self.business, name='Cold Drink').current_stock, 0)
+        self.assertEqual(Product.objects.filter(business=self.business).count(), 6)
+
+        response = self.client.get(f'/api/data/receipts/{receipt.image_id}/')
+        self.assertEqual(response.status_code, 200)
+        items = {item['name']: item for item in response.data['extracted_items']}
+        self.assertEqual(items['Lays Chips']['product_name'], "Lay's Chips")
+        self.assertIsNone(items['Lays Chips']['suggested_product_id'])
+        self.assertEqual(items['Lays Chips']['match_confidence'], 100)
+        # Created while the receipt was processed
+        self.assertEqual(items['Toothpaste']['product_name'], 'Toothpaste')
+
+    # Test 4: Size variants are suggested, never merged
+    def test_size_variants_not_merged(self):
+        """Test names differing only in size are booked on their own product until the user picks one"""
+        from datetime import date
+        from .models import ReceiptUploadRecord
+        from .receipt_ocr import ReceiptOCRService
+
+        variants = {'Coca Cola 2L': 'Coca Cola 1L', 'Lux Soap 150g': 'Lux Soap 100g',
+                    'Pran Mango Juice 1L': 'Pran Mango Juice 250ml'}
+        for name in variants.values():
+            Product.objects.create(business=self.business, name=name, unit_price=Decimal('50.00'), sku=f'SKU-{name}')
+        receipt = ReceiptUploadRecord.objects.create(
+            business=self.business, user=self.user, file_path='/tmp/receipt.jpg',
+            original_filename='receipt.jpg', file_size=100,
+            extracted_data={'date': '2024-01-15', 'items': [
+                {'name': name, 'qty': 1, 'price': 100} for name in variants
+            ]}
+        )
+
+        # The preview suggests the closest product instead of resolving the item to it
+        response = self.client.get(f'/api/data/receipts/{receipt.image_id}/')
+        items = {item['name']: item for item in response.data['extracted_items']}
+        for name, existing in variants.items():
+            with self.subTest(name=name):
+                self.assertIsNone(items[name]['product_id'])
+                self.assertEqual(items[name]['suggested_product_name'], existing)
+                self.assertGreaterEqual(items[name]['match_confidence'], 75)
+
+        ReceiptOCRService(receipt).book_items(receipt.extracted_data['items'], date(2024, 1, 15))
+
+        for name, existing in variants.items():
+            with self.subTest(name=name):
+                self.assertEqual(Product.objects.get(business=self.business, name=existing).current_stock, 0)
+                self.assertEqual(Product.objects.get(business=self.business, name=name).current_stock, -1)
+
+        # The product the user picked is the one booked
+        coke = Product.objects.get(business=self.business, name='Coca Cola 1L')
+        ReceiptOCRService(receipt).book_items(
+            [{'name': 'Coca Cola 2L', 'qty': 3, 'price': 150, 'product_id': str(coke.product_id)}], date(2024, 1, 16)
+        )
+        coke.refresh_from_db()
+        self.assertEqual(coke.current_stock, -3)
+
+
+class ReceiptConfirmationTestCase(APITestCase):
+    """Test receipt items are booked set-based in one atomic block"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.business = Business.objects.create(owner=self.user, name='Test Store', type='convenience')
+        self.client.force_authenticate(user=self.user)
+        self.bread = Product.objects.create(
+            business=self.business, name='Bread', unit_price=Decimal('25.00'), current_stock=100, sku='SKU-BREAD'
+        )
+
+    def _receipt(self, items, business=None):
+        from .models import ReceiptUploadRecord
+
+        return ReceiptUploadRecord.objects.create(
+            business=business or self.business, user=self.user, file_path='/tmp/receipt.jpg',
+            original_filename='receipt.jpg', file_size=100, status='completed',
+            extracted_data={'date': '2024-01-15', 'items': items, 'total': 0, 'confidence': 90}
+        )
+
+    def _process(self, receipt):
+        """Run OCR processing on a receipt's stored extracted data, counting queries"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .receipt_ocr import ReceiptOCRService
+
+        with mock.patch.object(ReceiptOCRService, '_extract_receipt_data', return_value=receipt.extracted_data), \
+                override_settings(UPLOAD_PROGRESS_EVERY_MS=60000), CaptureQueriesContext(connection) as queries:
+            result = ReceiptOCRService(receipt).process_receipt()
+        return result, len(queries)
+
+    # Test 1: Query count does not grow with the number of items
+    def test_items_booked_set_based(self):
+        """Test a receipt's items cost the same queries for 3 or 30 items, with stock and ledger updated"""
+        from .models import StockMovement
+
+        small = [{'name': 'Bread', 'qty': 2, 'price': 50}] + [
+            {'name': f'Item {index}', 'qty': 1, 'price': 10} for index in range(2)
+        ]
+        result, small_queries = self._process(self._receipt(small))
+        self.assertEqual(result['created_count'], 3)
+
+        other_user = User.objects.create_user(username='otheruser', password='testpass123')
+        other = Business.objects.create(owner=other_user, name='Other Store', type='convenience')
+        Product.objects.create(business=other, name='Bread', unit_price=Decimal('25.00'), current_stock=100)
+        large = [{'name': 'Bread', 'qty': 2, 'price': 50}] + [
+            {'name': f'Item {index}', 'qty': 1, 'price': 10} for index in range(29)
+        ]
+        result, large_queries = self._process(self._receipt(large, business=other))
+        self.assertEqual(result['created_count'], 30)
+        self.assertEqual(small_queries, large_queries)
+
+        self.bread.refresh_from_db()
+        self.assertEqual(self.bread.current_stock, 98)
+        movement = StockMovement.objects.get(business=self.business, product=self.bread)
+        self.assertEqual((movement.movement_type, movement.quantity_changed), ('sale', -2))
+        self.assertEqual((movement.stock_before, movement.stock_after), (100, 98))
+        walk_in = Customer.objects.get(business=self.business, name='Walk-in')
+        self.assertEqual(walk_in.total_purchases, Decimal('70.00'))
+        self.assertEqual(Transaction.objects.filter(business=self.business, customer=walk_in).count(), 3)
+
+    # Test 2: A failing write leaves nothing behind
+    def test_items_booked_atomically(self):
+        """Test a database error books no item, creates no product and fails the receipt"""
+        from django.db import IntegrityError
+        from .models import StockMovement
+
+        receipt = self._receipt([{'name': 'Bread', 'qty': 2, 'price': 50}, {'name': 'Jam', 'qty': 1, 'price': 90}])
+        with mock.patch.object(Transaction.objects, 'bulk_create', side_effect=IntegrityError('boom')):
+            self._process(receipt)
+
+        receipt.refresh_from_db()
+        self.assertEqual(receipt.status, 'failed')
+        self.bread.refresh_from_db()
+        self.assertEqual(self.bread.current_stock, 100)
+        self.assertFalse(Product.objects.filter(business=self.business, name='Jam').exists())
+        self.assertFalse(StockMovement.objects.filter(business=self.business).exists())
+
+    # Test 3: Confirming books the reviewed items in place of the earlier ones
+    def test_confirm_receipt(self):
+        """Test confirm creates a transaction per reviewed item and replaces what it booked before"""
+        receipt = self._receipt([{'name': 'Breads', 'qty': 1, 'price': 25}])
+        url = f'/api/data/receipts/{receipt.image_id}/confirm/'
+        items = [
+            {'name': 'Brad', 'qty': 3, 'price': 75, 'product_id': str(self.bread.product_id)},
+            {'name': 'Eggs', 'quantity': 2, 'price': 24},
+            {'name': '', 'qty': 1, 'price': 10},
+        ]
+
+        response = self.client.post(url, {'items': items, 'date': '2024-01-16'}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created_count'], 2)
+        self.assertEqual(response.data['reversed_count'], 0)
+        self.assertEqual(response.data['failed_count'], 1)
+        self.assertEqual(response.data['errors'][0]['item'], 3)
+        bread_sale = Transaction.objects.get(transaction_id=response.data['transaction_ids'][0])
+        self.assertEqual((bread_sale.product, bread_sale.quantity), (self.bread, 3))
+        self.assertEqual(str(bread_sale.date), '2024-01-16')
+        self.assertEqual(Product.objects.get(business=self.business, name='Eggs').current_stock, -2)
+        receipt.refresh_from_db()
+        self.assertEqual((receipt.status, receipt.created_transactions), ('confirmed', 2))
+
+        # Confirming again replaces the lines, nothing is booked twice
+        response = self.client.post(url, {'items': items[:2], 'date': '2024-01-16'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created_count'], response.data['reversed_count']), (2, 2))
+        self.assertEqual(receipt.transactions.count(), 2)
+        self.bread.refresh_from_db()
+        self.assertEqual(self.bread.current_stock, 97)
+
+        # Without a body the extracted items are booked, a close name is not merged into Bread
+        response = self.client.post(url, {}, format='json')
+        self.assertEqual((response.data['created_count'], response.data['reversed_count']), (1, 2))
+        self.assertEqual(Transaction.objects.get(transaction_id=response.data['transaction_ids'][0]).product.name, 'Breads')
+        self.bread.refresh_from_db()
+        self.assertEqual(self.bread.current_stock, 100)
+        self.assertEqual(Product.objects.get(business=self.business, name='Eggs').current_stock, 0)
+
+        response = self.client.post(url, {'items': 'Bread'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    # Test 4: Confirming a processed receipt replaces its auto-booked lines
+    def test_confirm_replaces_processed_lines(self):
+        """Test an edited quantity leaves one booked line and the stock of that quantity"""
+        from .models import StockMovement
+
+        receipt = self._receipt([{'name': 'Bread', 'qty': 2, 'price': 50}])
+        self._process(receipt)
+        self.bread.refresh_from_db()
+        self.assertEqual(self.bread.current_stock, 98)
+
+        response = self.client.post(
+            f'/api/data/receipts/{receipt.image_id}/confirm/',
+            {'items': [{'name': 'Bread', 'qty': 3, 'price': 75}]}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created_count'], response.data['reversed_count']), (1, 1))
+        sales = Transaction.objects.filter(business=self.business)
+        self.assertEqual(list(sales.values_list('quantity', 'amount')), [(3, Decimal('75.00'))])
+        self.assertEqual(sales.get().receipt_upload_id, receipt.image_id)
+        self.bread.refresh_from_db()
+        self.assertEqual(self.bread.current_stock, 97)
+        walk_in = Customer.objects.get(business=self.business, name='Walk-in')
+        self.assertEqual(walk_in.total_purchases, Decimal('75.00'))
+        self.assertEqual(walk_in.last_purchase.isoformat(), '2024-01-15')
+        self.assertEqual(
+            list(StockMovement.objects.filter(product=self.bread).order_by('created_at')
+                 .values_list('movement_type', 'quantity_changed')),
+            [('sale', -2), ('sale', -1)]
+        )
+
+        # Confirming with less than was booked gives the stock back
+        response = self.client.post(
+            f'/api/data/receipts/{receipt.image_id}/confirm/',
+            {'items': [{'name': 'Bread', 'qty': 1, 'price': 25}]}, format='json'
+        )
+        self.assertEqual(response.data['created_count'], 1)
+        self.bread.refresh_from_db()
+        self.assertEqual(self.bread.current_stock, 99)
+        self.assertEqual(StockMovement.objects.filter(product=self.bread).latest('created_at').movement_type, 'return')
+        self.assertEqual(sales.get().quantity, 1)
+
+    # Test 5: A failing confirm keeps the earlier lines
+    def test_confirm_replaces_atomically(self):
+        """Test a database error while rebooking leaves the processed lines and stock in place"""
+        from django.db import IntegrityError
+
+        receipt = self._receipt([{'name': 'Bread', 'qty': 2, 'price': 50}])
+        self._process(receipt)
+
+        with mock.patch.object(Transaction.objects, 'bulk_create', side_effect=IntegrityError('boom')):
+            response = self.client.post(
+                f'/api/data/receipts/{receipt.image_id}/confirm/',
+                {'items': [{'name': 'Bread', 'qty': 3, 'price': 75}]}, format='json'
+            )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(receipt.transactions.values_list('quantity', flat=True)), [2])
+        self.bread.refresh_from_db()
+        self.assertEqual(self.bread.current_stock, 98)
+
+    # Test 6: Only processed receipts can be confirmed
+    def test_confirm_requires_processed_receipt(self):
+        """Test a pending, processing or failed receipt is refused without booking anything"""
+        receipt = self._receipt([{'name': 'Bread', 'qty': 2, 'price': 50}])
+
+        for status in ('pending', 'processing', 'failed'):
+            with self.subTest(status=status):
+                receipt.status = status
+                receipt.save(update_fields=['status'])
+
+                response = self.client.post(f'/api/data/receipts/{receipt.image_id}/confirm/', {}, format='json')
+
+                self.assertEqual(response.status_code, 409)
+                receipt.refresh_from_db()
+                self.assertEqual(receipt.status, status)
+                self.assertFalse(receipt.transactions.exists())
+                self.bread.refresh_from_db()
+                self.assertEqual(self.bread.current_stock, 100)
+
 
 class TransactionListTestCase(APITestCase):
     """Test transaction list endpoint with filtering, sorting, and summary"""
@@ -0,0 +1,212 @@
+import hashlib
+import os
+import uuid
+from typing import Callable, Iterable, List, Optional
+
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers, StopUpload
+
+from .csv_stream import format_size
+
+# Bytes kept in memory for header sniffing
+UPLOAD_PREVIEW_SIZE = 64 * 1024
+
+# Returns an error message for a file name and its first bytes, None when they look valid
+PreviewValidator = Callable[[str, bytes], Optional[str]]
+
+
+class StreamedUploadedFile(UploadedFile):
+    """An upload already written to its final location by StreamingUploadHandler
+
+    Besides the usual UploadedFile interface it carries the path on disk, the
+    SHA-256 of the content and the first bytes, so views neither copy nor
+    re-read the file.
+    """
+
+    def __init__(self, file, name, content_type, size, charset, file_path: str, sha256: str,
+                 preview: bytes, content_type_extra=None) -> None:
+        super().__init__(file, name, content_type, size, charset, content_type_extra)
+        self.file_path = file_path
+        self.sha256 = sha256
+        self.preview = preview
+        # Header and first rows were checked while streaming
+        self.preview_validated = True
+
+    def temporary_file_path(self) -> str:
+        return self.file_path
+
+    def discard(self) -> None:
+        """Delete the file, for uploads rejected after streaming"""
+        self.close()
+        try:
+            os.remove(self.file_path)
+        except FileNotFoundError:
+            pass
+
+
+class RejectedUploadedFile(UploadedFile):
+    """A file of a multi-file upload refused by StreamingUploadHandler, nothing of it is kept"""
+
+    def __init__(self, name, content_type, error: str) -> None:
+        super().__init__(None, name, content_type, 0)
+        self.error = error
+
+
+class StreamingUploadHandler(FileUploadHandler):
+    """Stream one file field straight to `upload_dir`, hashing it on the way
+
+    The upload is written chunk by chunk to its final path, so it is never
+    held in memory nor copied afterwards. Files with a disallowed extension,
+    larger than `max_size` or whose first bytes fail `validate_preview` stop
+    the upload as soon as that is known; the rest of the request body is
+    discarded and `error` holds the reason. With `multiple`, only that file
+    is dropped and shows up as a RejectedUploadedFile, the other files of the
+    field are still streamed, up to `max_files`: one more file stops the
+    upload and deletes the files already written. Other fields fall through
+    to the default handlers.
+    """
+
+    def __init__(self, upload_dir: str, field_name: str = 'file', max_size: Optional[int] = None,
+                 allowed_extensions: Optional[Iterable[str]] = None,
+                 validate_preview: Optional[PreviewValidator] = None, multiple: bool = False,
+                 max_files: Optional[int] = None, request=None) -> None:
+        """
+        Args:
+            upload_dir: Final directory, the file is named {uuid}_{original name}
+            field_name: Multipart field handled by this handler
+            max_size: Largest accepted upload in bytes
+            allowed_extensions: Accepted file name endings, lowercase
+            validate_preview: Check of the first UPLOAD_PREVIEW_SIZE bytes
+            multiple: The field holds several files, a rejected one does not stop the others
+            max_files: Most files accepted in a multi-file field, rejected ones included
+        """
+        super().__init__(request)
+        self.upload_dir = upload_dir
+        self.field_name = field_name
+        self.max_size = max_size
+        self.allowed_extensions = tuple(allowed_extensions) if allowed_extensions else None
+        self.validate_preview = validate_preview
+        self.multiple = multiple
+        self.max_files = max_files
+        self.file_count = 0
+        self.file_paths: List[str] = []  # Files of this upload written so far
+        self.error: Optional[str] = None
+        self.rejection: Optional[str] = None  # Reason the current file of a multi-file upload was refused
+        self.active = False
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None,
+                 content_type_extra=None):
+        if field_name != self.field_name:
+            return
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.rejection = None
+        # The previous file of a multi-file upload is handed over, a rejection must not touch it
+        self.destination = None
+
+        self.file_count += 1
+        if self.max_files and self.file_count > self.max_files:
+            self._discard_written()
+            self.error = f"At most {self.max_files} files can be uploaded at once"
+            raise StopUpload(connection_reset=False)
+
+        if self.allowed_extensions and not file_name.lower().endswith(self.allowed_extensions):
+            self._reject(f"File must be one of: {', '.join(self.allowed_extensions)}")
+            raise StopFutureHandlers()
+        if self.max_size and content_length and content_length > self.max_size:
+            self._reject_size()
+            raise StopFutureHandlers()
+
+        os.makedirs(self.upload_dir, exist_ok=True)
+        self.file_path = os.path.join(self.upload_dir, f"{uuid.uuid4()}_{file_name}")
+        self.destination = open(self.file_path, 'wb+')
+        self.digest = hashlib.sha256()
+        self.preview = b''
+        self.preview_checked = False
+        self.received = 0
+        self.active = True
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.rejection is not None:
+            return None
+        if not self.active:
+            return raw_data
+
+        self.received += len(raw_data)
+        if self.max_size and self.received > self.max_size:
+            self._reject_size()
+            return None
+
+        self.digest.update(raw_data)
+        self.destination.write(raw_data)
+        if not self.preview_checked:
+            self.preview += raw_data[:UPLOAD_PREVIEW_SIZE - len(self.preview)]
+            if len(self.preview) >= UPLOAD_PREVIEW_SIZE:
+                self._check_preview()
+        return None
+
+    def file_complete(self, file_size):
+        if self.active and not self.preview_checked:
+            # Small file, the preview is the whole content
+            self._check_preview()
+        if self.rejection is not None:
+            rejected = RejectedUploadedFile(self.file_name, self.content_type, self.rejection)
+            self.rejection = None
+            return rejected
+        if not self.active:
+            return None
+        self.active = False
+
+        self.destination.flush()
+        self.destination.seek(0)
+        self.file_paths.append(self.file_path)
+        return StreamedUploadedFile(
+            self.destination, self.file_name, self.content_type, file_size, self.charset,
+            file_path=self.file_path, sha256=self.digest.hexdigest(), preview=self.preview,
+            content_type_extra=self.content_type_extra
+        )
+
+    def upload_interrupted(self):
+        if self.active:
+            self._discard()
+
+    def _check_preview(self) -> None:
+        self.preview_checked = True
+        if self.validate_preview:
+            error = self.validate_preview(self.file_name, self.preview)
+            if error:
+                self._reject(error)
+
+    def _reject_size(self) -> None:
+        self._reject(f"File exceeds maximum size of {format_size(self.max_size)}")
+
+    def _reject(self, message: str) -> None:
+        """Stop the upload, the remaining request body is read and dropped
+
+        In a multi-file upload only the current file is dropped.
+        """
+        self._discard()
+        if self.multiple:
+            self.rejection = message
+            return
+        self.error = message
+        raise StopUpload(connection_reset=False)
+
+    def _discard_written(self) -> None:
+        """Delete every file of this upload written so far"""
+        for file_path in self.file_paths:
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+        self.file_paths = []
+
+    def _discard(self) -> None:
+        self.active = False
+        destination = getattr(self, 'destination', None)
+        if destination is not None:
+            destination.close()
+            try:
+                os.remove(self.file_path)
+            except FileNotFoundError:
+                pass
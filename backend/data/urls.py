@@ -13,10 +13,19 @@ urlpatterns = [
     # CSV upload endpoints
     path('upload-csv/', views.upload_csv, name='upload_csv'),
     path('upload-csv/<uuid:file_id>/', views.get_upload_status, name='get_upload_status'),
+    path('upload-csv/<uuid:file_id>/errors/', views.list_upload_errors, name='list_upload_errors'),
+
+    # Resumable chunked upload endpoints
+    path('upload-csv/chunked/', views.init_chunked_upload, name='init_chunked_upload'),
+    path('upload-csv/chunked/<uuid:upload_id>/', views.get_chunked_upload_status, name='get_chunked_upload_status'),
+    path('upload-csv/chunked/<uuid:upload_id>/chunks/<int:index>/', views.upload_chunk, name='upload_chunk'),
+    path('upload-csv/chunked/<uuid:upload_id>/finalize/', views.finalize_chunked_upload, name='finalize_chunked_upload'),
 
     # Receipt upload endpoints
     path('upload-receipt/', views.upload_receipt, name='upload_receipt'),
     path('upload-receipt/<uuid:image_id>/', views.get_receipt_status, name='get_receipt_status'),
+    path('upload-receipt/batch/', views.upload_receipt_batch, name='upload_receipt_batch'),
+    path('upload-receipt/batch/<uuid:batch_id>/', views.get_receipt_batch_status, name='get_receipt_batch_status'),
 
     # Receipt preview and action endpoints
     path('receipts/<uuid:image_id>/', views.get_receipt_preview, name='get_receipt_preview'),
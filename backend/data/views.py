@@ -1,11 +1,14 @@
+import hashlib
 import logging
 import math
 import os
 import uuid
+import zlib
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from django.conf import settings
 from django.core.cache import cache
+from django.core.files.uploadedfile import UploadedFile
 from django.utils import timezone
 from django.db import models as db_models
 from django.db.models import Sum, Count, Avg, Q, Min, Max
@@ -14,7 +17,7 @@ from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from rest_framework.status import (
     HTTP_202_ACCEPTED, HTTP_200_OK, HTTP_400_BAD_REQUEST, HTTP_401_UNAUTHORIZED,
-    HTTP_404_NOT_FOUND, HTTP_429_TOO_MANY_REQUESTS, HTTP_201_CREATED
+    HTTP_404_NOT_FOUND, HTTP_409_CONFLICT, HTTP_429_TOO_MANY_REQUESTS, HTTP_201_CREATED
 )
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.viewsets import ModelViewSet
@@ -22,23 +25,52 @@ from rest_framework.pagination import PageNumberPagination
 from apps.churn.models import CustomerChurnScore
 from apps.churn.tasks import recalculate_rfm_scores
 from .models import (
-    FileUploadRecord, Transaction, ReceiptUploadRecord, Product, Customer, FailedJob,
-    InventoryUploadRecord, StockMovement, StockAlert
+    FileUploadRecord, ChunkedUploadSession, Transaction, ReceiptBatch, ReceiptUploadRecord, Product, Customer,
+    FailedJob, InventoryUploadRecord, StockMovement, StockAlert
 )
 from .serializers import (
-    FileUploadStatusSerializer, TransactionSerializer, ReceiptStatusSerializer,
+    FileUploadStatusSerializer, TransactionSerializer, ReceiptStatusSerializer, ReceiptBatchSerializer,
     InventoryUploadStatusSerializer, ProductDetailSerializer, StockMovementSerializer,
     StockAlertSerializer, InventoryReportSerializer
 )
 from .services import CSVParserService
+from .csv_stream import compression_for, format_size, is_parquet, iter_text_lines, open_csv_stream
+from .parallel_import import ParallelCSVImporter, use_parallel_import
 from .forecast_service import DemandForecastService
-from .receipt_ocr import ReceiptOCRService
+from .receipt_ocr import (
+    ReceiptNotConfirmable, ReceiptOCRService, find_similar_receipt, finish_batch_receipt, ocr_engine,
+    receipt_image_hash, submit_local_ocr
+)
 from .inventory_service import InventoryUploadService, SaleRecorderService, InventoryReportService
+from .product_index import get_product_index, is_exact, is_suggestion
+from .upload_handlers import RejectedUploadedFile, StreamedUploadedFile, StreamingUploadHandler
 
 # Thread pool executor for background processing
 # Max 5 concurrent uploads as per requirements
 _executor = ThreadPoolExecutor(max_workers=5)
 
+# Upload validation reads only this many rows, in chunks of this size
+CSV_PREVIEW_ROWS = 10
+CSV_PREVIEW_CHUNK_SIZE = 64 * 1024
+
+# Accepted upload names and MIME types, .gz and .zip are decompressed while reading
+CSV_UPLOAD_EXTENSIONS = ('.csv', '.csv.gz', '.zip')
+CSV_MIME_TYPES = ['text/csv', 'application/csv', 'text/plain']
+COMPRESSED_MIME_TYPES = [
+    'application/gzip', 'application/x-gzip', 'application/zip',
+    'application/x-zip-compressed', 'application/octet-stream'
+]
+# Transaction uploads also accept Parquet exports
+PARQUET_MIME_TYPES = ['application/vnd.apache.parquet', 'application/x-parquet', 'application/octet-stream']
+
+# Receipt images, checked against their first bytes while streaming
+RECEIPT_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+RECEIPT_IMAGE_MAX_SIZE = 5 * 1024 * 1024
+IMAGE_SIGNATURES = (b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n')
+
+# Largest page of failed rows returned at once
+FAILED_JOBS_MAX_PAGE_SIZE = 500
+
 
 def _get_business(user):
     """Helper to get user's business"""
@@ -127,46 +159,146 @@ def _update_stock_alerts_for_product(product, business, user):
             acknowledged_by=user
         )
 
-def _validate_csv_file(file_obj):
-    """Validate CSV file before processing"""
+def _validate_csv_file(file_obj, allow_parquet=False):
+    """Validate CSV file (or Parquet export when allowed) before processing"""
     if not file_obj:
         return False, "No file provided"
 
+    if allow_parquet and is_parquet(file_obj.name):
+        return _validate_parquet_file(file_obj)
+
     # Check file extension
     filename = file_obj.name
-    if not filename.lower().endswith('.csv'):
-        return False, "File must be a CSV file"
+    if not filename.lower().endswith(CSV_UPLOAD_EXTENSIONS):
+        return False, "File must be a CSV file (.csv, .csv.gz or .zip)"
+    compression = compression_for(filename)
 
-    # Check file size (10MB max)
-    if file_obj.size > 10 * 1024 * 1024:
-        return False, "File exceeds maximum size of 10MB"
+    # Check file size (configurable, 10MB by default), compressed bytes for archives
+    max_size = getattr(settings, 'CSV_UPLOAD_MAX_SIZE', 10 * 1024 * 1024)
+    if file_obj.size > max_size:
+        return False, f"File exceeds maximum size of {format_size(max_size)}"
 
     # Check MIME type (more flexible for testing)
-    allowed_types = ['text/csv', 'application/csv', 'text/plain']
+    allowed_types = CSV_MIME_TYPES + (COMPRESSED_MIME_TYPES if compression else [])
     if file_obj.content_type and file_obj.content_type not in allowed_types:
         return False, "Invalid MIME type. Expected text/csv"
 
-    # Try to read first 10 rows
-    try:
-        import csv
-        import io
+    if getattr(file_obj, 'preview_validated', False) and compression != 'zip':
+        # Header and first rows were checked while the upload streamed to disk
+        return True, "Valid"
 
-        file_obj.seek(0)
-        raw_bytes = file_obj.read()
-        if not raw_bytes:
-            return False, "CSV file appears to be empty"
-
-        preview_stream = io.StringIO(raw_bytes.decode('utf-8', errors='replace'))
-        reader = csv.DictReader(preview_stream)
-        row_count = 0
-        for _ in reader:
-            row_count += 1
-            if row_count >= 10:
-                break
-        if row_count == 0:
-            return False, "CSV file appears to be empty"
+    # Read only the header and the first few rows
+    stream = None
+    try:
+        if compression:
+            # Decompress only as far as the preview rows
+            stream = open_csv_stream(file_obj, compression)
+            byte_chunks = iter(lambda: stream.read(CSV_PREVIEW_CHUNK_SIZE), b'')
+        else:
+            byte_chunks = file_obj.chunks(CSV_PREVIEW_CHUNK_SIZE)
+        error = _check_csv_preview_rows(byte_chunks)
+        if error:
+            return False, error
     except Exception as e:
         return False, f"Invalid CSV format: {str(e)}"
+    finally:
+        if stream is not None:
+            stream.close()
+        file_obj.seek(0)
+
+    return True, "Valid"
+
+
+def _check_csv_preview_rows(byte_chunks):
+    """Parse the header and first rows of CSV bytes, returning an error message or None"""
+    import csv
+
+    reader = csv.DictReader(iter_text_lines(byte_chunks))
+    if not reader.fieldnames:
+        return "CSV file appears to be empty"
+
+    row_count = 0
+    for _ in reader:
+        row_count += 1
+        if row_count >= CSV_PREVIEW_ROWS:
+            break
+    if row_count == 0:
+        return "CSV file appears to be empty"
+    return None
+
+
+def _validate_csv_preview(file_name, preview):
+    """Upload handler check of the first bytes of a CSV, .csv.gz, .zip or .parquet upload"""
+    compression = compression_for(file_name)
+    if compression == 'zip' or is_parquet(file_name):
+        # Their directory/footer is at the end, checked once the file is on disk
+        return None
+    try:
+        if compression == 'gzip':
+            # A truncated gzip stream still decompresses up to where it ends
+            preview = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(preview)
+        return _check_csv_preview_rows([preview])
+    except Exception as e:
+        return f"Invalid CSV format: {str(e)}"
+
+
+def _validate_image_preview(file_name, preview):
+    """Upload handler check that a receipt really starts like a JPG or PNG"""
+    if not preview.startswith(IMAGE_SIGNATURES):
+        return "File content is not a JPG or PNG image"
+    return None
+
+
+def _stream_upload(request, business, directory, field_name, max_size, extensions, validate_preview,
+                   multiple=False, max_files=None):
+    """Have the upload written straight to MEDIA_ROOT/{directory}/{business_id} while the request is parsed
+
+    Must be called before request.FILES or request.data is read.
+    """
+    handler = StreamingUploadHandler(
+        os.path.join(settings.MEDIA_ROOT, directory, str(business.id)),
+        field_name=field_name,
+        max_size=max_size,
+        allowed_extensions=extensions,
+        validate_preview=validate_preview,
+        multiple=multiple,
+        max_files=max_files
+    )
+    request.upload_handlers.insert(0, handler)
+    return handler
+
+
+def _discard_upload(file_obj):
+    """Remove a streamed upload that failed validation"""
+    if isinstance(file_obj, StreamedUploadedFile):
+        file_obj.discard()
+
+
+def _validate_parquet_file(file_obj):
+    """Validate a Parquet export from its footer, no row data is decoded"""
+    max_size = getattr(settings, 'CSV_UPLOAD_MAX_SIZE', 10 * 1024 * 1024)
+    if file_obj.size > max_size:
+        return False, f"File exceeds maximum size of {format_size(max_size)}"
+
+    if file_obj.content_type and file_obj.content_type not in PARQUET_MIME_TYPES:
+        return False, "Invalid MIME type. Expected application/vnd.apache.parquet"
+
+    try:
+        from .parquet_import import ParquetTransactionReader
+    except ImportError:
+        return False, "Parquet uploads are not supported on this server"
+
+    try:
+        reader = ParquetTransactionReader(
+            file_obj, CSVParserService.REQUIRED_COLUMNS | CSVParserService.OPTIONAL_COLUMNS
+        )
+        if reader.num_rows == 0:
+            return False, "Parquet file appears to be empty"
+        missing_columns = CSVParserService.REQUIRED_COLUMNS - set(reader.columns)
+        if missing_columns:
+            return False, f"Missing required columns: {', '.join(sorted(missing_columns))}"
+    except Exception as e:
+        return False, f"Invalid Parquet file: {str(e)}"
     finally:
         file_obj.seek(0)
 
@@ -188,7 +320,16 @@ def _check_rate_limit(business_id):
 
 
 def _save_uploaded_file(file_obj, business_id):
-    """Save uploaded file to media directory"""
+    """Save uploaded file to media directory
+
+    Returns:
+        Tuple of (file path, SHA-256 hex digest of the content)
+    """
+    if isinstance(file_obj, StreamedUploadedFile):
+        # Already at its final location, hashed while streaming
+        file_obj.close()
+        return file_obj.file_path, file_obj.sha256
+
     # Create directory structure: media/uploads/{business_id}/{uuid}/
     upload_dir = os.path.join(
         settings.MEDIA_ROOT,
@@ -202,18 +343,39 @@ def _save_uploaded_file(file_obj, business_id):
     filename = f"{file_uuid}_{file_obj.name}"
     filepath = os.path.join(upload_dir, filename)
 
-    # Save file
+    # Save file, fingerprinting it on the way to disk
+    digest = hashlib.sha256()
     with open(filepath, 'wb') as f:
         for chunk in file_obj.chunks():
+            digest.update(chunk)
             f.write(chunk)
 
-    return filepath
+    return filepath, digest.hexdigest()
+
+
+def _find_processed_upload(business, content_sha256):
+    """Find an earlier upload of the same file for this business that imported every row
+
+    An upload with failed rows does not count, importing the file again is how
+    those rows are retried once their cause is fixed.
+    """
+    return (
+        FileUploadRecord.objects
+        .filter(
+            business=business, content_sha256=content_sha256, status='completed', rows_failed=0,
+            duplicate_of__isnull=True
+        )
+        .order_by('uploaded_at')
+        .first()
+    )
 
 
 def _process_csv_file(file_upload_id):
     """Background task to process CSV file"""
     try:
         file_upload = FileUploadRecord.objects.get(file_id=file_upload_id)
+        if use_parallel_import(file_upload):
+            return ParallelCSVImporter(file_upload).run()
         parser = CSVParserService(file_upload)
         result = parser.parse_csv()
         return result
@@ -221,11 +383,81 @@ def _process_csv_file(file_upload_id):
         return {'status': 'failed', 'error': str(e)}
 
 
+def _accept_csv_upload(request, business, file_path, file_name, file_size, content_sha256):
+    """Create the FileUploadRecord of a saved upload and queue it for processing"""
+    # Byte-identical re-upload: every row would be skipped as a duplicate,
+    # so complete now and point to the original upload's results
+    original = _find_processed_upload(business, content_sha256)
+    if original:
+        os.remove(file_path)
+        now = timezone.now()
+        file_upload = FileUploadRecord.objects.create(
+            business=business,
+            user=request.user,
+            file_path=original.file_path,
+            original_filename=file_name,
+            file_size=file_size,
+            content_sha256=content_sha256,
+            duplicate_of=original,
+            status='completed',
+            row_count=original.row_count,
+            rows_processed=original.rows_processed,
+            rows_failed=original.rows_failed,
+            created_transactions=original.created_transactions,
+            processing_errors=original.processing_errors,
+            error_counts=original.error_counts,
+            processing_started_at=now,
+            processing_completed_at=now
+        )
+        return Response(
+            {
+                'status': 'completed',
+                'data': {
+                    'message': 'File already imported',
+                    'file_id': str(file_upload.file_id),
+                    'file_name': file_name,
+                    'duplicate_of': str(original.file_id),
+                    'rows_detected': original.row_count,
+                    'estimated_processing_time': 0
+                }
+            },
+            status=HTTP_200_OK
+        )
+
+    # Create FileUploadRecord
+    file_upload = FileUploadRecord.objects.create(
+        business=business,
+        user=request.user,
+        file_path=file_path,
+        original_filename=file_name,
+        file_size=file_size,
+        content_sha256=content_sha256,
+        status='pending'
+    )
+
+    # Spawn background thread to process file
+    _executor.submit(_process_csv_file, file_upload.file_id)
+
+    return Response(
+        {
+            'status': 'pending',
+            'data': {
+                'message': 'Processing file...',
+                'file_id': str(file_upload.file_id),
+                'file_name': file_name,
+                'rows_detected': 0,  # Will be updated during processing
+                'estimated_processing_time': 5
+            }
+        },
+        status=HTTP_202_ACCEPTED
+    )
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def upload_csv(request):
     """
-    Upload CSV file endpoint
+    Upload CSV file endpoint (.csv, .csv.gz, .zip or a .parquet export)
     POST /data/upload-csv
     """
     if request.method != 'POST':
@@ -253,47 +485,36 @@ def upload_csv(request):
             status=HTTP_429_TOO_MANY_REQUESTS
         )
 
+    # Stream the file to disk while the request body is parsed
+    upload_handler = _stream_upload(
+        request, business, 'uploads', 'file',
+        max_size=getattr(settings, 'CSV_UPLOAD_MAX_SIZE', 10 * 1024 * 1024),
+        extensions=CSV_UPLOAD_EXTENSIONS + ('.parquet',),
+        validate_preview=_validate_csv_preview
+    )
+
     # Get file
     file_obj = request.FILES.get('file')
     data_source_name = request.data.get('data_source_name', 'Default')
+    if upload_handler.error:
+        return Response(
+            {'error_code': 'INVALID_FILE_FORMAT', 'message': upload_handler.error},
+            status=HTTP_400_BAD_REQUEST
+        )
 
     # Validate file
-    is_valid, message = _validate_csv_file(file_obj)
+    is_valid, message = _validate_csv_file(file_obj, allow_parquet=True)
     if not is_valid:
+        _discard_upload(file_obj)
         return Response(
             {'error_code': 'INVALID_FILE_FORMAT', 'message': message},
             status=HTTP_400_BAD_REQUEST
         )
 
     # Save file
-    file_path = _save_uploaded_file(file_obj, business.id)
+    file_path, content_sha256 = _save_uploaded_file(file_obj, business.id)
 
-    # Create FileUploadRecord
-    file_upload = FileUploadRecord.objects.create(
-        business=business,
-        user=request.user,
-        file_path=file_path,
-        original_filename=file_obj.name,
-        file_size=file_obj.size,
-        status='pending'
-    )
-
-    # Spawn background thread to process file
-    _executor.submit(_process_csv_file, file_upload.file_id)
-
-    return Response(
-        {
-            'status': 'pending',
-            'data': {
-                'message': 'Processing file...',
-                'file_id': str(file_upload.file_id),
-                'file_name': file_obj.name,
-                'rows_detected': 0,  # Will be updated during processing
-                'estimated_processing_time': 5
-            }
-        },
-        status=HTTP_202_ACCEPTED
-    )
+    return _accept_csv_upload(request, business, file_path, file_obj.name, file_obj.size, content_sha256)
 
 
 @api_view(['GET'])
@@ -317,12 +538,270 @@ def get_upload_status(request, file_id):
     data = serializer.data
 
     if file_upload.status == 'completed':
-        # Include transaction errors if any
+        # Include transaction errors if any (capped summary, full list via list_upload_errors)
         data['errors'] = file_upload.processing_errors
+        data['error_counts'] = file_upload.error_counts
 
     return Response(data)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def list_upload_errors(request, file_id):
+    """
+    List failed rows of an upload, ordered by row number
+    GET /data/upload-csv/{file_id}/errors?limit=50&offset=0
+    """
+    try:
+        business = _get_business(request.user)
+        file_upload = FileUploadRecord.objects.get(file_id=file_id, business=business)
+    except FileUploadRecord.DoesNotExist:
+        return Response(
+            {'error': 'File upload not found'},
+            status=HTTP_404_NOT_FOUND
+        )
+
+    try:
+        page_size = min(max(int(request.query_params.get('limit', 50)), 1), FAILED_JOBS_MAX_PAGE_SIZE)
+        offset = max(int(request.query_params.get('offset', 0)), 0)
+    except ValueError:
+        return Response(
+            {'error': 'limit and offset must be integers'},
+            status=HTTP_400_BAD_REQUEST
+        )
+
+    queryset = FailedJob.objects.filter(file_upload=file_upload).order_by('row_number')
+    items = queryset.values('row_number', 'row_data', 'error_message')[offset:offset + page_size]
+
+    return Response({
+        'count': queryset.count(),
+        'error_counts': file_upload.error_counts,
+        'results': list(items)
+    })
+
+
+def _chunked_upload_status(session):
+    """Response data of a chunked upload session, lists what is left to send"""
+    return {
+        'upload_id': str(session.upload_id),
+        'file_name': session.original_filename,
+        'status': session.status,
+        'total_size': session.total_size,
+        'chunk_size': session.chunk_size,
+        'total_chunks': session.total_chunks,
+        'bytes_received': session.bytes_received,
+        'received_ranges': session.received_ranges,
+        'missing_chunks': session.missing_chunks(),
+        'file_id': str(session.file_upload_id) if session.file_upload_id else None,
+    }
+
+
+def _get_chunked_upload(request, upload_id):
+    """Chunked upload session of the user's business, None when not found"""
+    business = _get_business(request.user)
+    return ChunkedUploadSession.objects.filter(upload_id=upload_id, business=business).first()
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def init_chunked_upload(request):
+    """
+    Start a resumable upload of a large CSV or Parquet file
+    POST /data/upload-csv/chunked
+    Body: {"file_name": "sales.csv.gz", "total_size": 52428800}
+    """
+    business = _get_business(request.user)
+    if not business:
+        return Response(
+            {'error_code': 'NO_BUSINESS', 'message': 'User has no associated business'},
+            status=HTTP_400_BAD_REQUEST
+        )
+
+    allowed, _ = _check_rate_limit(business.id)
+    if not allowed:
+        return Response(
+            {
+                'error_code': 'RATE_LIMIT_EXCEEDED',
+                'message': f'Maximum {getattr(settings, "RATE_LIMIT_UPLOADS_PER_MINUTE", 10)} uploads per minute allowed'
+            },
+            status=HTTP_429_TOO_MANY_REQUESTS
+        )
+
+    file_name = os.path.basename(str(request.data.get('file_name', '')))
+    extensions = CSV_UPLOAD_EXTENSIONS + ('.parquet',)
+    if not file_name.lower().endswith(extensions):
+        return Response(
+            {'error_code': 'INVALID_FILE_FORMAT', 'message': f"File must be one of: {', '.join(extensions)}"},
+            status=HTTP_400_BAD_REQUEST
+        )
+
+    max_size = getattr(settings, 'CSV_UPLOAD_MAX_SIZE', 10 * 1024 * 1024)
+    try:
+        total_size = int(request.data.get('total_size'))
+    except (TypeError, ValueError):
+        total_size = 0
+    if total_size <= 0:
+        return Response(
+            {'error_code': 'INVALID_FILE_FORMAT', 'message': 'total_size must be a positive integer'},
+            status=HTTP_400_BAD_REQUEST
+        )
+    if total_size > max_size:
+        return Response(
+            {'error_code': 'INVALID_FILE_FORMAT', 'message': f"File exceeds maximum size of {format_size(max_size)}"},
+            status=HTTP_400_BAD_REQUEST
+        )
+
+    # Chunks are written at their offset into a file of the final size
+    upload_id = uuid.uuid4()
+    upload_dir = os.path.join(settings.MEDIA_ROOT, 'uploads', str(business.id))
+    os.makedirs(upload_dir, exist_ok=True)
+    file_path = os.path.join(upload_dir, f"{upload_id}_{file_name}.part")
+    with open(file_path, 'wb') as f:
+        f.truncate(total_size)
+
+    session = ChunkedUploadSession.objects.create(
+        upload_id=upload_id,
+        business=business,
+        user=request.user,
+        original_filename=file_name,
+        file_path=file_path,
+        total_size=total_size,
+        chunk_size=getattr(settings, 'CSV_UPLOAD_CHUNK_SIZE', 1024 * 1024)
+    )
+
+    return Response(
+        {'status': 'uploading', 'data': _chunked_upload_status(session)},
+        status=HTTP_201_CREATED
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_chunked_upload_status(request, upload_id):
+    """
+    Received ranges and missing chunks, used to resume after a disconnect
+    GET /data/upload-csv/chunked/{upload_id}
+    """
+    session = _get_chunked_upload(request, upload_id)
+    if not session:
+        return Response({'error': 'Upload not found'}, status=HTTP_404_NOT_FOUND)
+    return Response({'status': session.status, 'data': _chunked_upload_status(session)})
+
+
+@api_view(['PUT'])
+@permission_classes([IsAuthenticated])
+def upload_chunk(request, upload_id, index):
+    """
+    Upload chunk `index`, the raw request body holds its bytes
+    PUT /data/upload-csv/chunked/{upload_id}/chunks/{index}
+    """
+    session = _get_chunked_upload(request, upload_id)
+    if not session:
+        return Response({'error': 'Upload not found'}, status=HTTP_404_NOT_FOUND)
+    if index >= session.total_chunks:
+        return Response(
+            {'error_code': 'INVALID_CHUNK', 'message': f'Chunk index must be below {session.total_chunks}'},
+            status=HTTP_400_BAD_REQUEST
+        )
+
+    start, end = session.chunk_range(index)
+    data = request.body
+    if len(data) != end - start:
+        return Response(
+            {'error_code': 'INVALID_CHUNK', 'message': f'Chunk {index} must be {end - start} bytes, got {len(data)}'},
+            status=HTTP_400_BAD_REQUEST
+        )
+
+    # The row lock keeps finalize from hashing or renaming the file mid-write
+    with db_transaction.atomic():
+        session = ChunkedUploadSession.objects.select_for_update().get(upload_id=session.upload_id)
+        if session.status != 'uploading':
+            return Response(
+                {'error_code': 'UPLOAD_COMPLETED', 'message': 'Upload already finalized'},
+                status=HTTP_400_BAD_REQUEST
+            )
+        try:
+            with open(session.file_path, 'r+b') as f:
+                f.seek(start)
+                f.write(data)
+        except FileNotFoundError:
+            return Response(
+                {'error_code': 'UPLOAD_EXPIRED', 'message': 'Upload file no longer exists, start a new upload'},
+                status=HTTP_409_CONFLICT
+            )
+        session.add_range(start, end)
+        session.save(update_fields=['received_ranges', 'updated_at'])
+
+    return Response({'status': session.status, 'data': _chunked_upload_status(session)})
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def finalize_chunked_upload(request, upload_id):
+    """
+    Validate the assembled file and queue it for import like upload_csv
+    POST /data/upload-csv/chunked/{upload_id}/finalize
+    """
+    business = _get_business(request.user)
+    with db_transaction.atomic():
+        session = (
+            ChunkedUploadSession.objects.select_for_update()
+            .filter(upload_id=upload_id, business=business)
+            .first()
+        )
+        if not session:
+            return Response({'error': 'Upload not found'}, status=HTTP_404_NOT_FOUND)
+        if session.status != 'uploading':
+            return Response(
+                {'error_code': 'UPLOAD_COMPLETED', 'message': 'Upload already finalized'},
+                status=HTTP_400_BAD_REQUEST
+            )
+        if not session.is_complete():
+            return Response(
+                {
+                    'error_code': 'UPLOAD_INCOMPLETE',
+                    'message': 'Some chunks have not been received',
+                    'missing_chunks': session.missing_chunks()
+                },
+                status=HTTP_400_BAD_REQUEST
+            )
+
+        # Chunk writes stop here, the file is hashed after the lock is released
+        session.status = 'finalizing'
+        session.save(update_fields=['status', 'updated_at'])
+
+    try:
+        with open(session.file_path, 'rb') as f:
+            file_obj = UploadedFile(f, session.original_filename, None, session.total_size)
+            is_valid, message = _validate_csv_file(file_obj, allow_parquet=True)
+            if is_valid:
+                digest = hashlib.sha256()
+                for chunk in file_obj.chunks():
+                    digest.update(chunk)
+    except OSError as e:
+        is_valid, message = False, f'Could not read the uploaded file: {e}'
+    if not is_valid:
+        session.discard()
+        return Response(
+            {'error_code': 'INVALID_FILE_FORMAT', 'message': message},
+            status=HTTP_400_BAD_REQUEST
+        )
+
+    # Drop the .part suffix, the importer picks the format from the name
+    file_path = session.file_path[:-len('.part')]
+    os.replace(session.file_path, file_path)
+    session.file_path = file_path
+    session.status = 'completed'
+    session.save(update_fields=['file_path', 'status', 'updated_at'])
+
+    response = _accept_csv_upload(
+        request, business, file_path, session.original_filename, session.total_size, digest.hexdigest()
+    )
+    session.file_upload_id = response.data['data']['file_id']
+    session.save(update_fields=['file_upload', 'updated_at'])
+    return response
+
+
 def _validate_receipt_image(file_obj):
     """Validate receipt image file before processing"""
     if not file_obj:
@@ -346,7 +825,16 @@ def _validate_receipt_image(file_obj):
 
 
 def _save_receipt_file(file_obj, business_id):
-    """Save uploaded receipt image to media directory"""
+    """Save uploaded receipt image to media directory
+
+    Returns:
+        Tuple of (file path, SHA-256 hex digest of the content)
+    """
+    if isinstance(file_obj, StreamedUploadedFile):
+        # Already at its final location, hashed while streaming
+        file_obj.close()
+        return file_obj.file_path, file_obj.sha256
+
     # Create directory structure: media/receipts/{business_id}/{uuid}/
     upload_dir = os.path.join(
         settings.MEDIA_ROOT,
@@ -360,25 +848,43 @@ def _save_receipt_file(file_obj, business_id):
     filename = f"{file_uuid}_{file_obj.name}"
     filepath = os.path.join(upload_dir, filename)
 
-    # Save file
+    # Save file, fingerprinting it on the way to disk
+    digest = hashlib.sha256()
     with open(filepath, 'wb') as f:
         for chunk in file_obj.chunks():
+            digest.update(chunk)
             f.write(chunk)
 
-    return filepath
+    return filepath, digest.hexdigest()
 
 
-def _process_receipt_image(receipt_upload_id):
+def _process_receipt_image(receipt_upload_id, ocr_future=None):
     """Background task to process receipt image"""
     try:
         receipt_upload = ReceiptUploadRecord.objects.get(image_id=receipt_upload_id)
         ocr_service = ReceiptOCRService(receipt_upload)
-        result = ocr_service.process_receipt()
+        result = ocr_service.process_receipt(ocr_future)
         return result
     except Exception as e:
         return {'status': 'failed', 'error': str(e)}
 
 
+def _queue_receipt_processing(receipt_upload):
+    """Hand a receipt to the background workers
+
+    With local OCR the image goes to the OCR process pool first; a thread
+    only picks the receipt up once its text is extracted, so slow images
+    never tie up the threads that import CSVs.
+    """
+    if ocr_engine() == 'mock':
+        _executor.submit(_process_receipt_image, receipt_upload.image_id)
+        return
+
+    image_id = receipt_upload.image_id
+    ocr_future = submit_local_ocr(receipt_upload.file_path)
+    ocr_future.add_done_callback(lambda future: _executor.submit(_process_receipt_image, image_id, future))
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def upload_receipt(request):
@@ -400,47 +906,257 @@ def upload_receipt(request):
             status=HTTP_400_BAD_REQUEST
         )
 
+    # Stream the image to disk while the request body is parsed
+    upload_handler = _stream_upload(
+        request, business, 'receipts', 'image',
+        max_size=RECEIPT_IMAGE_MAX_SIZE,
+        extensions=RECEIPT_IMAGE_EXTENSIONS,
+        validate_preview=_validate_image_preview
+    )
+
     # Get file
     file_obj = request.FILES.get('image')
+    if upload_handler.error:
+        return Response(
+            {'error_code': 'INVALID_FILE_FORMAT', 'message': upload_handler.error},
+            status=HTTP_400_BAD_REQUEST
+        )
 
     # Validate file
     is_valid, message = _validate_receipt_image(file_obj)
     if not is_valid:
+        _discard_upload(file_obj)
         return Response(
             {'error_code': 'INVALID_FILE_FORMAT', 'message': message},
             status=HTTP_400_BAD_REQUEST
         )
 
     # Save file
-    file_path = _save_receipt_file(file_obj, business.id)
+    file_path, content_sha256 = _save_receipt_file(file_obj, business.id)
 
-    # Create ReceiptUploadRecord
+    receipt_upload = _accept_receipt_upload(
+        request, business, file_path, file_obj.name, file_obj.size, content_sha256
+    )
+    return Response(_receipt_upload_response(receipt_upload), status=(
+        HTTP_202_ACCEPTED if receipt_upload.status == 'pending' else HTTP_200_OK
+    ))
+
+
+def _find_processed_receipt(business, content_sha256):
+    """Find the first processed upload of the same image file for this business"""
+    return (
+        ReceiptUploadRecord.objects
+        .filter(business=business, content_sha256=content_sha256, status__in=['completed', 'confirmed'])
+        .order_by('uploaded_at')
+        .first()
+    )
+
+
+def _accept_receipt_upload(request, business, file_path, file_name, file_size, content_sha256, batch=None):
+    """Create the ReceiptUploadRecord of a saved image and queue it for OCR
+
+    A byte-identical re-upload of a processed receipt reuses its OCR result
+    and creates no transactions, the original already did, so corrections
+    are confirmed on the original. A photo that only
+    looks like an earlier receipt (perceptual hash within
+    RECEIPT_DUPLICATE_FLAG_DISTANCE bits) is still processed, receipts with
+    the same layout differ in a few printed characters, and is flagged
+    through duplicate_of.
+    """
+    original = _find_processed_receipt(business, content_sha256)
+    if original:
+        os.remove(file_path)
+        now = timezone.now()
+        receipt_upload = ReceiptUploadRecord.objects.create(
+            business=business,
+            user=request.user,
+            file_path=original.file_path,
+            original_filename=file_name,
+            file_size=file_size,
+            content_sha256=content_sha256,
+            image_hash=original.image_hash,
+            duplicate_of=original,
+            duplicate_distance=0,
+            batch=batch,
+            status='completed',
+            extracted_data=original.extracted_data,
+            processing_started_at=now,
+            processing_completed_at=now
+        )
+        if batch:
+            finish_batch_receipt(receipt_upload)
+        return receipt_upload
+
+    image_hash = receipt_image_hash(file_path)
+    similar, distance = find_similar_receipt(business, image_hash) or (None, None)
     receipt_upload = ReceiptUploadRecord.objects.create(
         business=business,
         user=request.user,
         file_path=file_path,
-        original_filename=file_obj.name,
-        file_size=file_obj.size,
+        original_filename=file_name,
+        file_size=file_size,
+        content_sha256=content_sha256,
+        image_hash=image_hash,
+        duplicate_of=similar,
+        duplicate_distance=distance,
+        batch=batch,
         status='pending'
     )
 
-    # Spawn background thread to process receipt
-    _executor.submit(_process_receipt_image, receipt_upload.image_id)
+    # Spawn background processing once the record is committed, workers load it by id
+    db_transaction.on_commit(lambda: _queue_receipt_processing(receipt_upload))
+    return receipt_upload
+
+
+def _receipt_upload_response(receipt_upload):
+    """Response body for an accepted receipt image"""
+    data = {
+        'image_id': str(receipt_upload.image_id),
+        'file_name': receipt_upload.original_filename,
+    }
+    if receipt_upload.status != 'pending':
+        data.update(
+            message='Receipt already processed',
+            duplicate_of=str(receipt_upload.duplicate_of_id),
+            extracted_data=receipt_upload.extracted_data,
+            estimated_processing_time=0
+        )
+        return {'status': receipt_upload.status, 'data': data}
+
+    data.update(message='Extracting receipt data...', estimated_processing_time=10)
+    if receipt_upload.duplicate_of_id:
+        data['possible_duplicate_of'] = str(receipt_upload.duplicate_of_id)
+    return {'status': 'pending', 'data': data}
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def upload_receipt_batch(request):
+    """
+    Upload several receipt images in one request
+    POST /data/upload-receipt/batch/
+
+    Each `images` file is processed in parallel as its own receipt. Files
+    failing validation and repeats of a file in the batch are reported and
+    skipped without failing the batch.
+    One transaction.parsed event is published when every receipt is done.
+    """
+    business = _get_business(request.user)
+    if not business:
+        return Response(
+            {'error_code': 'NO_BUSINESS', 'message': 'User has no associated business'},
+            status=HTTP_400_BAD_REQUEST
+        )
+
+    # Stream every image to disk while the request body is parsed, stopping
+    # as soon as the batch holds too many files
+    max_images = getattr(settings, 'RECEIPT_BATCH_MAX_IMAGES', 50)
+    upload_handler = _stream_upload(
+        request, business, 'receipts', 'images',
+        max_size=RECEIPT_IMAGE_MAX_SIZE,
+        extensions=RECEIPT_IMAGE_EXTENSIONS,
+        validate_preview=_validate_image_preview,
+        multiple=True,
+        max_files=max_images
+    )
+
+    file_objs = request.FILES.getlist('images')
+    if upload_handler.error:
+        return Response(
+            {'error_code': 'TOO_MANY_IMAGES', 'message': f'A batch can hold at most {max_images} images'},
+            status=HTTP_400_BAD_REQUEST
+        )
+
+    # Save each valid image once, the same file twice in a batch is only processed once
+    accepted, rejected = [], []
+    saved = {}  # content SHA-256 -> file name
+    for file_obj in file_objs:
+        if isinstance(file_obj, RejectedUploadedFile):
+            rejected.append({'file_name': file_obj.name, 'error': file_obj.error})
+            continue
+        is_valid, message = _validate_receipt_image(file_obj)
+        if not is_valid:
+            _discard_upload(file_obj)
+            rejected.append({'file_name': file_obj.name, 'error': message})
+            continue
+        file_path, content_sha256 = _save_receipt_file(file_obj, business.id)
+        if content_sha256 in saved:
+            os.remove(file_path)
+            rejected.append({
+                'file_name': file_obj.name, 'error': f'Same image as {saved[content_sha256]} in this batch'
+            })
+            continue
+        saved[content_sha256] = file_obj.name
+        accepted.append((file_obj, file_path, content_sha256))
+
+    if not accepted:
+        return Response(
+            {
+                'error_code': 'INVALID_FILE_FORMAT',
+                'message': 'No valid receipt images provided',
+                'rejected_files': rejected
+            },
+            status=HTTP_400_BAD_REQUEST
+        )
+
+    # The batch and its receipts commit together before any receipt is queued,
+    # so receipt_count always matches and the last one to finish publishes the event
+    receipts = []
+    try:
+        with db_transaction.atomic():
+            batch = ReceiptBatch.objects.create(
+                business=business,
+                user=request.user,
+                receipt_count=len(accepted),
+                rejected_files=rejected
+            )
+            for file_obj, file_path, content_sha256 in accepted:
+                receipt_upload = _accept_receipt_upload(
+                    request, business, file_path, file_obj.name, file_obj.size, content_sha256, batch=batch
+                )
+                body = _receipt_upload_response(receipt_upload)
+                receipts.append({'status': body['status'], **body['data']})
+    except Exception:
+        # Nothing was recorded, drop the saved images
+        for _, file_path, _ in accepted:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        raise
 
     return Response(
         {
-            'status': 'pending',
+            'status': 'processing',
             'data': {
-                'message': 'Extracting receipt data...',
-                'image_id': str(receipt_upload.image_id),
-                'file_name': file_obj.name,
-                'estimated_processing_time': 10
+                'message': f'Extracting data from {len(accepted)} receipts...',
+                'batch_id': str(batch.batch_id),
+                'receipt_count': len(accepted),
+                'receipts': receipts,
+                'rejected_files': rejected
             }
         },
         status=HTTP_202_ACCEPTED
     )
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_receipt_batch_status(request, batch_id):
+    """
+    Get the status of a receipt batch and of every receipt in it
+    GET /data/upload-receipt/batch/{batch_id}/
+    """
+    business = _get_business(request.user)
+    try:
+        batch = ReceiptBatch.objects.prefetch_related('receipts').get(batch_id=batch_id, business=business)
+    except ReceiptBatch.DoesNotExist:
+        return Response(
+            {'error': 'Receipt batch not found'},
+            status=HTTP_404_NOT_FOUND
+        )
+
+    return Response(ReceiptBatchSerializer(batch).data)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_receipt_status(request, image_id):
@@ -476,7 +1192,7 @@ def list_failed_jobs(request):
     GET /admin/api/v1/failed-jobs
     """
     # Get all failed jobs
-    queryset = FailedJob.objects.all()
+    queryset = FailedJob.objects.select_related('file_upload', 'business')
 
     # Optional filters
     business_id = request.query_params.get('business_id')
@@ -513,7 +1229,7 @@ def list_failed_jobs(request):
         queryset = queryset.order_by(order_field)
 
     # Pagination
-    page_size = int(request.query_params.get('limit', 50))
+    page_size = min(int(request.query_params.get('limit', 50)), FAILED_JOBS_MAX_PAGE_SIZE)
     offset = int(request.query_params.get('offset', 0))
     total_count = queryset.count()
 
@@ -816,10 +1532,27 @@ def get_receipt_preview(request, image_id):
     # Get extracted items if available
     extracted_data = receipt_upload.extracted_data or {}
 
+    # Product each item resolves to, with how closely the OCR'd name matches it (0-100).
+    # Close but inexact matches are only suggested, confirming sends the chosen product_id
+    product_index = get_product_index(business.id)
+    extracted_items = []
+    for item in extracted_data.get('items', []):
+        match = product_index.match(str(item.get('name', '')))
+        exact = is_exact(match)
+        suggested = not exact and is_suggestion(match)
+        extracted_items.append({
+            **item,
+            'product_id': str(match.product_id) if exact else None,
+            'product_name': match.name if exact else None,
+            'suggested_product_id': str(match.product_id) if suggested else None,
+            'suggested_product_name': match.name if suggested else None,
+            'match_confidence': round(match.score * 100) if match else 0
+        })
+
     return Response({
         'id': str(receipt_upload.image_id),
         'image_url': receipt_upload.file_path,  # or serve the actual media file
-        'extracted_items': extracted_data.get('items', []),
+        'extracted_items': extracted_items,
         'total_amount': extracted_data.get('total_amount', 0),
         'vendor_name': extracted_data.get('vendor_name'),
         'transaction_date': extracted_data.get('transaction_date'),
@@ -833,8 +1566,12 @@ def get_receipt_preview(request, image_id):
 @permission_classes([IsAuthenticated])
 def confirm_receipt(request, image_id):
     """
-    Confirm receipt OCR data and create transaction
+    Confirm receipt OCR data and create a transaction per item
     POST /data/receipts/{image_id}/confirm/
+
+    Body (optional): {"items": [{"name", "qty", "price", "product_id"}], "date": "YYYY-MM-DD"}
+    to correct the extracted data. The items replace the lines the receipt
+    booked before, whose stock and purchase amounts are given back.
     """
     try:
         # Verify user owns this business
@@ -846,35 +1583,31 @@ def confirm_receipt(request, image_id):
             status=HTTP_404_NOT_FOUND
         )
 
-    # Get items from request
-    items = request.data.get('items', [])
-
-    # Create transaction from receipt data
-    try:
-        extracted_data = receipt_upload.extracted_data or {}
-
-        # Create transaction
-        transaction = Transaction.objects.create(
-            business=business,
-            user=request.user,
-            product_id=extracted_data.get('product_id'),  # This may need adjustment
-            customer_id=extracted_data.get('customer_id'),  # This may need adjustment
-            quantity=sum(item.get('quantity', 1) for item in items),
-            amount=extracted_data.get('total_amount', 0),
-            payment_method='receipt_scan',
-            date=timezone.now().date(),
-            reference=f'RECEIPT_{receipt_upload.image_id}'
+    # Items reviewed in the preview, the extracted ones otherwise
+    items = request.data.get('items')
+    if items is not None and not isinstance(items, list):
+        return Response(
+            {'error': 'items must be a list'},
+            status=HTTP_400_BAD_REQUEST
         )
 
-        # Update receipt status
-        receipt_upload.status = 'confirmed'
-        receipt_upload.save()
+    try:
+        result = ReceiptOCRService(receipt_upload).confirm_receipt(items, request.data.get('date'))
 
         return Response({
             'status': 'confirmed',
-            'transaction_id': str(transaction.id),
-            'message': 'Transaction created from receipt'
+            'transaction_ids': result['transaction_ids'],
+            'created_count': result['created_count'],
+            'reversed_count': result['reversed_count'],
+            'failed_count': result['failed_count'],
+            'errors': result['errors'],
+            'message': f"{result['created_count']} transactions created from receipt"
         }, status=HTTP_201_CREATED)
+    except ReceiptNotConfirmable as e:
+        return Response(
+            {'error': str(e)},
+            status=HTTP_409_CONFLICT
+        )
     except Exception as e:
         return Response(
             {'error': str(e)},
@@ -941,19 +1674,33 @@ def upload_inventory_csv(request):
             status=HTTP_400_BAD_REQUEST
         )
 
+    # Stream the file to disk while the request body is parsed
+    upload_handler = _stream_upload(
+        request, business, 'uploads', 'file',
+        max_size=getattr(settings, 'CSV_UPLOAD_MAX_SIZE', 10 * 1024 * 1024),
+        extensions=CSV_UPLOAD_EXTENSIONS,
+        validate_preview=_validate_csv_preview
+    )
+
     # Get file
     file_obj = request.FILES.get('file')
+    if upload_handler.error:
+        return Response(
+            {'error_code': 'INVALID_FILE_FORMAT', 'message': upload_handler.error},
+            status=HTTP_400_BAD_REQUEST
+        )
 
     # Validate file
     is_valid, message = _validate_csv_file(file_obj)
     if not is_valid:
+        _discard_upload(file_obj)
         return Response(
             {'error_code': 'INVALID_FILE_FORMAT', 'message': message},
             status=HTTP_400_BAD_REQUEST
         )
 
     # Save file
-    file_path = _save_uploaded_file(file_obj, business.id)
+    file_path, _ = _save_uploaded_file(file_obj, business.id)
 
     # Create InventoryUploadRecord
     inventory_upload = InventoryUploadRecord.objects.create(
@@ -1015,7 +1762,11 @@ class ProductListViewSet(ModelViewSet):
     def get_queryset(self):
         """Get products for authenticated user's business"""
         business = _get_business(self.request.user)
-        return Product.objects.filter(business=business).order_by('-current_stock')
+        return (
+            Product.objects.filter(business=business)
+            .annotate(total_sales=Sum('transactions__quantity'))
+            .order_by('-current_stock')
+        )
 
 
 @api_view(['POST'])
@@ -91,6 +91,35 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 # Rate limiting config
 RATE_LIMIT_UPLOADS_PER_MINUTE = 10
 
+# CSV import config
+CSV_UPLOAD_MAX_SIZE = int(os.getenv('CSV_UPLOAD_MAX_SIZE', str(10 * 1024 * 1024)))  # 10MB, compressed bytes for .gz/.zip uploads
+CSV_UPLOAD_MAX_DECOMPRESSED_SIZE = int(os.getenv('CSV_UPLOAD_MAX_DECOMPRESSED_SIZE', str(100 * 1024 * 1024)))  # 100MB, .gz/.zip uploads
+CSV_UPLOAD_CHUNK_SIZE = int(os.getenv('CSV_UPLOAD_CHUNK_SIZE', str(1024 * 1024)))  # 1MB, resumable chunked uploads
+CSV_UPLOAD_SESSION_EXPIRY_HOURS = int(os.getenv('CSV_UPLOAD_SESSION_EXPIRY_HOURS', '24'))  # Idle chunked uploads before cleanup
+CSV_IMPORT_BATCH_SIZE = int(os.getenv('CSV_IMPORT_BATCH_SIZE', '500'))  # Rows per bulk write, 1 = row-by-row
+CSV_IMPORT_ENGINE = os.getenv('CSV_IMPORT_ENGINE', 'python')  # 'python' or 'pandas' (columnar validation)
+CSV_IMPORT_BACKEND = os.getenv('CSV_IMPORT_BACKEND', 'auto')  # 'auto' (COPY on PostgreSQL), 'copy' or 'orm'
+CSV_IMPORT_WORKERS = int(os.getenv('CSV_IMPORT_WORKERS', '1'))  # Worker processes for large files, 1 = disabled
+CSV_PARALLEL_MIN_ROWS = int(os.getenv('CSV_PARALLEL_MIN_ROWS', '100000'))  # Rows before the parallel import is used
+CSV_ERROR_SUMMARY_LIMIT = int(os.getenv('CSV_ERROR_SUMMARY_LIMIT', '100'))  # Row errors kept on the upload record
+CSV_VERIFY_ASYNC = os.getenv('CSV_VERIFY_ASYNC', 'False') == 'True'  # Run post-import checks after completion
+INVENTORY_IMPORT_BATCH_SIZE = int(os.getenv('INVENTORY_IMPORT_BATCH_SIZE', '500'))  # Stock rows per bulk write, 1 = row-by-row
+
+# Receipt OCR config
+RECEIPT_OCR_ENGINE = os.getenv('RECEIPT_OCR_ENGINE', 'mock')  # 'mock' or 'tesseract' (needs the tesseract binary)
+RECEIPT_OCR_WORKERS = int(os.getenv('RECEIPT_OCR_WORKERS', '2'))  # OCR processes, separate from the upload threads
+RECEIPT_OCR_LANG = os.getenv('RECEIPT_OCR_LANG', 'eng')  # Tesseract language packs, e.g. 'eng+ben'
+RECEIPT_OCR_TIMEOUT = int(os.getenv('RECEIPT_OCR_TIMEOUT', '60'))  # Seconds to wait for one receipt's OCR
+RECEIPT_DUPLICATE_FLAG_DISTANCE = int(os.getenv('RECEIPT_DUPLICATE_FLAG_DISTANCE', '24'))  # Image hash bits (of 256) within which a receipt is flagged, -1 = off
+RECEIPT_DUPLICATE_LOOKBACK = int(os.getenv('RECEIPT_DUPLICATE_LOOKBACK', '500'))  # Recent receipts compared for near-duplicates
+RECEIPT_BATCH_MAX_IMAGES = int(os.getenv('RECEIPT_BATCH_MAX_IMAGES', '50'))  # Images per batch upload request
+PRODUCT_MATCH_MIN_SCORE = float(os.getenv('PRODUCT_MATCH_MIN_SCORE', '0.75'))  # Trigram similarity for an OCR name to suggest a product, only exact names are booked
+PRODUCT_INDEX_CACHE_SIZE = int(os.getenv('PRODUCT_INDEX_CACHE_SIZE', '100'))  # Businesses whose product name index stays in memory
+
+# Upload progress is written at most every N rows or T milliseconds
+UPLOAD_PROGRESS_EVERY_ROWS = int(os.getenv('UPLOAD_PROGRESS_EVERY_ROWS', '500'))
+UPLOAD_PROGRESS_EVERY_MS = int(os.getenv('UPLOAD_PROGRESS_EVERY_MS', '1000'))
+
 if DEBUG:
     # during local development allow all origins to simplify frontend dev on different ports
     CORS_ALLOW_ALL_ORIGINS = True